@@ -0,0 +1,99 @@
+"""Benchmark of the evaluation backends (cf. eval.py) on synthetic data:
+sequential evaluate, and parallel pool_evaluate and thread_evaluate.
+
+Usage: python -m icdar_maptext_analysis.benchmarks.backends [options]
+"""
+
+import argparse
+import gc
+import math
+import os
+import tempfile
+import time
+from typing import Callable, Tuple
+
+from .. import eval as maptext_eval
+from .synthetic import generate, write_json
+
+BACKENDS = { 'evaluate' : maptext_eval.evaluate,
+             'pool' : maptext_eval.pool_evaluate,
+             'thread' : maptext_eval.thread_evaluate }
+
+parser = argparse.ArgumentParser(
+    description='Benchmark of the map text evaluation backends')
+parser.add_argument('--task', type=str, default='det',
+                    choices=['det', 'detlink', 'detrec', 'detreclink'],
+                    help="Task to evaluate")
+parser.add_argument('--images', type=int, default=16,
+                    help="Number of synthetic images")
+parser.add_argument('--groups', type=int, default=300,
+                    help="Number of ground truth groups per image")
+parser.add_argument('--seed', type=int, default=0,
+                    help="Seed of the synthetic data")
+parser.add_argument('--workers', type=int, default=None,
+                    help="Number of processes or threads (default: CPU count)")
+parser.add_argument('--repeat', type=int, default=3,
+                    help="Number of timed runs of each backend (the best is reported)")
+
+
+def time_backend( backend: Callable,
+                  gt_file: str,
+                  pred_file: str,
+                  task: str,
+                  workers: int,
+                  repeat: int ) -> Tuple[float,dict]:
+    """Return the best time of evaluating the files with a backend, and its
+    overall results. Files are loaded (untimed) before each run, so every run
+    constructs its geometries afresh."""
+    is_linking, is_e2e = 'link' in task, 'rec' in task
+    can_match, score_match = maptext_eval.config_protocol(task, 0.5)
+    kwargs = {}
+    if backend is maptext_eval.pool_evaluate:
+        kwargs['processes'] = workers
+    elif backend is maptext_eval.thread_evaluate:
+        kwargs['threads'] = workers
+
+    best = math.inf
+    for _ in range(repeat):
+        gt = maptext_eval.load_ground_truth( gt_file, is_linking, is_e2e )
+        pred = maptext_eval.load_predictions( pred_file, is_linking, is_e2e )
+        gc.collect()  # Start each run without the garbage of loading
+        start = time.perf_counter()
+        overall, _ = backend( gt, pred, task, can_match, score_match,
+                              score_pairs=maptext_eval.PAIR_ENGINES['strtree'],
+                              **kwargs )
+        best = min( best, time.perf_counter() - start )
+    return best, overall
+
+
+def main():
+    """Time each backend and report its speedup over sequential evaluation"""
+    args = parser.parse_args()
+    workers = args.workers if args.workers else (os.cpu_count() or 1)
+
+    gt, pred = generate( seed=args.seed, images=args.images,
+                         groups=args.groups )
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        gt_file = os.path.join(tmpdir, 'gt.json')
+        pred_file = os.path.join(tmpdir, 'pred.json')
+        write_json(gt_file, gt)
+        write_json(pred_file, pred)
+
+        print(f'task={args.task} images={args.images} groups={args.groups} '
+              f'workers={workers}')
+        print(f'{"backend":<10} {"seconds":>8} {"images/s":>9} {"speedup":>8}')
+        baseline, reference = None, None
+        for (name,backend) in BACKENDS.items():
+            seconds, overall = time_backend( backend, gt_file, pred_file,
+                                             args.task, workers, args.repeat )
+            if baseline is None:
+                baseline, reference = seconds, overall
+            elif any( abs(overall[k] - reference[k]) > 1e-9 for k in reference ):
+                print(f'{name}: results differ from evaluate')
+            print(f'{name:<10} {seconds:8.3f} {args.images/seconds:9.2f} '
+                  f'{baseline/seconds:8.2f}')
+
+
+if __name__ == "__main__":
+    main()
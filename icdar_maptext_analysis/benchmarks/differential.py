@@ -0,0 +1,668 @@
+"""Differential check of the evaluation engines (cf. eval.py): the reference
+evaluate, which scores every pair in a loop (calc_score_pairs), against each
+alternative engine on the same inputs, for every task and several IoU
+thresholds. Overall results and every image's statistics must be identical;
+the first diverging image is reported with the matrices of its pairs. With
+--tolerance, values that agree only within the tolerance (drift) are reported
+rather than diverging, and with --allow-ties, so are matches among equally
+scored alternatives.
+
+Inputs are synthetic (cf. synthetic.generate), a competition ground truth file
+with its predictions or jittered copies (cf. geometry.jitter), or, in fuzz
+mode, random images of adversarial geometry: touching, degenerate and
+self-intersecting polygons, and IoUs at the thresholds. A diverging fuzz case
+is shrunk to the fewest groups and words that still diverge.
+
+Usage: python -m icdar_maptext_analysis.benchmarks.differential [options]
+"""
+
+import argparse
+import copy
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import numpy as np
+import scipy  # type: ignore
+
+from .. import eval as maptext_eval
+from ..paths import RELPATH_DIR_GT
+from .geometry import jitter
+from .synthetic import ALPHABETS, generate, word_vertices, write_json
+
+TASKS = ['det', 'detlink', 'detrec', 'detreclink']
+
+# Overall results and statistics of each image, for each threshold
+Results = list[Tuple[dict[str,float],dict[str,dict[str,float]]]]
+
+# Number of differing matrix entries printed for a diverging image
+MAX_REPORTED_ENTRIES = 20
+
+# Single-image (ground truth, predictions) on which an engine has diverged
+# from the reference, checked before the adversarial cases in fuzz mode
+REGRESSION_CASES = [
+    # A predicted group meets the ground truth only through its collinear
+    # (degenerate) word, so its union must find the candidate (task detlink,
+    # threshold 0.3)
+    ( [ { 'image': 'regression/0.png',
+          'groups': [ [ { 'vertices': [ [168.87438220099943, 30.88556248200443],
+                                        [208.87438220099943, 30.88556248200443],
+                                        [208.87438220099943, 40.88556248200443],
+                                        [168.87438220099943, 40.88556248200443] ],
+                          'text': 'u\u00fc',
+                          'illegible': False,
+                          'truncated': False } ] ] } ],
+      [ { 'image': 'regression/0.png',
+          'groups': [ [ { 'vertices': [ [130.9172055786891, 14.236745759683291],
+                                        [190.9172055786891, 34.23674575968329],
+                                        [160.9172055786891, 24.23674575968329] ],
+                          'text': 'p\u00ff\u00fc' },
+                        { 'vertices': [ [230.9172055786891, 14.236745759683291],
+                                        [290.9172055786891, 14.236745759683291],
+                                        [290.9172055786891, 24.23674575968329],
+                                        [230.9172055786891, 24.23674575968329] ],
+                          'text': '\u00ffryz' } ] ] } ] ),
+]
+
+
+def evaluate_each( gt: dict, pred: dict, task: str, thresholds: list[float],
+                   backend: Callable = maptext_eval.evaluate,
+                   score_pairs: Callable = maptext_eval.calc_score_pairs,
+                   **kwargs ) -> Results:
+    """Evaluate with a backend at each threshold in turn"""
+    results = []
+    for thresh in thresholds:
+        can_match, score_match = maptext_eval.config_protocol(task, thresh)
+        results.append( backend( gt, pred, task, can_match, score_match,
+                                 score_pairs=score_pairs, **kwargs ) )
+    return results
+
+
+@contextmanager
+def sparse_matching():
+    """Make every candidate matrix sparse (cf. candidate_matrices), and solve
+    every component of matches without forming its dense block (cf.
+    find_matches_sparse), however small"""
+    saved = (maptext_eval.SPARSE_MIN_PAIRS, maptext_eval.SPARSE_MAX_DENSITY)
+    maptext_eval.SPARSE_MIN_PAIRS, maptext_eval.SPARSE_MAX_DENSITY = 1, 1.0
+    try:
+        yield
+    finally:
+        maptext_eval.SPARSE_MIN_PAIRS, maptext_eval.SPARSE_MAX_DENSITY = saved
+
+
+def evaluate_sparse( gt: dict, pred: dict, task: str,
+                     thresholds: list[float] ) -> Results:
+    """Evaluate at each threshold with sparse matrices and matching"""
+    with sparse_matching():
+        return evaluate_each( gt, pred, task, thresholds,
+                              score_pairs=maptext_eval.calc_score_pairs_indexed )
+
+
+def evaluate_sweep( gt: dict, pred: dict, task: str,
+                    thresholds: list[float] ) -> Results:
+    """Evaluate all thresholds at once (cf. sweep_evaluate)"""
+    can_matches, score_match = maptext_eval.config_protocol(task, thresholds)
+    overall, stats = maptext_eval.sweep_evaluate(
+        gt, pred, task, can_matches, score_match,
+        score_pairs=maptext_eval.calc_score_pairs_indexed )
+    return [ (overall[c], { img: img_stats[c]
+                            for (img,img_stats) in stats.items() })
+             for c in range(len(thresholds)) ]
+
+
+INDEXED = maptext_eval.PAIR_ENGINES['strtree']
+
+ENGINES = { 'reference' : evaluate_each,
+            'strtree' : partial(evaluate_each, score_pairs=INDEXED),
+            'sparse' : evaluate_sparse,
+            'pool' : partial(evaluate_each, score_pairs=INDEXED,
+                             backend=maptext_eval.pool_evaluate, processes=2),
+            'thread' : partial(evaluate_each, score_pairs=INDEXED,
+                               backend=maptext_eval.thread_evaluate, threads=2),
+            'sweep' : evaluate_sweep }
+
+# Settings under which an engine evaluates, reproduced for the matrices of a
+# diverging image
+ENGINE_SETTINGS = { 'sparse' : sparse_matching }
+
+parser = argparse.ArgumentParser(
+    description='Differential check of the map text evaluation engines')
+parser.add_argument('--engines', type=str, nargs='+',
+                    default=[ e for e in ENGINES if e != 'reference' ],
+                    choices=[ e for e in ENGINES if e != 'reference' ],
+                    help="Engines checked against the reference evaluate")
+parser.add_argument('--tasks', type=str, nargs='+', default=TASKS,
+                    choices=TASKS,
+                    help="Task protocols to evaluate")
+parser.add_argument('--thresholds', type=float, nargs='+',
+                    default=[0.3, 0.5, 0.7, 0.9],
+                    help="IoU thresholds of matches")
+parser.add_argument('--tolerance', type=float, default=0.0,
+                    help="Largest absolute difference of agreeing values (default: values must be identical)")
+parser.add_argument('--allow-ties', action='store_true',
+                    help="Count images whose matches differ only among equally scored alternatives as ties (reported) rather than divergences")
+parser.add_argument('--subset', type=str, default=None,
+                    choices=['rumsey', 'ign'],
+                    help="Competition ground truth to use (relative to the top-level repo dir)")
+parser.add_argument('--gt', type=str, default=None,
+                    help="Path of a ground truth file (overrides --subset)")
+parser.add_argument('--pred', type=str, default=None,
+                    help="Path of a predictions file (default: jittered ground truth)")
+parser.add_argument('--noise', type=float, default=2.0,
+                    help="Standard deviation of jittered vertex displacements")
+parser.add_argument('--images', type=int, default=4,
+                    help="Number of synthetic images")
+parser.add_argument('--groups', type=int, default=100,
+                    help="Number of ground truth groups per synthetic image")
+parser.add_argument('--overlap', type=float, default=0.3,
+                    help="Probability of a synthetic group overlapping the previous group")
+parser.add_argument('--vertex-noise', type=float, default=0.5,
+                    help="Standard deviation of synthetic predicted vertex displacements")
+parser.add_argument('--fuzz', type=int, default=0,
+                    help="Number of adversarial cases to check instead (fuzz mode)")
+parser.add_argument('--fuzz-groups', type=int, default=12,
+                    help="Number of ground truth groups of each adversarial case")
+parser.add_argument('--seed', type=int, default=0,
+                    help="Seed of the synthetic data, jitter, or first adversarial case")
+parser.add_argument('--dump', type=str, default=None,
+                    help="Directory to write the matrices of a diverging image (and the shrunk inputs of a diverging fuzz case)")
+
+
+def run_engine( engine: str, gt_file: str, pred_file: str, task: str,
+                thresholds: list[float] ) -> Results:
+    """Load the files and evaluate them with an engine. Every engine loads
+    its own copy, so that none reuses geometry prepared by another."""
+    is_linking, is_e2e = 'link' in task, 'rec' in task
+    gt = maptext_eval.load_ground_truth( gt_file, is_linking, is_e2e )
+    pred = maptext_eval.load_predictions( pred_file, is_linking, is_e2e )
+    return ENGINES[engine]( gt, pred, task, thresholds )
+
+
+def differences( expected: dict[str,Any], actual: dict[str,Any],
+                 tolerance: float ) -> list[Tuple[str,Any,Any]]:
+    """Return the keys, expected and actual values of two dicts of results
+    that differ by more than the tolerance (NaNs agree with each other), or
+    that only one dict has"""
+    diffs = []
+    for key in expected.keys() | actual.keys():
+        (a, b) = (expected.get(key), actual.get(key))
+        if a is None or b is None:
+            diffs.append( (key, a, b) )
+        elif not ( (math.isnan(a) and math.isnan(b)) or
+                   abs(a - b) <= tolerance ):
+            diffs.append( (key, a, b) )
+    return sorted(diffs)
+
+
+def drifts( expected: dict[str,Any], actual: dict[str,Any] ) \
+            -> list[Tuple[str,Any,Any]]:
+    """Return the keys, expected and actual values of two dicts of results
+    that are not identical (cf. differences with zero tolerance)"""
+    return differences( expected, actual, 0.0 )
+
+
+def dense( matrix: Any ) -> np.ndarray:
+    """Return a matrix of calc_score_pairs as a dense numpy array"""
+    return matrix.toarray() if scipy.sparse.issparse(matrix) else matrix
+
+
+def pair_matrices( gt: list, pred: list, can_match: Callable,
+                   score_match: Callable, score_pairs: Callable ) \
+                   -> dict[str,np.ndarray]:
+    """Return the dense allowed, scores and ious matrices of the pairs of
+    elements (scores of pairs that are not allowed are -1) and their
+    matches"""
+    allowed, scores, ious = score_pairs( gt, pred, can_match, score_match )
+    matches_gt, matches_pred, matches_ious = \
+        maptext_eval.find_matches( allowed, scores, ious )
+    allowed = dense(allowed)
+    return { 'allowed': allowed,
+             'scores': np.where( allowed, dense(scores), -1.0 ),
+             'ious': dense(ious),
+             'matches': np.stack( (matches_gt, matches_pred) ),
+             'matches_ious': matches_ious }
+
+
+def image_matrices( gt_file: str, pred_file: str, task: str, thresh: float,
+                    img: str, engine: str ) -> dict[str,dict[str,np.ndarray]]:
+    """Return the matrices of an image's pairs (cf. pair_matrices) as an
+    engine calculates them"""
+    is_linking, is_e2e = 'link' in task, 'rec' in task
+    gt = maptext_eval.load_ground_truth( gt_file, is_linking, is_e2e )
+    pred = maptext_eval.load_predictions( pred_file, is_linking, is_e2e )
+    gt_el, pred_el = maptext_eval.zip_image_elements( gt[img],
+                                                      pred.get(img, []), task )
+    can_match, score_match = maptext_eval.config_protocol(task, thresh)
+    score_pairs = maptext_eval.calc_score_pairs if engine == 'reference' \
+        else INDEXED
+    with ENGINE_SETTINGS.get(engine, nullcontext)():
+        levels = { 'elements': pair_matrices( gt_el, pred_el, can_match,
+                                              score_match, score_pairs ) }
+    return levels
+
+
+def differing_entries( expected: dict[str,np.ndarray],
+                       actual: dict[str,np.ndarray],
+                       tolerance: float ) -> dict[str,np.ndarray]:
+    """Return the indices of the entries of each matrix that differ by more
+    than the tolerance"""
+    return { name: np.argwhere( np.abs( expected[name].astype(float) -
+                                        actual[name].astype(float) )
+                                > tolerance )
+             for name in ('allowed', 'scores', 'ious') }
+
+
+def is_tie( expected: dict[str,dict[str,np.ndarray]],
+            actual: dict[str,dict[str,np.ndarray]],
+            tolerance: float ) -> bool:
+    """Return whether an engine's matrices agree with the reference's, and
+    its matches differ only by choosing among equally scored alternatives
+    (cf. find_matches): allowable matches of the same total weight
+    (score+1)"""
+    differ = False
+    for level in expected:
+        (e, a) = (expected[level], actual[level])
+        if any( len(entries) for entries in
+                differing_entries(e, a, tolerance).values() ):
+            return False
+        if np.array_equal( e['matches'], a['matches'] ):
+            continue
+        (rows, cols) = a['matches']
+        if not e['allowed'][rows,cols].all():
+            return False
+        weight = np.sum( e['scores'][rows,cols] + 1 )
+        expected_weight = np.sum( e['scores'][tuple(e['matches'])] + 1 )
+        if abs( weight - expected_weight ) > tolerance:
+            return False
+        differ = True
+    return differ
+
+
+def find_divergence( gt_file: str, pred_file: str, engines: list[str],
+                     tasks: list[str], thresholds: list[float],
+                     tolerance: float, allow_ties: bool = False ) \
+                     -> Tuple[Optional[dict[str,Any]],list[Tuple],list[Tuple]]:
+    """Return the first divergence of an engine from the reference, or None
+    when all engines agree on every task and threshold.
+
+    Where allow_ties, images whose statistics differ only because an engine
+    matched among equally scored alternatives (cf. is_tie) are not
+    divergences, and the overall results of an engine with such images are
+    not compared.
+
+    Returns
+      divergence : dict of the engine, task, threshold, the first image (in
+                     ground truth order) whose statistics differ (or None when
+                     only the overall results do), the differences (cf.
+                     differences), and the image's matrices by the reference
+                     and by the engine (cf. image_matrices)
+      ties : List of the engine, task, threshold and image of each tie
+      drift : List of the engine, task, threshold, image (None for the
+                overall results), key, and reference and engine values of
+                each value that agrees only within the tolerance
+    """
+    ties = []
+    drift = []
+    for task in tasks:
+        reference = run_engine( 'reference', gt_file, pred_file, task,
+                                thresholds )
+        for engine in engines:
+            results = run_engine( engine, gt_file, pred_file, task, thresholds )
+            for (thresh,(ref_overall,ref_stats),(overall,stats)) in \
+                zip(thresholds, reference, results):
+                divergence = { 'engine': engine, 'task': task,
+                               'threshold': thresh, 'image': None }
+                num_ties = len(ties)
+                for img in ref_stats:
+                    diffs = differences( ref_stats[img], stats.get(img, {}),
+                                         tolerance )
+                    if not diffs:
+                        drift += [ (engine, task, thresh, img) + d for d in
+                                   drifts( ref_stats[img], stats[img] ) ]
+                        continue
+                    args = ( gt_file, pred_file, task, thresh, img )
+                    expected = image_matrices( *args, engine='reference' )
+                    actual = image_matrices( *args, engine=engine )
+                    if allow_ties and is_tie( expected, actual, tolerance ):
+                        ties.append( (engine, task, thresh, img) )
+                        continue
+                    return divergence | { 'image': img,
+                                          'differences': diffs,
+                                          'expected': expected,
+                                          'actual': actual }, ties, drift
+                if len(ties) > num_ties:
+                    continue
+                diffs = differences( ref_overall, overall, tolerance )
+                if diffs:
+                    return divergence | { 'differences': diffs }, ties, drift
+                drift += [ (engine, task, thresh, None) + d for d in
+                           drifts( ref_overall, overall ) ]
+    return None, ties, drift
+
+
+def report( divergence: dict[str,Any], tolerance: float,
+            dump: Optional[str] ):
+    """Print a divergence, with the matrix entries of a diverging image's
+    pairs that differ by more than the tolerance between the reference and
+    the engine, and their matches. The matrices are also written to
+    dump/matrices.npz where given."""
+    engine = divergence['engine']
+    print(f'{engine} diverges from the reference on task '
+          f'{divergence["task"]} at IoU threshold {divergence["threshold"]}'
+          + (f', image {divergence["image"]}' if divergence['image'] else ''))
+    for (key,expected,actual) in divergence['differences']:
+        print(f'  {key}: reference {expected}, {engine} {actual}')
+    if divergence['image'] is None:
+        return
+
+    (expected, actual) = (divergence['expected'], divergence['actual'])
+    for level in expected:
+        (e, a) = (expected[level], actual[level])
+        print(f'  {level}: {e["ious"].shape[0]} ground truth and '
+              f'{e["ious"].shape[1]} predicted')
+        for (name,entries) in differing_entries(e, a, tolerance).items():
+            print(f'    {name}: {len(entries)} entries differ')
+            for (i,j) in entries[:MAX_REPORTED_ENTRIES]:
+                print(f'      [{i},{j}] reference {e[name][i,j]}, '
+                      f'{engine} {a[name][i,j]}')
+        for (label,matrices) in (('reference', e), (engine, a)):
+            matches = zip( *matrices['matches'].tolist(),
+                           matrices['matches_ious'].tolist() )
+            print(f'    {label} matches (gt, pred, iou): {list(matches)}')
+    if dump:
+        os.makedirs(dump, exist_ok=True)
+        np.savez( os.path.join(dump, 'matrices.npz'),
+                  **{ f'{label}_{level}_{name}': values
+                      for (label,levels) in (('reference', expected),
+                                             ('engine', actual))
+                      for (level,matrices) in levels.items()
+                      for (name,values) in matrices.items() } )
+
+
+def report_ties( ties: list[Tuple] ):
+    """Print the number of images whose matches differ only among equally
+    scored alternatives, for each engine"""
+    engines = sorted( { tie[0] for tie in ties } )
+    for engine in engines:
+        images = [ tie for tie in ties if tie[0] == engine ]
+        print(f'{engine}: {len(images)} image evaluations differ only by '
+              f'matching among equally scored alternatives (first: task '
+              f'{images[0][1]}, threshold {images[0][2]}, image {images[0][3]})')
+
+
+def report_drift( drift: list[Tuple] ):
+    """Print the number of values that agree with the reference only within
+    the tolerance, and the largest difference, for each engine"""
+    engines = sorted( { d[0] for d in drift } )
+    for engine in engines:
+        values = [ d for d in drift if d[0] == engine ]
+        (_, task, thresh, img, key, a, b) = max(
+            values, key=lambda d: abs(d[5] - d[6]) )
+        print(f'{engine}: {len(values)} values agree only within the '
+              f'tolerance (largest difference {abs(a - b):.3g}: task {task}, '
+              f'threshold {thresh}, {f"image {img}" if img else "overall"}, '
+              f'{key} reference {a}, {engine} {b})')
+
+
+def adversarial_word( rnd: random.Random, x: float, y: float,
+                      thresholds: list[float] ) \
+                      -> Tuple[list[list[float]],list[list[list[float]]]]:
+    """Return the vertices of a ground truth word at (x,y) and of its
+    predictions, chosen among adversarial cases.
+
+    The ground truth word may be a rectangle, a many-sided or integer
+    polygon, a concave star, or degenerate (collinear, a single point,
+    repeated vertices, a sliver) or self-intersecting (a bowtie). Its
+    predictions may copy it (also reversed or from another start vertex),
+    cover a threshold's fraction of it exactly, touch it along an edge or at
+    a corner, be nested within it, be degenerate or self-intersecting, or
+    be duplicated.
+    """
+    width, height = rnd.choice([30.0, 40.0, 60.0]), rnd.choice([10.0, 20.0])
+    kind = rnd.randrange(8)
+    if kind == 0:  # Many sided, beyond the analytic intersection
+        points = word_vertices( x, y, width, height, rnd.uniform(-1,1),
+                                rnd.randint(17,30) )
+    elif kind == 1:  # Integer, possibly rotated
+        points = [ [ round(px), round(py) ] for (px,py) in
+                   word_vertices( x, y, width, height, rnd.uniform(-1,1),
+                                  rnd.randint(4,8) ) ]
+    elif kind == 2:  # Concave star
+        n = rnd.randint(5,9)
+        points = [ [ x + (width if k % 2 else width/3) * math.cos(math.pi*k/n),
+                     y + (width if k % 2 else width/3) * math.sin(math.pi*k/n) ]
+                   for k in range(2*n) ]
+    elif kind == 3:  # Degenerate
+        points = rnd.choice([
+            [ [x, y], [x+width, y], [x+width/2, y] ],  # Collinear
+            [ [x, y] ] * 4,  # Single point
+            [ [x, y], [x+width, y], [x+width, y], [x+width, y+height],
+              [x, y+height], [x, y] ],  # Repeated and closing vertices
+            [ [x, y], [x+width, y], [x+width, y+1e-9], [x, y+1e-9] ] ])  # Sliver
+    elif kind == 4:  # Self-intersecting bowtie
+        points = [ [x, y], [x+width, y+height], [x+width, y], [x, y+height] ]
+    else:  # Axis-aligned rectangle
+        points = [ [x, y], [x+width, y], [x+width, y+height], [x, y+height] ]
+
+    def covering( fraction: float ) -> list[list[float]]:
+        """Rectangle whose IoU with the word's rectangle is fraction"""
+        return [ [x, y], [x+width*fraction, y], [x+width*fraction, y+height],
+                 [x, y+height] ]
+
+    preds = []
+    for _ in range(rnd.choice([0, 1, 1, 1, 2])):
+        kind = rnd.randrange(10)
+        if kind == 0:  # Copy
+            pred = [ list(p) for p in points ]
+        elif kind == 1:  # Reversed orientation
+            pred = [ list(p) for p in reversed(points) ]
+        elif kind == 2:  # Another start vertex
+            k = rnd.randrange(len(points))
+            pred = [ list(p) for p in points[k:] + points[:k] ]
+        elif kind == 3:  # IoU at a threshold (for the rectangle)
+            pred = covering( rnd.choice(thresholds) )
+        elif kind == 4:  # Touching along an edge
+            pred = [ [x+width, y], [x+2*width, y], [x+2*width, y+height],
+                     [x+width, y+height] ]
+        elif kind == 5:  # Touching at a corner
+            pred = [ [x+width, y+height], [x+2*width, y+height],
+                     [x+2*width, y+2*height], [x+width, y+2*height] ]
+        elif kind == 6:  # Nested
+            pred = [ [x+width/4, y+height/4], [x+width/2, y+height/4],
+                     [x+width/2, y+height/2], [x+width/4, y+height/2] ]
+        elif kind == 7:  # Degenerate
+            pred = [ [x, y], [x+width, y+height], [x+width/2, y+height/2] ]
+        elif kind == 8:  # Self-intersecting
+            pred = [ [x, y], [x+width, y+height], [x+width, y], [x, y+height] ]
+        else:  # Shifted copy
+            (dx,dy) = (rnd.gauss(0,2), rnd.gauss(0,2))
+            pred = [ [px+dx, py+dy] for (px,py) in points ]
+        preds.append(pred)
+        if rnd.random() < 0.1:  # Duplicated
+            preds.append( [ list(p) for p in pred ] )
+    return points, preds
+
+
+def adversarial( seed: int, groups: int, thresholds: list[float] ) \
+                 -> Tuple[list,list]:
+    """Return ground truth and predictions of a single image of adversarial
+    groups (cf. adversarial_word), crowded so that groups overlap"""
+    rnd = random.Random(seed)
+    alphabet = ALPHABETS['accented']
+
+    def text() -> str:
+        return ''.join( rnd.choice(alphabet) for _ in range(rnd.randint(1,6)) )
+
+    size = 40 * math.sqrt(groups)
+    gt_groups, pred_groups = [], []
+    for _ in range(groups):
+        (x, y) = (rnd.uniform(0,size), rnd.uniform(0,size))
+        gt_words, pred_words = [], []
+        for _ in range(rnd.randint(1,3)):
+            points, preds = adversarial_word( rnd, x, y, thresholds )
+            word_text = text()
+            gt_words.append( { 'vertices': points,
+                               'text': word_text,
+                               'illegible': rnd.random() < 0.1,
+                               'truncated': rnd.random() < 0.05 } )
+            pred_words.extend( { 'vertices': pred,
+                                 'text': word_text if rnd.random() < 0.6 else text() }
+                               for pred in preds )
+            x += rnd.choice([50.0, 70.0])  # Touching or spaced
+        gt_groups.append(gt_words)
+        if pred_words:  # Sometimes split or merged with the previous group
+            if rnd.random() < 0.2 and len(pred_words) > 1:
+                pred_groups.extend( [pred_words[:1], pred_words[1:]] )
+            elif rnd.random() < 0.1 and pred_groups:
+                pred_groups[-1].extend(pred_words)
+            else:
+                pred_groups.append(pred_words)
+
+    image = f'adversarial/{seed}.png'
+    return [ { 'image': image, 'groups': gt_groups } ], \
+           [ { 'image': image, 'groups': pred_groups } ]
+
+
+def shrink( gt: list, pred: list, diverges: Callable[[list,list],bool] ) \
+            -> Tuple[list,list]:
+    """Return the inputs without every group and word whose removal keeps
+    them diverging, removing greedily until none can be removed"""
+    removed = True
+    while removed:
+        removed = False
+        for data in (gt, pred):
+            groups = data[0]['groups']
+            for g in reversed(range(len(groups))):
+                candidates = [ groups[:g] + groups[g+1:] ]
+                candidates += [ groups[:g] + [ groups[g][:w] + groups[g][w+1:] ]
+                                + groups[g+1:]
+                                for w in range(len(groups[g]))
+                                if len(groups[g]) > 1 ]
+                for candidate in candidates:
+                    saved = data[0]['groups']
+                    data[0]['groups'] = candidate
+                    if diverges(gt, pred):
+                        removed = True
+                        groups = candidate
+                        break
+                    data[0]['groups'] = saved
+    return gt, pred
+
+
+def fuzz( args: argparse.Namespace, tmpdir: str ) -> bool:
+    """Check the regression cases and then adversarial cases until one
+    diverges, which is shrunk and reported. Returns whether all agree."""
+    gt_file = os.path.join(tmpdir, 'gt.json')
+    pred_file = os.path.join(tmpdir, 'pred.json')
+
+    def check( gt: list, pred: list, engines: list[str], tasks: list[str],
+               thresholds: list[float] ) \
+               -> Tuple[Optional[dict[str,Any]],list[Tuple],list[Tuple]]:
+        write_json(gt_file, gt)
+        write_json(pred_file, pred)
+        return find_divergence( gt_file, pred_file, engines, tasks,
+                                thresholds, args.tolerance, args.allow_ties )
+
+    def cases() -> Iterator[Tuple[str,list,list]]:
+        """Name, ground truth and predictions of each case"""
+        for (n,(gt,pred)) in enumerate(REGRESSION_CASES):
+            yield f'Regression case {n}', copy.deepcopy(gt), copy.deepcopy(pred)
+        for seed in range(args.seed, args.seed + args.fuzz):
+            yield ( f'Case {seed}',
+                    *adversarial( seed, args.fuzz_groups, args.thresholds ) )
+
+    ties, drift = [], []
+    for (name,gt,pred) in cases():
+        divergence, case_ties, case_drift = check( gt, pred, args.engines,
+                                                   args.tasks, args.thresholds )
+        ties += case_ties
+        drift += case_drift
+        if divergence is None:
+            continue
+
+        print(f'{name} diverges; shrinking')
+        engines, tasks = [divergence['engine']], [divergence['task']]
+        thresholds = [divergence['threshold']]
+        gt, pred = shrink( gt, pred,
+                           lambda g, p: check( g, p, engines, tasks,
+                                               thresholds )[0] is not None )
+        divergence = check( gt, pred, engines, tasks, thresholds )[0]
+        report( divergence, args.tolerance, args.dump )
+        print(f'Ground truth: {json.dumps(gt)}')
+        print(f'Predictions: {json.dumps(pred)}')
+        if args.dump:
+            os.makedirs(args.dump, exist_ok=True)
+            write_json( os.path.join(args.dump, 'gt.json'), gt )
+            write_json( os.path.join(args.dump, 'pred.json'), pred )
+        return False
+
+    report_ties(ties)
+    report_drift(drift)
+    print(f'{len(REGRESSION_CASES)} regression and {args.fuzz} adversarial '
+          f'cases agree')
+    return True
+
+
+def main():
+    """Check the engines against the reference and report the first
+    divergence, exiting with an error if there is one"""
+    args = parser.parse_args()
+
+    gt_file = args.gt
+    if gt_file is None and args.subset is not None:
+        gt_file = str(RELPATH_DIR_GT / args.subset / 'test.json')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.fuzz:
+            # Adversarial geometry is invalid by design
+            logging.getLogger().setLevel(logging.ERROR)
+            agree = fuzz( args, tmpdir )
+        else:
+            pred_file, pred = args.pred, None
+            if gt_file is None:
+                gt, pred = generate( seed=args.seed, images=args.images,
+                                     groups=args.groups, overlap=args.overlap,
+                                     vertex_noise=args.vertex_noise,
+                                     alphabet=ALPHABETS['accented'] )
+                gt_file = os.path.join(tmpdir, 'gt.json')
+                write_json(gt_file, gt)
+                source = f'synthetic images={args.images} groups={args.groups}'
+            else:
+                source = gt_file
+            if pred_file is None:
+                if pred is None:
+                    with open(gt_file, encoding='utf-8') as fd:
+                        pred = jitter( json.load(fd), args.noise, args.seed )
+                pred_file = os.path.join(tmpdir, 'pred.json')
+                write_json(pred_file, pred)
+
+            print(f'gt={source} pred={args.pred or "jittered"} '
+                  f'engines={" ".join(args.engines)} '
+                  f'thresholds={" ".join(map(str, args.thresholds))}')
+            divergence, ties, drift = find_divergence( gt_file, pred_file,
+                                                       args.engines, args.tasks,
+                                                       args.thresholds,
+                                                       args.tolerance,
+                                                       args.allow_ties )
+            report_ties(ties)
+            report_drift(drift)
+            agree = divergence is None
+            if agree:
+                print('All engines agree with the reference')
+            else:
+                report( divergence, args.tolerance, args.dump )
+
+    if not agree:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark of the pair IoU calculation (cf. eval.py): all intersecting pairs
+of an image by GEOS set operations, and with the analytic intersection of
+convex polygons and group areas derived from word areas (the aggregate pair
+engine).
+
+Runs on synthetic data by default, or on a competition ground truth file
+(e.g., --subset rumsey) with its predictions or, lacking those, jittered
+copies of the ground truth.
+
+Usage: python -m icdar_maptext_analysis.benchmarks.geometry [options]
+"""
+
+import argparse
+import copy
+import gc
+import json
+import math
+import os
+import random
+import tempfile
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .. import eval as maptext_eval
+from ..paths import RELPATH_DIR_GT
+from .synthetic import generate, write_json
+
+parser = argparse.ArgumentParser(
+    description='Benchmark of the map text pair IoU calculation')
+parser.add_argument('--subset', type=str, default=None,
+                    choices=['rumsey', 'ign'],
+                    help="Competition ground truth to use (relative to the top-level repo dir)")
+parser.add_argument('--gt', type=str, default=None,
+                    help="Path of a ground truth file (overrides --subset)")
+parser.add_argument('--pred', type=str, default=None,
+                    help="Path of a predictions file (default: jittered ground truth)")
+parser.add_argument('--noise', type=float, default=2.0,
+                    help="Standard deviation of jittered vertex displacements")
+parser.add_argument('--images', type=int, default=8,
+                    help="Number of synthetic images")
+parser.add_argument('--groups', type=int, default=300,
+                    help="Number of ground truth groups per synthetic image")
+parser.add_argument('--seed', type=int, default=0,
+                    help="Seed of the synthetic data and jitter")
+parser.add_argument('--repeat', type=int, default=3,
+                    help="Number of timed runs of each method (the best is reported)")
+
+
+def jitter( gt: list, noise: float, seed: int ) -> list:
+    """Return predictions made from ground truth entries by displacing each
+    word by a random shift and each vertex by a smaller random offset"""
+    rnd = random.Random(seed)
+    pred = []
+    for entry in gt:
+        groups = copy.deepcopy(entry['groups'])
+        for group in groups:
+            for word in group:
+                (dx,dy) = (rnd.gauss(0,noise), rnd.gauss(0,noise))
+                word['vertices'] = [ [ x + dx + rnd.gauss(0,noise/4),
+                                       y + dy + rnd.gauss(0,noise/4) ]
+                                     for (x,y) in word['vertices'] ]
+                for key in ('illegible', 'truncated'):
+                    word.pop(key, None)
+        pred.append( { 'image': entry['image'], 'groups': groups } )
+    return pred
+
+
+def time_ious( gt_file: str, pred_file: str, task: str, analytic: bool,
+               repeat: int ) -> Tuple[float,dict[str,np.ndarray]]:
+    """Return the best time of calculating the IoUs of all images' candidate
+    pairs, and each image's IoUs. Files are loaded (untimed) before each run,
+    so every run prepares its geometries afresh."""
+    is_linking, is_e2e = 'link' in task, 'rec' in task
+    best = math.inf
+    for _ in range(repeat):
+        gt = maptext_eval.load_ground_truth( gt_file, is_linking, is_e2e )
+        pred = maptext_eval.load_predictions( pred_file, is_linking, is_e2e )
+        gc.collect()  # Start each run without the garbage of loading
+        ious = {}
+        seconds = 0.0
+        for img in gt:
+            if img not in pred:
+                continue
+            (gt_el, pred_el) = maptext_eval.zip_image_elements( gt[img],
+                                                                pred[img],
+                                                                task )
+            start = time.perf_counter()
+            (_, _, ious[img]) = maptext_eval.calc_candidate_ious(
+                gt_el, pred_el, analytic=analytic, aggregate=analytic )
+            seconds += time.perf_counter() - start
+        best = min( best, seconds )
+    return best, ious
+
+
+def max_difference( a: dict[str,np.ndarray], b: dict[str,np.ndarray] ) \
+                    -> Optional[float]:
+    """Return the largest absolute difference between two calculations of
+    the IoUs, or None when their candidate pairs differ"""
+    diff = 0.0
+    for img in a:
+        if a[img].shape != b[img].shape:
+            return None
+        if len(a[img]):
+            diff = max( diff, float(np.max(np.abs(a[img] - b[img]))) )
+    return diff
+
+
+def main():
+    """Time both methods on words and groups and report the speedup of the
+    analytic intersection"""
+    args = parser.parse_args()
+
+    gt_file = args.gt
+    if gt_file is None and args.subset is not None:
+        gt_file = str(RELPATH_DIR_GT / args.subset / 'test.json')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pred_file, pred = args.pred, None
+        if gt_file is None:
+            gt, pred = generate( seed=args.seed, images=args.images,
+                                 groups=args.groups )
+            gt_file = os.path.join(tmpdir, 'gt.json')
+            write_json(gt_file, gt)
+            source = f'synthetic images={args.images} groups={args.groups}'
+        else:
+            source = gt_file
+        if pred_file is None:
+            if pred is None:
+                with open(gt_file, encoding='utf-8') as fd:
+                    pred = jitter( json.load(fd), args.noise, args.seed )
+            pred_file = os.path.join(tmpdir, 'pred.json')
+            write_json(pred_file, pred)
+
+        print(f'gt={source} pred={args.pred or "jittered"}')
+        print(f'{"task":<8} {"GEOS s":>8} {"analytic s":>10} {"speedup":>8} '
+              f'{"max |diff|":>10}')
+        for task in ('det', 'detlink'):
+            geos_seconds, expected = time_ious( gt_file, pred_file, task,
+                                                False, args.repeat )
+            seconds, ious = time_ious( gt_file, pred_file, task, True,
+                                       args.repeat )
+            diff = max_difference( expected, ious )
+            if diff is None:
+                print(f'{task}: candidate pairs differ from GEOS')
+                diff = math.nan
+            print(f'{task:<8} {geos_seconds:8.3f} {seconds:10.3f} '
+                  f'{geos_seconds/seconds:8.2f} {diff:10.2e}')
+
+
+if __name__ == "__main__":
+    main()
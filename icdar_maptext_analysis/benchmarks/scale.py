@@ -0,0 +1,256 @@
+"""Benchmark of the evaluation throughput (cf. eval.py) on synthetic data of
+increasing scale: sequential evaluate and parallel pool_evaluate, for each
+task protocol, in images per second with their peak resident memory.
+
+Every run is a fresh process, so that its peak memory is its own. Results
+can be saved as a baseline (--save) and later runs compared against it
+(--baseline), failing when throughput drops or memory grows beyond a
+tolerance.
+
+Usage: python -m icdar_maptext_analysis.benchmarks.scale [options]
+"""
+
+import argparse
+import gc
+import json
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from typing import Optional, Tuple
+
+from .. import eval as maptext_eval
+from .synthetic import ALPHABETS, generate, write_json
+
+BACKENDS = { 'evaluate' : maptext_eval.evaluate,
+             'pool' : maptext_eval.pool_evaluate,
+             'thread' : maptext_eval.thread_evaluate }
+
+TASKS = ['det', 'detlink', 'detrec', 'detreclink']
+
+
+def parse_scale( arg: str ) -> Tuple[int,int]:
+    """Parse a scale IMAGESxGROUPS into its numbers of images and groups"""
+    try:
+        images, groups = ( int(n) for n in arg.lower().split('x') )
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'Expected IMAGESxGROUPS, got {arg}')
+    if images < 1 or groups < 1:
+        raise argparse.ArgumentTypeError(f'Expected positive sizes, got {arg}')
+    return images, groups
+
+
+parser = argparse.ArgumentParser(
+    description='Benchmark of the map text evaluation throughput at scale')
+parser.add_argument('--scales', type=parse_scale, nargs='+',
+                    default=[(4,100), (16,300), (4,1000)], metavar='IMAGESxGROUPS',
+                    help="Numbers of synthetic images and of ground truth groups per image")
+parser.add_argument('--tasks', type=str, nargs='+', default=TASKS,
+                    choices=TASKS,
+                    help="Task protocols to evaluate")
+parser.add_argument('--backends', type=str, nargs='+',
+                    default=['evaluate', 'pool'], choices=sorted(BACKENDS),
+                    help="Evaluation backends to time")
+parser.add_argument('--words', type=int, nargs=2, default=[1, 3],
+                    metavar=('MIN', 'MAX'),
+                    help="Range of the number of words per group")
+parser.add_argument('--vertices', type=int, nargs=2, default=[4, 8],
+                    metavar=('MIN', 'MAX'),
+                    help="Range of the number of vertices per word")
+parser.add_argument('--overlap', type=float, default=0.0,
+                    help="Probability of a group overlapping the previous group")
+parser.add_argument('--script', type=str, default='latin',
+                    choices=sorted(ALPHABETS),
+                    help="Characters of the synthetic texts")
+parser.add_argument('--noise', type=float, default=2.0,
+                    help="Standard deviation of predicted word displacements")
+parser.add_argument('--vertex-noise', type=float, default=0.0,
+                    help="Standard deviation of predicted vertex displacements")
+parser.add_argument('--seed', type=int, default=0,
+                    help="Seed of the synthetic data")
+parser.add_argument('--workers', type=int, default=None,
+                    help="Number of processes or threads (default: CPU count)")
+parser.add_argument('--repeat', type=int, default=3,
+                    help="Number of timed runs of each backend (the best is reported)")
+parser.add_argument('--baseline', type=str, default=None,
+                    help="Path of saved results to compare against")
+parser.add_argument('--tolerance', type=float, default=0.1,
+                    help="Relative loss of throughput (or growth of memory) over the baseline reported as a regression")
+parser.add_argument('--save', type=str, default=None,
+                    help="Path to save the results as a baseline")
+
+
+def peak_rss_mib( who: int ) -> float:
+    """Return the peak resident set size (MiB) of this process
+    (resource.RUSAGE_SELF) or of its largest terminated child process
+    (resource.RUSAGE_CHILDREN)"""
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kibibytes, macOS bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def run_backend( conn: multiprocessing.connection.Connection,
+                 backend: str,
+                 gt_file: str,
+                 pred_file: str,
+                 task: str,
+                 workers: int ):
+    """Evaluate the files once with a backend, and send the time, the overall
+    results and the peak memory of this process and of its workers. Loading
+    the files is untimed, but included in the peak memory."""
+    is_linking, is_e2e = 'link' in task, 'rec' in task
+    can_match, score_match = maptext_eval.config_protocol(task, 0.5)
+    kwargs = {}
+    if backend == 'pool':
+        kwargs['processes'] = workers
+    elif backend == 'thread':
+        kwargs['threads'] = workers
+
+    gt = maptext_eval.load_ground_truth( gt_file, is_linking, is_e2e )
+    pred = maptext_eval.load_predictions( pred_file, is_linking, is_e2e )
+    gc.collect()  # Start without the garbage of loading
+    start = time.perf_counter()
+    overall, _ = BACKENDS[backend]( gt, pred, task, can_match, score_match,
+                                    score_pairs=maptext_eval.PAIR_ENGINES['strtree'],
+                                    **kwargs )
+    seconds = time.perf_counter() - start
+    conn.send( (seconds, overall, peak_rss_mib(resource.RUSAGE_SELF),
+                peak_rss_mib(resource.RUSAGE_CHILDREN)) )
+    conn.close()
+
+
+def time_backend( backend: str,
+                  gt_file: str,
+                  pred_file: str,
+                  task: str,
+                  workers: int,
+                  repeat: int ) -> Tuple[float,dict,float,float]:
+    """Return the best time of evaluating the files with a backend, its
+    overall results, and the largest peak memory (MiB) of the evaluating
+    process and of its workers over all runs. Each run is a fresh process."""
+    context = multiprocessing.get_context('spawn')
+    best, rss, worker_rss = math.inf, 0.0, 0.0
+    for _ in range(repeat):
+        (receiver, sender) = context.Pipe(duplex=False)
+        process = context.Process( target=run_backend,
+                                   args=(sender, backend, gt_file, pred_file,
+                                         task, workers) )
+        process.start()
+        sender.close()
+        try:
+            (seconds, overall, run_rss, run_worker_rss) = receiver.recv()
+        except EOFError:
+            raise RuntimeError(f'{backend} failed on {task}')
+        finally:
+            process.join()
+        best = min( best, seconds )
+        rss, worker_rss = max( rss, run_rss ), max( worker_rss, run_worker_rss )
+    return best, overall, rss, worker_rss
+
+
+def compare( result: dict[str,float],
+             baseline: Optional[dict[str,float]],
+             tolerance: float ) -> Tuple[str,bool]:
+    """Return a description of a result relative to its baseline, and whether
+    it is a regression: slower or larger than the baseline by more than the
+    tolerance"""
+    if baseline is None:
+        return '', False
+    speed = result['images_per_second'] / baseline['images_per_second']
+    memory = result['rss_mib'] / baseline['rss_mib']
+    regression = speed < 1 - tolerance or memory > 1 + tolerance
+    return f'{speed:5.2f}x {memory:5.2f}x' + \
+        (' REGRESSION' if regression else ''), regression
+
+
+def main():
+    """Time each backend on each task at each scale and report their
+    throughput and peak memory, compared with a baseline when given"""
+    args = parser.parse_args()
+    workers = args.workers if args.workers else (os.cpu_count() or 1)
+
+    settings = { 'words': args.words,
+                 'vertices': args.vertices,
+                 'overlap': args.overlap,
+                 'script': args.script,
+                 'noise': args.noise,
+                 'vertex_noise': args.vertex_noise,
+                 'seed': args.seed,
+                 'workers': workers }
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as fd:
+            saved = json.load(fd)
+        if saved['settings'] != settings:
+            print(f'Warning: settings differ from the baseline {saved["settings"]}')
+        baseline = saved['results']
+
+    print(f'words={args.words[0]}-{args.words[1]} '
+          f'vertices={args.vertices[0]}-{args.vertices[1]} '
+          f'overlap={args.overlap} script={args.script} noise={args.noise} '
+          f'vertex-noise={args.vertex_noise} workers={workers}')
+    print(f'{"scale":<10} {"task":<10} {"backend":<8} {"words/img":>9} '
+          f'{"seconds":>8} {"images/s":>9} {"RSS MiB":>8} {"worker MiB":>10}'
+          + ('   speed memory vs baseline' if baseline else ''))
+    results = {}
+    regressions = 0
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for (images,groups) in args.scales:
+            scale = f'{images}x{groups}'
+            gt, pred = generate( seed=args.seed, images=images, groups=groups,
+                                 words=tuple(args.words),
+                                 vertices=tuple(args.vertices),
+                                 noise=args.noise, overlap=args.overlap,
+                                 vertex_noise=args.vertex_noise,
+                                 alphabet=ALPHABETS[args.script] )
+            words = sum( len(group) for entry in gt
+                         for group in entry['groups'] ) / images
+            gt_file = os.path.join(tmpdir, f'gt-{scale}.json')
+            pred_file = os.path.join(tmpdir, f'pred-{scale}.json')
+            write_json(gt_file, gt)
+            write_json(pred_file, pred)
+            del gt, pred
+
+            for task in args.tasks:
+                reference = None
+                for backend in args.backends:
+                    seconds, overall, rss, worker_rss = time_backend(
+                        backend, gt_file, pred_file, task, workers,
+                        args.repeat )
+                    if reference is None:
+                        reference = overall
+                    elif any( abs(overall[k] - reference[k]) > 1e-9
+                              for k in reference ):
+                        print(f'{backend}: results differ from {args.backends[0]}')
+                    key = f'{scale} {task} {backend}'
+                    results[key] = { 'seconds': seconds,
+                                     'images_per_second': images/seconds,
+                                     'rss_mib': rss,
+                                     'worker_rss_mib': worker_rss }
+                    change, regression = compare( results[key],
+                                                  baseline.get(key),
+                                                  args.tolerance )
+                    regressions += regression
+                    print(f'{scale:<10} {task:<10} {backend:<8} {words:9.0f} '
+                          f'{seconds:8.3f} {images/seconds:9.2f} {rss:8.1f} '
+                          f'{worker_rss:10.1f}   {change}'.rstrip())
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as fd:
+            json.dump( { 'environment': { 'python': platform.python_version(),
+                                          'machine': platform.machine(),
+                                          'cpus': os.cpu_count() },
+                         'settings': settings,
+                         'results': results }, fd, indent=4 )
+    if regressions:
+        sys.exit(f'{regressions} regression(s) beyond a tolerance of '
+                 f'{args.tolerance:.0%} of the baseline')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Seeded synthetic ground truth and predictions in the competition format,
+for benchmarking the evaluation (cf. eval.py)
+
+Usage: python -m icdar_maptext_analysis.benchmarks.synthetic --gt GT --pred PRED [options]
+"""
+
+import argparse
+import json
+import math
+import random
+from typing import Tuple
+
+# Characters of synthetic words
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+# Characters of synthetic words in each script
+ALPHABETS = { 'latin' : ALPHABET,
+              'accented' : ALPHABET + 'àâäçéèêëîïôöùûüÿæœß',
+              'cjk' : '地圖臺灣北市新竹高雄台中南投花蓮屏東宜蘭嘉義彰化苗栗' }
+
+
+def word_vertices( x: float, y: float, width: float, height: float,
+                   angle: float, num_vertices: int ) -> list[list[float]]:
+    """Return the vertices of a word polygon: a rotated rectangle whose upper
+    and lower edges are subdivided to give num_vertices vertices in total.
+
+    Arguments
+      x, y : Position of the lower left corner
+      width, height : Size of the rectangle
+      angle : Rotation (radians) about the lower left corner
+      num_vertices : Number of vertices (at least four)
+    Returns
+      List of [x,y] vertices
+    """
+    upper = num_vertices // 2
+    lower = num_vertices - upper
+    points = [ (width * k / (upper-1), height) for k in range(upper) ] + \
+             [ (width * (1 - k / (lower-1)), 0.0) for k in range(lower) ]
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    return [ [ x + px*cos_a - py*sin_a, y + px*sin_a + py*cos_a ]
+             for (px,py) in points ]
+
+
+def generate( seed: int = 0,
+              images: int = 10,
+              groups: int = 100,
+              words: Tuple[int,int] = (1,3),
+              vertices: Tuple[int,int] = (4,8),
+              noise: float = 2.0,
+              drop: float = 0.1,
+              extra: float = 0.1,
+              size: float = 2000.0,
+              overlap: float = 0.0,
+              vertex_noise: float = 0.0,
+              alphabet: str = ALPHABET ) -> Tuple[list,list]:
+    """Generate ground truth and predictions for synthetic images.
+
+    Each group is a line of words. Predictions perturb each ground truth word
+    by a small shift, miss some words, misspell some texts, and add spurious
+    words. Overlapping groups start near the previous group, so that their
+    words overlap its words, as in dense map labels.
+
+    Arguments
+      seed : Seed of the random number generator (default=0)
+      images : Number of images (default=10)
+      groups : Number of ground truth groups per image (default=100)
+      words : Range of the number of words per group (default=(1,3))
+      vertices : Range of the number of vertices per word (default=(4,8))
+      noise : Standard deviation of predicted vertex displacements
+                (default=2.0)
+      drop : Probability of a ground truth word having no prediction
+               (default=0.1)
+      extra : Number of spurious predicted groups, as a fraction of groups
+                (default=0.1)
+      size : Width and height of the images (default=2000)
+      overlap : Probability of a group overlapping the previous group
+                  (default=0.0)
+      vertex_noise : Standard deviation of independent displacements of each
+                       predicted vertex, which may distort predicted polygons
+                       into non-convex or self-intersecting ones (default=0.0)
+      alphabet : Characters of the texts (default=ALPHABET)
+    Returns
+      gt : List of ground truth entries (cf. verify_ground_truth_format)
+      pred : List of predictions entries (cf. verify_predictions_format)
+    """
+    rnd = random.Random(seed)
+
+    def text() -> str:
+        return ''.join( rnd.choice(alphabet) for _ in range(rnd.randint(1,8)) )
+
+    def displace( points: list[list[float]] ) -> list[list[float]]:
+        if vertex_noise <= 0:
+            return points
+        return [ [ px + rnd.gauss(0,vertex_noise), py + rnd.gauss(0,vertex_noise) ]
+                 for (px,py) in points ]
+
+    gt, pred = [], []
+    for i in range(images):
+        gt_groups, pred_groups = [], []
+        previous = None  # Start and height of the previous group
+        for _ in range(groups):
+            x, y = rnd.uniform(0,size), rnd.uniform(0,size)
+            angle = rnd.uniform(-math.pi/4, math.pi/4)
+            height = rnd.uniform(10,40)
+            if overlap > 0:
+                if previous is not None and rnd.random() < overlap:
+                    (px, py, pheight) = previous
+                    x = px + rnd.uniform(-0.5,0.5) * pheight
+                    y = py + rnd.uniform(-0.5,0.5) * pheight
+                previous = (x, y, height)
+            gt_words, pred_words = [], []
+            for _ in range(rnd.randint(*words)):
+                word_text = text()
+                width = height * 0.6 * len(word_text)
+                num_vertices = rnd.randint(*vertices)
+                gt_words.append(
+                    { 'vertices': word_vertices( x, y, width, height, angle,
+                                                 num_vertices ),
+                      'text': word_text,
+                      'illegible': rnd.random() < 0.05,
+                      'truncated': rnd.random() < 0.02 } )
+                if rnd.random() >= drop:
+                    (dx,dy) = (rnd.gauss(0,noise), rnd.gauss(0,noise))
+                    pred_text = word_text if rnd.random() < 0.7 else text()
+                    pred_words.append(
+                        { 'vertices': displace(
+                            word_vertices( x+dx, y+dy, width, height, angle,
+                                           num_vertices ) ),
+                          'text': pred_text } )
+                # Advance along the line, leaving a space between words
+                x += (width + height*0.5) * math.cos(angle)
+                y += (width + height*0.5) * math.sin(angle)
+            gt_groups.append(gt_words)
+            if pred_words:
+                pred_groups.append(pred_words)
+
+        for _ in range(int(groups*extra)):
+            (x,y) = (rnd.uniform(0,size), rnd.uniform(0,size))
+            pred_groups.append( [ { 'vertices': word_vertices( x, y, 60, 20,
+                                                               0.0, 4 ),
+                                    'text': text() } ] )
+
+        image = f'synthetic/{i}.png'
+        gt.append( { 'image': image, 'groups': gt_groups } )
+        pred.append( { 'image': image, 'groups': pred_groups } )
+
+    return gt, pred
+
+
+def write_json( path: str, data: list ):
+    """Write ground truth or predictions to a JSON file"""
+    with open(path, 'w', encoding='utf-8') as fd:
+        json.dump(data, fd)
+
+
+parser = argparse.ArgumentParser(
+    description='Generate synthetic map text ground truth and predictions')
+parser.add_argument('--gt', type=str, required=True,
+                    help="Path of the ground truth file to write")
+parser.add_argument('--pred', type=str, required=True,
+                    help="Path of the predictions file to write")
+parser.add_argument('--images', type=int, default=10,
+                    help="Number of images")
+parser.add_argument('--groups', type=int, default=100,
+                    help="Number of ground truth groups per image")
+parser.add_argument('--words', type=int, nargs=2, default=[1, 3],
+                    metavar=('MIN', 'MAX'),
+                    help="Range of the number of words per group")
+parser.add_argument('--vertices', type=int, nargs=2, default=[4, 8],
+                    metavar=('MIN', 'MAX'),
+                    help="Range of the number of vertices per word")
+parser.add_argument('--overlap', type=float, default=0.0,
+                    help="Probability of a group overlapping the previous group")
+parser.add_argument('--script', type=str, default='latin',
+                    choices=sorted(ALPHABETS),
+                    help="Characters of the texts")
+parser.add_argument('--noise', type=float, default=2.0,
+                    help="Standard deviation of predicted word displacements")
+parser.add_argument('--vertex-noise', type=float, default=0.0,
+                    help="Standard deviation of predicted vertex displacements")
+parser.add_argument('--seed', type=int, default=0,
+                    help="Seed of the random number generator")
+
+
+def main():
+    """Write synthetic ground truth and predictions files"""
+    args = parser.parse_args()
+    gt, pred = generate( seed=args.seed, images=args.images,
+                         groups=args.groups, words=tuple(args.words),
+                         vertices=tuple(args.vertices), noise=args.noise,
+                         overlap=args.overlap, vertex_noise=args.vertex_noise,
+                         alphabet=ALPHABETS[args.script] )
+    write_json(args.gt, gt)
+    write_json(args.pred, pred)
+
+
+if __name__ == "__main__":
+    main()
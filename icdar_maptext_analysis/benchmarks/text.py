@@ -0,0 +1,106 @@
+"""Benchmark of text scoring (cf. eval.py): the normalized Levenshtein
+distances of a batch of text pairs by pyeditdistance, one pair at a time,
+and by the bit-parallel normalized_levenshtein_batch.
+
+Usage: python -m icdar_maptext_analysis.benchmarks.text [options]
+"""
+
+import argparse
+import math
+import random
+import time
+from typing import Callable, Tuple
+
+from pyeditdistance.distance import normalized_levenshtein  # type: ignore
+
+from .. import eval as maptext_eval
+from .synthetic import ALPHABETS
+
+parser = argparse.ArgumentParser(
+    description='Benchmark of the map text scoring kernels')
+parser.add_argument('--pairs', type=int, nargs='+', default=[16, 64, 256, 4096],
+                    help="Numbers of text pairs per batch")
+parser.add_argument('--script', type=str, default='latin',
+                    choices=sorted(ALPHABETS),
+                    help="Characters of the synthetic texts")
+parser.add_argument('--length', type=int, nargs=2, default=[1, 12],
+                    metavar=('MIN', 'MAX'),
+                    help="Range of the lengths of ground truth texts")
+parser.add_argument('--seed', type=int, default=0,
+                    help="Seed of the synthetic texts")
+parser.add_argument('--repeat', type=int, default=5,
+                    help="Number of timed runs of each kernel (the best is reported)")
+
+
+def text_pairs( rnd: random.Random, num_pairs: int, alphabet: str,
+                length: Tuple[int,int] ) -> Tuple[list[str],list[str]]:
+    """Return ground truth texts and predicted texts, which misspell their
+    ground truth by a few random edits or are unrelated"""
+    gt_texts, pred_texts = [], []
+    for _ in range(num_pairs):
+        gt_text = ''.join( rnd.choice(alphabet)
+                           for _ in range(rnd.randint(*length)) )
+        if rnd.random() < 0.8:
+            chars = list(gt_text)
+            for _ in range(rnd.randint(1,3)):
+                edit = rnd.randrange(3)
+                if edit == 0 and chars:
+                    chars[rnd.randrange(len(chars))] = rnd.choice(alphabet)
+                elif edit == 1:
+                    chars.insert( rnd.randint(0,len(chars)), rnd.choice(alphabet) )
+                elif chars:
+                    del chars[rnd.randrange(len(chars))]
+            pred_text = ''.join(chars)
+        else:
+            pred_text = ''.join( rnd.choice(alphabet)
+                                 for _ in range(rnd.randint(*length)) )
+        gt_texts.append(gt_text)
+        pred_texts.append(pred_text)
+    return gt_texts, pred_texts
+
+
+def per_pair( gt_texts: list[str], pred_texts: list[str] ) -> list[float]:
+    """Distances of the pairs one at a time"""
+    return [ normalized_levenshtein(gs,ds) for (gs,ds) in zip(gt_texts,pred_texts) ]
+
+
+def batch( gt_texts: list[str], pred_texts: list[str] ) -> list[float]:
+    """Distances of the pairs at once"""
+    return maptext_eval.normalized_levenshtein_batch(gt_texts,pred_texts).tolist()
+
+
+def time_kernel( kernel: Callable, gt_texts: list[str], pred_texts: list[str],
+                 repeat: int ) -> Tuple[float,list[float]]:
+    """Return the best time of a kernel on the pairs, and its distances"""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        distances = kernel(gt_texts, pred_texts)
+        best = min( best, time.perf_counter() - start )
+    return best, distances
+
+
+def main():
+    """Time each kernel on batches of each size and report the speedup of
+    the batch kernel"""
+    args = parser.parse_args()
+    rnd = random.Random(args.seed)
+
+    print(f'script={args.script} length={args.length[0]}-{args.length[1]}')
+    print(f'{"pairs":>6} {"per-pair s":>10} {"batch s":>10} {"speedup":>8}')
+    for num_pairs in args.pairs:
+        gt_texts, pred_texts = text_pairs( rnd, num_pairs,
+                                           ALPHABETS[args.script],
+                                           tuple(args.length) )
+        pair_seconds, expected = time_kernel( per_pair, gt_texts, pred_texts,
+                                              args.repeat )
+        batch_seconds, distances = time_kernel( batch, gt_texts, pred_texts,
+                                                args.repeat )
+        if distances != expected:
+            print(f'{num_pairs}: batch distances differ from pyeditdistance')
+        print(f'{num_pairs:6d} {pair_seconds:10.5f} {batch_seconds:10.5f} '
+              f'{pair_seconds/batch_seconds:8.2f}')
+
+
+if __name__ == "__main__":
+    main()
@@ -16,19 +16,29 @@ this program. If not, see <https://www.gnu.org/licenses/>."""
 
 import json
 import argparse
+import glob
+import hashlib
 import logging
+import os
 import re
+import sys
+import threading
+import time
+import tracemalloc
 
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 from functools import reduce, partial
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Pool
-from typing import Union, Tuple, Any, Optional, Callable
+from typing import Union, Tuple, Any, Optional, Callable, Iterable, Iterator, TextIO
 
 import scipy  # type: ignore
 import numpy as np
 import numpy.typing as npt
 import shapely  # type: ignore
 
-from pyeditdistance.distance import normalized_levenshtein  # type: ignore
+from pyeditdistance.distance import levenshtein, normalized_levenshtein  # type: ignore
 
 # Minimum area of a polygon to be considered for area-based processing
 # Values below this will be treated as an IoU or overlap percentage of zero.
@@ -37,31 +47,214 @@ POLY_EPSILON = 1e-5
 # Score value for matches with ignore ground truths
 IGNORE_EPSILON = 1e-12
 
+# Number of distinct (ground truth, prediction) text pairs whose scores are
+# memoized in each process (cf. str_score)
+TEXT_SCORE_CACHE_SIZE = 2**16
+
+# Batches of at least this many distinct text pairs to score are calculated at
+# once (cf. str_scores and normalized_levenshtein_batch)
+LEVENSHTEIN_BATCH_MIN = 16
+
+# Pair matrices of images with at least this many (ground truth, prediction)
+# pairs, at most this fraction of which are candidates, are sparse
+# (cf. candidate_matrices and find_matches)
+SPARSE_MIN_PAIRS = 2**20
+SPARSE_MAX_DENSITY = 0.05
+
+# Pairs of convex polygons with at most this many vertices have their
+# intersection areas calculated analytically (cf. convex_intersection_areas)
+CONVEX_MAX_VERTICES = 16
+CONVEX_CHUNK_SIZE = 1024  # Pairs clipped at once
+# Turns whose sine is at most this in magnitude count as straight, so that
+# rotated polygons with subdivided (collinear) edges remain convex
+CONVEX_STRAIGHT_SINE = 1e-9
+
+# Number of the slowest images whose sizes are reported by --profile
+PROFILE_SLOWEST_IMAGES = 10
+
 parser = argparse.ArgumentParser(
     description='Map Text Competition Task Evaluation')
 parser.add_argument('--gt', type=str, required=True,
                     help="Path to the ground truth JSON file")
 parser.add_argument('--pred', type=str, required=True,
-                    help="Path to the predictions JSON file")
+                    help="Path to the predictions JSON file, or a directory or glob pattern of predictions files for batch evaluation")
 parser.add_argument('--output', type=str, required=False, default=None,
-                    help="Path to the JSON file containing results")
-parser.add_argument('--task', type=str, required=True,
+                    help="Path to the JSON file containing results (a directory for batch evaluation)")
+parser.add_argument('--task', type=str, required=True, nargs='+',
                     choices=['det', 'detlink', 'detrec', 'detreclink'],
-                    help="Task to evaluate against")
-parser.add_argument('--iou-threshold', type=float, default=0.5,
-                    help="Minimum IoU for elements to be considered a match")
+                    help="Task to evaluate against. Several tasks are evaluated in turn against the ground truth loaded once, with {task} in path arguments (e.g., --pred, --output) replaced by each task")
+parser.add_argument('--iou-threshold', type=str, nargs='+', default=['0.5'],
+                    help="Minimum IoU for elements to be considered a match. Several values or START:STEP:STOP ranges (e.g., 0.5:0.05:0.95) evaluate a sweep of thresholds")
 parser.add_argument('--parallel', type=str, required=False, default='none',
-                    choices=['none', 'spark', 'pool'],
-                    help="Process evaluation in parallel using multiprocessing or Apache Spark")
+                    choices=['none', 'spark', 'pool', 'thread'],
+                    help="Process evaluation in parallel using multiprocessing, threads, or Apache Spark")
+parser.add_argument('--workers', type=int, required=False, default=None,
+                    help="Number of worker processes (or threads) for --parallel pool (or thread) and batch evaluation (default: CPU count)")
 parser.add_argument('--gt-regex', type=str, required=False,
                     help="Regular expression to filter image keys for evaluation")
+parser.add_argument('--cache', type=str, required=False, default=None,
+                    help="Directory of a persistent cache of per-image results, so only changed images are evaluated")
+parser.add_argument('--cache-size', type=float, required=False, default=1024,
+                    help="Size bound (MB) of the cache; least recently used entries are evicted")
+parser.add_argument('--cache-ious', action='store_true',
+                    help="Also store each image's IoU matrix in the cache")
+parser.add_argument('--pair-engine', type=str, required=False,
+                    default='strtree', choices=['loop', 'strtree', 'convex', 'aggregate'],
+                    help="Calculate pairwise scores with a spatial index (strtree), the reference all-pairs loop, a spatial index with analytic areas of convex pairs (convex), or also with group areas derived from word areas (aggregate); convex and aggregate are faster, but their IoUs may differ from the others in the last bits")
+parser.add_argument('--repair-invalid', action='store_true',
+                    help="Repair invalid (e.g., self-intersecting) polygons with shapely's make_valid, rather than skipping the pairs whose IoU cannot be calculated")
+parser.add_argument('--shard', type=str, required=False, default=None,
+                    help="Evaluate only shard I/N (from 0) of the ground truth images, writing a shard file to --output for merging with the merge command")
+parser.add_argument('--journal', type=str, required=False, default=None,
+                    help="Path to a journal file, where the results of each image are appended as it finishes")
+parser.add_argument('--resume', action='store_true',
+                    help="Resume an interrupted evaluation, skipping the images already in --journal")
+parser.add_argument('--timings', type=str, required=False, default=None,
+                    help="Path to a JSON file of the estimated cost and wall time (seconds) of evaluating each image, for --parallel pool or spark")
+parser.add_argument('--profile', action='store_true',
+                    help="Record the wall time, call counts, and peak memory of the evaluation's stages, overall and for each image, in a profile block of the output (sequential evaluation only)")
+parser.add_argument('--matches', type=str, required=False, default=None,
+                    help="Path to a binary (NumPy .npz) file of each image's matched pairs, with their IoU and text score, and unmatched elements (cf. MatchesFile)")
+
+# Usage: eval.py merge SHARD_FILE [SHARD_FILE ...] [--output OUTPUT]
+merge_parser = argparse.ArgumentParser(
+    prog='eval.py merge',
+    description='Merge the shard files of a sharded map text competition evaluation')
+merge_parser.add_argument('shards', type=str, nargs='+',
+                          help="Paths to the shard JSON files (cf. --shard)")
+merge_parser.add_argument('--output', type=str, required=False, default=None,
+                          help="Path to the JSON file containing results")
 
 # Type aliases for hints
 # NB: "type" omitted for compatibility with Python3.9, used by RRC platform
-WordData = dict
-GroupData = dict  # list[WordData]
-ImageData = list[GroupData]
+WordData = dict  # Or WordView
+GroupData = dict  # list[WordData]; Or GroupView
+ImageData = list[GroupData]  # Or Annotations
 Number = Union[int,float]
+PairScorer = Callable[..., Tuple[npt.NDArray[np.bool_],
+                                 npt.NDArray[np.double],
+                                 npt.NDArray[np.double]]]
+
+
+class StageProfile:
+    """Wall time, call counts, and peak memory of the stages of an
+    evaluation, overall and for each image (cf. --profile).
+
+    Stages are timed where the evaluation enters them (cf. profile_stage) only
+    while the profile is started; otherwise they do nothing. They may nest
+    (e.g., polygons are constructed on demand within score_pairs), so the time
+    of a stage includes the stages within it. The peak memory of a stage is
+    that of the allocations traced by tracemalloc (Python objects and NumPy
+    arrays, but not GEOS geometries) above the memory in use when the stage
+    began. Only stages in the main thread are recorded (i.e., sequential
+    evaluation).
+    """
+
+    def __init__( self ):
+        self.active = False
+        self.start_time = 0.0
+        self.stages: dict[str,dict[str,Number]] = {}
+        self.images: dict[str,dict[str,Any]] = {}
+        self.image: Optional[dict[str,Any]] = None  # Image being evaluated
+        self.memory: list[list[int]] = []  # [start, peak] of the open stages
+
+    def start( self ):
+        """Start recording a new profile, tracing memory allocations"""
+        self.stages, self.images = {}, {}
+        self.active = True
+        self.start_time = time.perf_counter()
+        tracemalloc.start()
+
+    def stop( self ) -> dict[str,Any]:
+        """Stop recording and return the profile for output, with keys
+        'seconds' (overall wall time), 'stages' and 'images' (the calls,
+        seconds, and, for stages overall, peak_bytes of each stage), and
+        'slowest_images' (the sizes of the PROFILE_SLOWEST_IMAGES slowest
+        images)"""
+        tracemalloc.stop()
+        self.active = False
+        slowest = sorted( self.images,
+                          key=lambda img: -self.images[img]['seconds'] )
+        return { 'seconds' : time.perf_counter() - self.start_time,
+                 'stages' : self.stages,
+                 'images' : self.images,
+                 'slowest_images' : [ { 'image' : img,
+                                        'seconds' : self.images[img]['seconds'],
+                                        'num_gt' : self.images[img]['num_gt'],
+                                        'num_pred' : self.images[img]['num_pred'] }
+                                      for img in slowest[:PROFILE_SLOWEST_IMAGES] ] }
+
+    @contextmanager
+    def stage( self, name: str ) -> Iterator[None]:
+        """Record the time and peak memory of a stage"""
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+        (current, peak) = tracemalloc.get_traced_memory()
+        if self.memory:  # The enclosing stage's peak so far
+            self.memory[-1][1] = max( self.memory[-1][1], peak )
+        tracemalloc.reset_peak()
+        self.memory.append( [current, current] )
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            (start_bytes, peak) = self.memory.pop()
+            peak = max( peak, tracemalloc.get_traced_memory()[1] )
+            if self.memory:
+                self.memory[-1][1] = max( self.memory[-1][1], peak )
+            tracemalloc.reset_peak()
+
+            totals = self.stages.setdefault( name, { 'calls' : 0,
+                                                     'seconds' : 0.0,
+                                                     'peak_bytes' : 0 } )
+            totals['calls'] += 1
+            totals['seconds'] += seconds
+            totals['peak_bytes'] = max( totals['peak_bytes'], peak - start_bytes )
+            if self.image is not None:
+                image_totals = self.image['stages'].setdefault(
+                    name, { 'calls' : 0, 'seconds' : 0.0 } )
+                image_totals['calls'] += 1
+                image_totals['seconds'] += seconds
+
+    @contextmanager
+    def image_stage( self, img: str, num_gt: int, num_pred: int ) \
+            -> Iterator[None]:
+        """Record the evaluation of an image (as the stage 'evaluate_image')
+        and the stages within it"""
+        self.image = { 'seconds' : 0.0,
+                       'num_gt' : num_gt,
+                       'num_pred' : num_pred,
+                       'stages' : {} }
+        start = time.perf_counter()
+        try:
+            with self.stage('evaluate_image'):
+                yield
+        finally:
+            self.image['seconds'] = time.perf_counter() - start
+            self.images[img] = self.image
+            self.image = None
+
+
+_profile = StageProfile()  # Started by --profile
+
+# Context of stages when not profiling
+NO_STAGE = nullcontext()
+
+
+def profile_stage( name: str ) -> Any:
+    """Return a context recording a stage of the evaluation in the profile
+    (cf. StageProfile), or doing nothing when the profile is not started"""
+    return _profile.stage(name) if _profile.active else NO_STAGE
+
+
+def profile_image( img: Optional[str], num_gt: int, num_pred: int ) -> Any:
+    """Return a context recording the evaluation of an image in the profile
+    (cf. StageProfile), or doing nothing when the profile is not started"""
+    if _profile.active and img is not None:
+        return _profile.image_stage( img, num_gt, num_pred )
+    return NO_STAGE
 
 
 def warn_image_keys( gt_keys: set,
@@ -74,47 +267,597 @@ def warn_image_keys( gt_keys: set,
             logging.warning('Key %s missing from predictions', gt)
 
 
-def add_word_polygons( data: dict[str,ImageData] ):
-    """Add the field 'geometry', a shapely.geometry.Polygon, to each word.
-    It is constructed from the 'vertices' of the word and closed by repeating
-    the first vertex.
+def word_polygons( coords: npt.NDArray[np.double],
+                   offsets: npt.NDArray[np.intp] ) -> npt.NDArray[np.object_]:
+    """Construct the polygons of many words with vectorized shapely calls.
+    Each is closed by repeating its first vertex.
 
+    Arguments
+      coords : Array of shape (n,2) of the words' concatenated vertices
+      offsets : Array of indices, so that word w's vertices are
+                  coords[offsets[w]:offsets[w+1]]
     Returns
-      Nothing; called for side-effect (mutating data)
+      polygons : Array of shapely.Polygon, one per word
+    """
+    counts = np.diff(offsets)
+    if len(counts) == 0:
+        return np.empty(0, dtype=object)
+    starts = offsets[:-1]
+    # Close each ring by inserting its first vertex after its last
+    coords_closed = np.insert(coords, offsets[1:], coords[starts], axis=0)
+    rings = np.repeat( np.arange(len(counts)), counts+1 )
+    return shapely.polygons( shapely.linearrings(coords_closed, indices=rings) )
+
+
+def element_geometry( el: Union[WordData,GroupData] ):
+    """Return the geometry of a word or a group. A group's geometry, the union
+    of its words' polygons, is constructed on first use and kept in its
+    'geometry' field (or its store; cf. GroupView)."""
+    if 'geometry' not in el:
+        polys = [ word['geometry'] for word in el['words'] ]
+        el['geometry'] = shapely.unary_union(polys)
+    return el['geometry']
+
+
+class PreparedPolygons:
+    """Polygons prepared once for pair scoring (cf. prepare_polygons): their
+    validity, areas, and bounds, and the vertices of the convex ones, whose
+    intersections are calculated analytically (cf. convex_intersection_areas).
+
+    Attributes (arrays over the polygons)
+      geoms : Shapes (repaired, if requested), or None where missing
+      missing : Whether the shape is missing (e.g., a group union failed)
+      valid : Whether the shape is valid
+      repaired : Whether the shape was invalid and repaired with make_valid
+      areas : Areas (NaN where missing)
+      bounds : Array of shape (n,4) of (xmin,ymin,xmax,ymax) bounds
+      degenerate : Whether the area is below POLY_EPSILON, so that every
+                     IoU with the shape is zero
+      convex : Whether the shape is a valid, nondegenerate, convex polygon
+                 with at most CONVEX_MAX_VERTICES vertices
+      vertices : Array of shape (n,V,2) of the vertices of convex polygons,
+                   each padded by repeating its first vertex
+      num_vertices : Number of vertices of convex polygons
     """
-    for image_groups in data.values():
-        for group in image_groups:
-            for word in group['words']:
-                points = word['vertices']
-                points_closed = points + [points[0]]  # Close by repeating first
-                word['geometry'] = shapely.geometry.Polygon(points_closed)
+    __slots__ = ( 'geoms', 'missing', 'valid', 'repaired', 'areas', 'bounds',
+                  'degenerate', 'convex', 'vertices', 'num_vertices' )
+
+    def __init__( self, **columns: npt.NDArray ):
+        for slot in self.__slots__:
+            setattr(self, slot, columns[slot])
+
+    def __len__( self ) -> int:
+        return len(self.geoms)
 
 
-def add_group_info( data: dict[str,ImageData],
-                    is_e2e: bool,
-                    is_gt: bool = True):
-    """Add to each group the following fields
-     'geometry': union of all words' polygons in the group
+def prepare_polygons( geoms: npt.NDArray[np.object_],
+                      repair: bool = False,
+                      prepare: bool = False ) -> PreparedPolygons:
+    """Prepare shapes for pair scoring: check their validity once (and
+    optionally repair invalid shapes), and calculate their areas and bounds
+    and the vertices of convex polygons.
 
-    When is_e2e
-     'text': space-separated concatenation of words' text
+    Arguments
+      geoms : Array of shapes (None where missing)
+      repair : Whether to repair invalid shapes with shapely.make_valid
+                 (default=False); otherwise pairs with an invalid shape whose
+                 IoU raises a GEOSException are skipped
+      prepare : Whether to prepare the shapes (cf. shapely.prepare) for
+                  spatial predicates, e.g., when they are queried repeatedly
+                  (default=False)
+    Returns
+      prepared : The prepared polygons
+    """
+    with profile_stage('prepare_polygons'):
+        missing = shapely.is_missing(geoms)
+        valid = shapely.is_valid(geoms)
+        repaired = np.zeros(len(geoms), dtype=np.bool_)
+        invalid = np.flatnonzero( ~np.logical_or(valid, missing) )
+        if len(invalid):
+            if repair:
+                geoms = geoms.copy()
+                geoms[invalid] = shapely.make_valid(geoms[invalid])
+                repaired[invalid] = True
+                valid[invalid] = shapely.is_valid(geoms[invalid])
+            logging.warning('%d of %d polygons are invalid%s', len(invalid),
+                            len(geoms), ' (repaired)' if repair else '')
+        if prepare:
+            shapely.prepare(geoms[~missing])
+
+        areas = shapely.area(geoms)
+        degenerate = np.logical_and( ~missing, areas < POLY_EPSILON )
+        convex, vertices, num_vertices = convex_vertices(
+            geoms, np.logical_and( valid, ~degenerate ) )
+        return PreparedPolygons( geoms=geoms, missing=missing, valid=valid,
+                                 repaired=repaired, areas=areas,
+                                 bounds=shapely.bounds(geoms),
+                                 degenerate=degenerate, convex=convex,
+                                 vertices=vertices, num_vertices=num_vertices )
+
+
+def convex_vertices( geoms: npt.NDArray[np.object_],
+                     candidates: npt.NDArray[np.bool_] ) \
+                     -> Tuple[npt.NDArray[np.bool_],
+                              npt.NDArray[np.double],
+                              npt.NDArray[np.intp]]:
+    """Find the convex polygons among candidate (valid) shapes.
+
+    A valid polygon without holes is convex when all turns between its
+    consecutive edges are in the same direction (or straight, within
+    CONVEX_STRAIGHT_SINE).
 
-    When is_gt
-     'ignore': Disjunction of words' ignore field
+    Arguments
+      geoms : Array of shapes
+      candidates : Whether each shape is valid and may be considered
+    Returns
+      convex : Whether each shape is a convex polygon with at most
+                 CONVEX_MAX_VERTICES vertices
+      vertices : Array of shape (n,V,2) of each convex polygon's vertices
+                   (without the closing vertex), padded with its first
+      num_vertices : Number of vertices of each convex polygon (else zero)
+    """
+    convex = np.zeros(len(geoms), dtype=np.bool_)
+    num_vertices = np.zeros(len(geoms), dtype=np.intp)
+
+    polys = np.flatnonzero(candidates)
+    polys = polys[ shapely.get_type_id(geoms[polys]) == 3 ]  # Polygon
+    polys = polys[ shapely.get_num_interior_rings(geoms[polys]) == 0 ]
+    rings = shapely.get_exterior_ring(geoms[polys])
+    counts = shapely.get_num_coordinates(rings) - 1  # Without closing vertex
+    small = np.logical_and( counts >= 3, counts <= CONVEX_MAX_VERTICES )
+    (polys, rings, counts) = (polys[small], rings[small], counts[small])
+    if len(polys) == 0:
+        return convex, np.zeros( (len(geoms),0,2), dtype=np.double ), num_vertices
+
+    coords = shapely.get_coordinates(rings)
+    starts = np.concatenate( ([0], np.cumsum(counts+1)[:-1]) )
+    slots = np.arange(counts.max())
+    in_ring = slots < counts[:,None]
+    ring_vertices = coords[ starts[:,None] + np.where(in_ring, slots, 0) ]
+
+    # Cross products of consecutive edges, cyclically
+    following = np.where( slots+1 < counts[:,None], slots+1, 0 )[:,:,None]
+    edges = np.take_along_axis(ring_vertices, following, axis=1) - ring_vertices
+    next_edges = np.take_along_axis(edges, following, axis=1)
+    turns = edges[:,:,0]*next_edges[:,:,1] - edges[:,:,1]*next_edges[:,:,0]
+    straight = CONVEX_STRAIGHT_SINE * np.hypot(edges[:,:,0], edges[:,:,1]) \
+        * np.hypot(next_edges[:,:,0], next_edges[:,:,1])
+    is_convex = np.logical_or( np.all( (turns >= -straight) | ~in_ring, axis=1 ),
+                               np.all( (turns <= straight) | ~in_ring, axis=1 ) )
+
+    vertices = np.zeros( (len(geoms),len(slots),2), dtype=np.double )
+    polys = polys[is_convex]
+    convex[polys] = True
+    vertices[polys] = ring_vertices[is_convex]
+    num_vertices[polys] = counts[is_convex]
+    return convex, vertices, num_vertices
+
+
+def prepared_elements( elements: Union[list[WordData],list[GroupData]],
+                       repair: bool = False ) -> PreparedPolygons:
+    """Return the prepared geometries of a list of words or groups (cf.
+    element_geometry). The words of an Annotations store (cf.
+    Annotations.words) and its groups are prepared once by the store."""
+    if isinstance(elements, WordList):
+        return elements.store.prepared_words(repair)
+    if isinstance(elements, Annotations):
+        return elements.prepared_groups(repair)
+    return prepare_polygons( element_geometries(elements, repair), repair )
+
+
+def element_geometries( elements: Union[list[WordData],list[GroupData]],
+                        repair: bool = False ) -> npt.NDArray[np.object_]:
+    """Return the geometries of a list of words or groups (cf.
+    element_geometry). Groups whose union raises a GEOSException are logged
+    and missing, unless repair is given, in which case the union of their
+    repaired words is used."""
+    geoms = np.empty(len(elements), dtype=object)
+    for (i,el) in enumerate(elements):
+        try:
+            geoms[i] = element_geometry(el)
+        except shapely.errors.GEOSException as e:
+            if repair:
+                geoms[i] = shapely.unary_union( shapely.make_valid(
+                    np.array( [ word['geometry'] for word in el['words'] ],
+                              dtype=object ) ) )
+            else:
+                logging.warning('Error at union of group %d: %s. Skipping ...',
+                                i, e)
+    return geoms
+
+
+class Annotations:
+    """Columnar (structure-of-arrays) store of the words of one or more images.
+
+    The vertices of all words are held in one flat coordinate array, indexed by
+    offset arrays relating images to groups, groups to words, and words to
+    vertices, alongside per-word arrays of text and ignore flags. Word polygons,
+    group unions, and group texts are constructed lazily, and kept along with
+    the prepared polygons of words and groups.
+
+    A store is a sequence of its groups, each a GroupView whose words are
+    WordViews. The views support the dict-style access of the evaluation
+    functions (e.g., group['words'] or word['geometry']), so the store of a
+    single image serves as its list of groups (ImageData).
+
+    Only the columns are pickled (e.g., when sent to worker processes); the
+    geometries are constructed again on demand.
+    """
+    __slots__ = ( 'images', 'coords', 'word_offsets', 'group_offsets',
+                  'image_offsets', 'texts', 'ignore', 'geometries',
+                  'group_geometries', 'group_texts', 'prepared',
+                  'group_prepared', 'group_simple' )
+
+    # Constructed on demand, so neither pickled nor copied
+    DERIVED = ( 'geometries', 'group_geometries', 'group_texts', 'prepared',
+                'group_prepared', 'group_simple' )
+
+    def __init__( self,
+                  images: list[str],
+                  coords: npt.NDArray[np.double],
+                  word_offsets: npt.NDArray[np.intp],
+                  group_offsets: npt.NDArray[np.intp],
+                  image_offsets: npt.NDArray[np.intp],
+                  texts: Optional[npt.NDArray[np.object_]] = None,
+                  ignore: Optional[npt.NDArray[np.bool_]] = None ):
+        """
+        Arguments
+          images : Image keys
+          coords : Array of shape (n,2) of all words' concatenated vertices
+          word_offsets : Array of indices, so that word w's vertices are
+                           coords[word_offsets[w]:word_offsets[w+1]]
+          group_offsets : Array of indices, so that group g's words are
+                            group_offsets[g] to group_offsets[g+1]-1
+          image_offsets : Array of indices, so that image i's groups are
+                            image_offsets[i] to image_offsets[i+1]-1
+          texts : Array of each word's text, or None where a word has none
+                    (default=None, i.e., no text)
+          ignore : Array of each word's ignore flag (default=None, i.e., no
+                     ignore field, as for predictions)
+        """
+        self.images = images
+        self.coords = coords
+        self.word_offsets = word_offsets
+        self.group_offsets = group_offsets
+        self.image_offsets = image_offsets
+        self.texts = texts
+        self.ignore = ignore
+        self.reset()
+
+    def reset( self ):
+        """Discard the derived geometries and texts"""
+        self.geometries: Optional[npt.NDArray[np.object_]] = None
+        self.group_geometries: dict[int,Any] = {}
+        self.group_texts: dict[int,str] = {}
+        self.prepared: dict[bool,PreparedPolygons] = {}
+        self.group_prepared: dict[bool,PreparedPolygons] = {}
+        self.group_simple: dict[bool,npt.NDArray[np.bool_]] = {}
+
+    def __getstate__( self ) -> dict[str,Any]:
+        """Columns only (geometries are reconstructed on demand)"""
+        return { slot : getattr(self, slot) for slot in self.__slots__
+                 if slot not in self.DERIVED }
+
+    def __setstate__( self, state: dict[str,Any] ):
+        for (slot,value) in state.items():
+            setattr(self, slot, value)
+        self.reset()
+
+    def __len__( self ) -> int:
+        """Number of groups"""
+        return len(self.group_offsets) - 1
+
+    def __getitem__( self, g: int ) -> 'GroupView':
+        if not -len(self) <= g < len(self):
+            raise IndexError('group index out of range')
+        return GroupView( self, g % len(self) )
+
+    def __iter__( self ) -> Iterator['GroupView']:
+        return ( GroupView(self, g) for g in range(len(self)) )
+
+    def words( self ) -> 'WordList':
+        """Return the words of all groups"""
+        return WordList( self, [ WordView(self, w)
+                                 for w in range(len(self.word_offsets)-1) ] )
+
+    def word_geometries( self ) -> npt.NDArray[np.object_]:
+        """Return the polygons of all words, constructing them on first use"""
+        if self.geometries is None:
+            with profile_stage('polygons'):
+                self.geometries = word_polygons( self.coords, self.word_offsets )
+        return self.geometries
+
+    def prepared_words( self, repair: bool = False ) -> PreparedPolygons:
+        """Return the prepared polygons of all words (cf. prepare_polygons),
+        preparing them on first use. Ground truth polygons are also prepared
+        for spatial predicates, since the same ground truth is queried by
+        each predictions file of a batch evaluation."""
+        if repair not in self.prepared:
+            self.prepared[repair] = prepare_polygons(
+                self.word_geometries(), repair,
+                prepare=self.ignore is not None )
+        return self.prepared[repair]
+
+    def group_geometry( self, g: int ):
+        """Return the union of group g's word polygons, constructing it on
+        first use"""
+        if g not in self.group_geometries:
+            polys = self.word_geometries()[ self.group_offsets[g] :
+                                            self.group_offsets[g+1] ]
+            with profile_stage('polygons'):
+                self.group_geometries[g] = shapely.unary_union(polys)
+        return self.group_geometries[g]
+
+    def group_text( self, g: int ) -> str:
+        """Return the text of group g, its words' texts separated by spaces,
+        joining them on first use"""
+        if g not in self.group_texts:
+            (w0,w1) = self.group_offsets[g:g+2]
+            self.group_texts[g] = ' '.join( [ text for text in self.texts[w0:w1]
+                                              if text is not None ] )
+        return self.group_texts[g]
+
+    def prepared_groups( self, repair: bool = False ) -> PreparedPolygons:
+        """Return the prepared unions of all groups (cf. element_geometries),
+        preparing them on first use"""
+        if repair not in self.group_prepared:
+            self.group_prepared[repair] = prepare_polygons(
+                element_geometries(self, repair), repair,
+                prepare=self.ignore is not None )
+        return self.group_prepared[repair]
+
+    def simple_groups( self, repair: bool = False ) -> npt.NDArray[np.bool_]:
+        """Return whether each group is simple (cf. simple_groups), checking
+        them on first use"""
+        if repair not in self.group_simple:
+            words = self.prepared_words(repair)
+            self.group_simple[repair] = simple_groups(
+                words.geoms,
+                np.repeat( np.arange(len(self)), np.diff(self.group_offsets) ),
+                len(self), words.valid, words.degenerate )
+        return self.group_simple[repair]
+
+    def without_texts( self ) -> 'Annotations':
+        """Return a store of the same words without texts (as ground truth for
+        tasks without recognition), whose columns are this store's columns.
+        Its word polygons are this store's (constructed now, if need be), and
+        its other geometries, once constructed by either store, serve both."""
+        store = Annotations( self.images, self.coords, self.word_offsets,
+                             self.group_offsets, self.image_offsets,
+                             None, self.ignore )
+        store.geometries = self.word_geometries()
+        store.group_geometries = self.group_geometries
+        store.prepared = self.prepared
+        store.group_prepared = self.group_prepared
+        store.group_simple = self.group_simple
+        return store
+
+    def split( self ) -> dict[str,'Annotations']:
+        """Return a store for each image, indexed by image key. Their columns
+        are views of this store's columns (offsets are rebased)."""
+        stores = {}
+        for (i,image) in enumerate(self.images):
+            (g0,g1) = self.image_offsets[i:i+2]
+            (w0,w1) = self.group_offsets[[g0,g1]]
+            (v0,v1) = self.word_offsets[[w0,w1]]
+            stores[image] = Annotations(
+                [image],
+                self.coords[v0:v1],
+                self.word_offsets[w0:w1+1] - v0,
+                self.group_offsets[g0:g1+1] - w0,
+                np.array([0,g1-g0], dtype=np.intp),
+                None if self.texts is None else self.texts[w0:w1],
+                None if self.ignore is None else self.ignore[w0:w1] )
+        return stores
+
+
+class WordList(list):
+    """List of all the words of an Annotations store (cf. Annotations.words),
+    which refers to the store for their prepared polygons"""
+
+    def __init__( self, store: Annotations, words: list['WordView'] ):
+        super().__init__(words)
+        self.store = store
+
+
+class WordView:
+    """A word of an Annotations store, accessed like a word dict with the
+    fields 'vertices' and 'geometry', and where available, 'text' and
+    'ignore'"""
+    __slots__ = ( 'store', 'index' )
+
+    def __init__( self, store: Annotations, index: int ):
+        self.store = store
+        self.index = index
+
+    def __getitem__( self, key: str ) -> Any:
+        store = self.store
+        if key == 'geometry':
+            return store.word_geometries()[self.index]
+        elif key == 'text' and store.texts is not None and \
+          store.texts[self.index] is not None:
+            return store.texts[self.index]
+        elif key == 'ignore' and store.ignore is not None:
+            return bool(store.ignore[self.index])
+        elif key == 'vertices':
+            (start,end) = store.word_offsets[self.index:self.index+2]
+            return store.coords[start:end].tolist()
+        raise KeyError(key)
+
+    def __contains__( self, key: str ) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get( self, key: str, default: Any = None ) -> Any:
+        return self[key] if key in self else default
+
+
+class GroupView:
+    """A group of an Annotations store, accessed like a group dict with the
+    fields 'words' and 'geometry', and where available, 'text' and 'ignore'
+    (cf. add_group_info)"""
+    __slots__ = ( 'store', 'index' )
+
+    def __init__( self, store: Annotations, index: int ):
+        self.store = store
+        self.index = index
+
+    def word_slice( self ) -> slice:
+        """Indices of the group's words in its store"""
+        return slice( *self.store.group_offsets[self.index:self.index+2] )
+
+    def __getitem__( self, key: str ) -> Any:
+        store = self.store
+        if key == 'words':
+            words = self.word_slice()
+            return [ WordView(store, w) for w in range(words.start,words.stop) ]
+        elif key == 'geometry':
+            return store.group_geometry(self.index)
+        elif key == 'text' and store.texts is not None:
+            return store.group_text(self.index)
+        elif key == 'ignore' and store.ignore is not None:
+            return bool( np.any(store.ignore[self.word_slice()]) )
+        raise KeyError(key)
+
+    def __contains__( self, key: str ) -> bool:
+        return key in ('words','geometry') or \
+            (key == 'text' and self.store.texts is not None) or \
+            (key == 'ignore' and self.store.ignore is not None)
+
+    def get( self, key: str, default: Any = None ) -> Any:
+        return self[key] if key in self else default
+
+
+def build_annotations( entries: Iterable[Tuple[str,list,Any]],
+                       is_gt: bool,
+                       is_e2e: bool ) -> Annotations:
+    """Construct the columnar store of image entries.
 
+    Arguments
+      entries : Iterable of (image key, list of groups, vertex arrays or None),
+                  as given by iter_json_images
+      is_gt : Whether the entries are ground truth, whose words' ignore flags
+                are stored
+      is_e2e : Whether the evaluation is end-to-end; ground truth text is only
+                 stored for end-to-end evaluation
     Returns
-      Nothing; called for side-effect (mutating data)
+      annotations : Store of all the images' words
     """
-    for image_groups in data.values():
-        for group in image_groups:
-            words = group['words']
-            polys = [ word['geometry'] for word in words ]
-            group['geometry'] = shapely.unary_union(polys)
-            if is_e2e:
-                group['text'] = ' '.join( [ word['text'] for word in words
-                                            if 'text' in word] )
+    images = []
+    coords = []
+    vertex_counts = []
+    word_counts = []
+    group_counts = []
+    texts: list[Optional[str]] = []
+    ignore = []
+
+    for (image,groups,vertices) in entries:
+        with profile_stage('annotations'):
+            images.append(image)
+            group_counts.append(len(groups))
+            words = [ word for group in groups for word in group ]
+            word_counts.extend( [ len(group) for group in groups ] )
+
+            if vertices is not None:
+                (image_coords, image_offsets) = vertices
+                coords.append(image_coords)
+                vertex_counts.append(np.diff(image_offsets))
+            else:
+                points = [ vertex for word in words for vertex in word['vertices'] ]
+                coords.append( np.array(points, dtype=np.double).reshape(-1,2) )
+                vertex_counts.append( np.array( [ len(word['vertices'])
+                                                  for word in words ],
+                                                dtype=np.intp ) )
+
+            if is_e2e or not is_gt:
+                texts.extend( [ word.get('text') for word in words ] )
             if is_gt:
-                group['ignore'] = any( word['ignore'] for word in words )
+                # NB: This is the one place, aside from the format parser where
+                #  the ignore fields require processing.
+                # TODO(jjw): Generalize to any() over defined list of named ignore fields?
+                ignore.extend( [ word['truncated'] or word['illegible']
+                                 for word in words ] )
+
+    def offsets( counts: Union[list[int],npt.NDArray[np.intp]] ) \
+                 -> npt.NDArray[np.intp]:
+        """Cumulative offsets of consecutive counts, starting from zero"""
+        result = np.zeros( len(counts)+1, dtype=np.intp )
+        np.cumsum( np.asarray(counts, dtype=np.intp), out=result[1:] )
+        return result
+
+    with profile_stage('annotations'):
+        text_array = None
+        if is_e2e or not is_gt:
+            text_array = np.empty( len(texts), dtype=object )
+            text_array[:] = texts
+
+        return Annotations(
+            images,
+            np.concatenate(coords) if coords else np.zeros((0,2), dtype=np.double),
+            offsets( np.concatenate(vertex_counts) if vertex_counts else [] ),
+            offsets(word_counts),
+            offsets(group_counts),
+            text_array,
+            np.array(ignore, dtype=np.bool_) if is_gt else None )
+
+
+def vertex_array( vertices: list ) -> npt.NDArray[np.double]:
+    """Convert a list of vertices to an array of shape (n,2), checking their
+    format in bulk rather than vertex by vertex.
+
+    Arguments
+      vertices : List of vertices, each expected to be a list of two numbers
+    Returns
+      coords : Array of vertex coordinates
+    Raises
+      TypeError for the first vertex that is not a list of two numbers."""
+    try:
+        coords = np.array(vertices)
+    except (TypeError, ValueError):  # Ragged
+        coords = None
+
+    if coords is None or coords.ndim != 2 or coords.shape[1] != 2 or \
+      coords.dtype.kind not in 'biuf':
+        for vertex in vertices:  # Locate the offending vertex
+            if not isinstance(vertex, list) or \
+              len(vertex) != 2 or \
+              not all( isinstance( c, (float,int)) for c in vertex):
+                raise TypeError('Expected vertex to be a list of two numbers, found {}'.format(vertex))
+        # Well-formed after all (e.g., empty or integers beyond 64 bits)
+        coords = np.array(vertices, dtype=np.double)
+
+    return coords.astype(np.double, copy=False).reshape(-1,2)
+
+
+def word_vertex_arrays( vertices: list,
+                        counts: list[int] ) \
+                        -> Tuple[npt.NDArray[np.double], npt.NDArray[np.intp]]:
+    """Convert the concatenated vertices of several words to arrays, checking
+    their format in bulk.
+
+    Arguments
+      vertices : Concatenated list of all words' vertices
+      counts : Number of vertices of each word
+    Returns
+      coords : Array of shape (sum(counts),2) of vertex coordinates
+      offsets : Array of len(counts)+1 indices, so that word w's vertices are
+                  coords[offsets[w]:offsets[w+1]]
+    Raises
+      TypeError for the first vertex that is not a list of two numbers, or
+      ValueError if a coordinate is not finite."""
+    coords = vertex_array(vertices)
+    offsets = np.zeros( len(counts)+1, dtype=np.intp)
+    np.cumsum(counts, out=offsets[1:])
+
+    finite = np.isfinite(coords).all(axis=1)
+    if not finite.all():
+        w = np.searchsorted(offsets, np.argmin(finite), side='right') - 1
+        raise ValueError('Expected finite vertex coordinates for word, found {}'.format(vertices[offsets[w]:offsets[w+1]]))
+
+    return coords, offsets
 
 
 def verify_predictions_format( preds: list,
@@ -129,6 +872,30 @@ def verify_predictions_format( preds: list,
     Raises
       TypeErrors or ValueError if the parse fails type or value checks."""
 
+    if not isinstance(preds, list):  # Check top level is a list
+        raise TypeError('Expected predictions top-level to be a list (of images), found {}'.format(type(preds)))
+
+    for entry in preds:  # Check each list item (i.e., image)
+        verify_predictions_entry(entry, is_e2e)
+
+    return True
+
+
+def verify_predictions_entry( entry: Any,
+                              is_e2e: bool = True ) \
+                              -> Tuple[npt.NDArray[np.double], npt.NDArray[np.intp]]:
+    """ Verify format of a predictions entry for one image (i.e., an item of
+    the top-level list), read from JSON file.
+
+    Arguments
+      entry : Loaded predictions JSON entry
+      is_e2e  : Whether to check for mandatory additional fields (default=True)
+    Returns
+      coords, offsets : The image's word vertices as arrays, in order of
+                          groups and words (cf. word_vertex_arrays)
+    Raises
+      TypeErrors or ValueError if the parse fails type or value checks."""
+
     IMAGE_KEY_TYPES = {'image': str,
                        'groups': list }
     WORD_KEY_TYPES: dict[str,Any] = { 'vertices': list }
@@ -138,22 +905,21 @@ def verify_predictions_format( preds: list,
 
     WORD_KEY_SET = set(WORD_KEY_TYPES.keys())
 
-    if not isinstance(preds, list):  # Check top level is a list
-        raise TypeError('Expected predictions top-level to be a list (of images), found {}'.format(type(preds)))
-
-    for entry in preds:  # Check each list item (i.e., image)
-
-        if not isinstance(entry, dict):  # Check each image is a dict
-            raise TypeError('Expected predictions entry for each image to be a dict, found {}'.format(type(entry)))
+    if not isinstance(entry, dict):  # Check the image is a dict
+        raise TypeError('Expected predictions entry for each image to be a dict, found {}'.format(type(entry)))
 
-        if entry.keys() != IMAGE_KEY_TYPES.keys():  # Check image dict keyset
-            raise ValueError('Expected predictions entry for image to contain keyset {}, found {}'.format(IMAGE_KEY_TYPES.keys(),entry.keys()))
+    if entry.keys() != IMAGE_KEY_TYPES.keys():  # Check image dict keyset
+        raise ValueError('Expected predictions entry for image to contain keyset {}, found {}'.format(IMAGE_KEY_TYPES.keys(),entry.keys()))
 
-        for (k,v) in entry.items():  # Check image dict value types
-            if not isinstance(v, IMAGE_KEY_TYPES[k]):
-                raise TypeError('Expected predictions entry for image key {} to have type {}, found {}'.format(k,IMAGE_KEY_TYPES[k],type(v)))
+    for (k,v) in entry.items():  # Check image dict value types
+        if not isinstance(v, IMAGE_KEY_TYPES[k]):
+            raise TypeError('Expected predictions entry for image key {} to have type {}, found {}'.format(k,IMAGE_KEY_TYPES[k],type(v)))
 
-        # Image keys all check out. Time to descend to check their values.
+    # Image keys all check out. Time to descend to check their values.
+    # Vertices are gathered and checked in bulk (cf. word_vertex_arrays)
+    vertices: list = []
+    counts = []
+    try:
         for group in entry['groups']:
 
             if not isinstance(group, list):  # Check each group is a list (of words)
@@ -178,12 +944,13 @@ def verify_predictions_format( preds: list,
                 if len(word['vertices']) < 3:
                     raise ValueError('Expected at least three vertices for word, found {}'.format(word['vertices']))
 
-                for vertex in word['vertices']:
-                    if not isinstance(vertex, list) or \
-                      len(vertex) != 2 or \
-                      not all( isinstance( c, (float,int)) for c in vertex):
-                        raise TypeError('Expected vertex to be a list of two numbers, found {}'.format(vertex))
-    return True
+                vertices.extend(word['vertices'])
+                counts.append(len(word['vertices']))
+    except (TypeError, ValueError):
+        vertex_array(vertices)  # A malformed vertex of an earlier word precedes
+        raise
+
+    return word_vertex_arrays(vertices, counts)
 
 
 def verify_ground_truth_format( gt_raw: list ):
@@ -191,6 +958,23 @@ def verify_ground_truth_format( gt_raw: list ):
         but raises errors if the parse fails type or value checks.
     """
 
+    if not isinstance(gt_raw,list):  # Check top level is a list
+        raise TypeError(
+            'Expected ground truth top-level to be a list (of images), found {}'.format(type(gt_raw)))
+
+    for entry in gt_raw:  # Check each list item (i.e., image)
+        verify_ground_truth_entry(entry)
+
+
+def verify_ground_truth_entry( entry: Any ) \
+                               -> Tuple[npt.NDArray[np.double], npt.NDArray[np.intp]]:
+    """Verify format of a ground truth entry for one image (i.e., an item of
+        the top-level list) read from JSON file. Returns the image's word
+        vertices as arrays, in order of groups and words (cf.
+        word_vertex_arrays), but raises errors if the parse fails type or
+        value checks.
+    """
+
     IMAGE_KEY_TYPES = {'image' : str,
                        'groups': list }
     WORD_KEY_TYPES = { 'vertices' : list,
@@ -199,23 +983,21 @@ def verify_ground_truth_format( gt_raw: list ):
                        'truncated': bool }
     WORD_KEY_SET = set(WORD_KEY_TYPES.keys())
 
-    if not isinstance(gt_raw,list):  # Check top level is a list
-        raise TypeError(
-            'Expected ground truth top-level to be a list (of images), found {}'.format(type(gt_raw)))
-
-    for entry in gt_raw:  # Check each list item (i.e., image)
-
-        if not isinstance(entry, dict):  # Check each image is a dict
-            raise TypeError('Expected ground truth entry for each image to be a dict, found {}'.format(type(entry)))
+    if not isinstance(entry, dict):  # Check the image is a dict
+        raise TypeError('Expected ground truth entry for each image to be a dict, found {}'.format(type(entry)))
 
-        if entry.keys() != IMAGE_KEY_TYPES.keys():  # Check image dict keyset
-            raise ValueError('Expected ground truth entry for image to contain keyset {}, found {}'.format(IMAGE_KEY_TYPES.keys(),entry.keys()))
+    if entry.keys() != IMAGE_KEY_TYPES.keys():  # Check image dict keyset
+        raise ValueError('Expected ground truth entry for image to contain keyset {}, found {}'.format(IMAGE_KEY_TYPES.keys(),entry.keys()))
 
-        for (k,v) in entry.items():  # Check image dict value types
-            if not isinstance(v, IMAGE_KEY_TYPES[k]):
-                raise TypeError('Expected ground truth entry for image key {} to have type {}, found {}'.format(k,IMAGE_KEY_TYPES[k],type(v)))
+    for (k,v) in entry.items():  # Check image dict value types
+        if not isinstance(v, IMAGE_KEY_TYPES[k]):
+            raise TypeError('Expected ground truth entry for image key {} to have type {}, found {}'.format(k,IMAGE_KEY_TYPES[k],type(v)))
 
-        # Image keys all check out. Time to descend to check their values.
+    # Image keys all check out. Time to descend to check their values.
+    # Vertices are gathered and checked in bulk (cf. word_vertex_arrays)
+    vertices: list = []
+    counts = []
+    try:
         for group in entry['groups']:
 
             if not isinstance(group,list):  # Check each group is a list (of words)
@@ -240,11 +1022,174 @@ def verify_ground_truth_format( gt_raw: list ):
                 if len(word['vertices']) < 3:
                     raise ValueError('Expected at least three vertices for word, found {}'.format(word['vertices']))
 
-                for vertex in word['vertices']:
-                    if not isinstance(vertex, list) or \
-                      len(vertex) != 2 or \
-                      not all( isinstance( c, (float,int)) for c in vertex):
-                        raise TypeError('Expected vertex to be a list of two numbers, found {}'.format(vertex))
+                vertices.extend(word['vertices'])
+                counts.append(len(word['vertices']))
+    except (TypeError, ValueError):
+        vertex_array(vertices)  # A malformed vertex of an earlier word precedes
+        raise
+
+    return word_vertex_arrays(vertices, counts)
+
+
+# Patterns for incremental parsing of JSON arrays (cf. iter_json_array)
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Leading "image" member of an object, capturing its string value
+JSON_IMAGE_MEMBER = re.compile(r'\{[ \t\n\r]*"image"[ \t\n\r]*:[ \t\n\r]*("(?:[^"\\]|\\.)*")')
+# Strings (group 1 fails to match when unterminated) and brackets
+JSON_SKIP_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*(")?|[\[\]{}]')
+
+
+def iter_json_array( fd: TextIO,
+                     skip_image: Optional[Callable[[str],bool]] = None,
+                     chunk_size: int = 2**20 ) -> Iterator[Any]:
+    """Incrementally parse a file containing a JSON array, yielding its
+    elements one at a time, so that only a single element is held in memory.
+
+    Arguments
+      fd : File (opened in text mode) positioned at the JSON array
+      skip_image : Predicate on image keys. Elements that are objects whose
+                     first member is an "image" string for which skip_image
+                     returns True are passed over without being decoded
+                     (default=None, i.e., decode all elements)
+      chunk_size : Number of characters to read at a time (default=1MiB)
+    Raises
+      ValueError if the contents are not a valid JSON array
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def more() -> bool:
+        """Read more of the file, discarding the consumed prefix of buf.
+        Reads grow with the pending data so large elements parse in few tries.
+        Returns whether anything was read."""
+        nonlocal buf, pos, eof
+        chunk = '' if eof else fd.read(max(chunk_size, len(buf)-pos))
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            pos = JSON_WHITESPACE.match(buf, pos).end()
+            if pos < len(buf) or not more():
+                return
+
+    def skipped_end() -> Optional[int]:
+        """Return the end of the element at pos when it is to be skipped, or
+        None when it is not (or is not yet completely read)"""
+        member = JSON_IMAGE_MEMBER.match(buf, pos)
+        if not member or not skip_image( json.loads(member.group(1)) ):
+            return None
+        depth = 0
+        for token in JSON_SKIP_TOKEN.finditer(buf, pos):
+            if token.group()[0] == '"':
+                if token.group(1) is None:  # Unterminated; need more input
+                    return None
+            elif token.group() in '[{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return token.end()
+        return None
+
+    skip_whitespace()
+    if buf[pos:pos+1] != '[':
+        raise ValueError('Expected JSON array at top level')
+    pos += 1
+    skip_whitespace()
+    if buf[pos:pos+1] == ']':
+        return
+
+    while True:
+        with profile_stage('parse_json'):
+            while True:  # Parse an element, reading more input until complete
+                end = skipped_end() if skip_image else None
+                if end is not None:
+                    skipped = True
+                    break
+                try:
+                    element, end = decoder.raw_decode(buf, pos)
+                    if end < len(buf) or eof:  # (Not a truncated number)
+                        skipped = False
+                        break
+                except ValueError:
+                    if eof:
+                        raise
+                if not more():
+                    # Incomplete element at end of file: raise the decoder error
+                    element, end = decoder.raw_decode(buf, pos)
+                    skipped = False
+                    break
+        pos = end
+        if not skipped:
+            yield element
+            del element  # Release before parsing the next element
+
+        skip_whitespace()
+        delimiter = buf[pos:pos+1]
+        pos += 1
+        if delimiter == ']':
+            return
+        elif delimiter != ',':
+            raise ValueError(f'Expected "," or "]" delimiting JSON array, found "{delimiter}"')
+        skip_whitespace()
+
+
+def iter_json_images( json_file: str,
+                      verify_format: Optional[Callable[[Any],Any]],
+                      verify_entry: Optional[Callable[[Any],Any]],
+                      image_regex: Optional[str] = None,
+                      image_keys: Optional[set[str]] = None ) \
+                      -> Iterator[Tuple[str,list,Any]]:
+    """Incrementally load the image entries of a ground truth or predictions
+    JSON file (see competition format), verifying each as it is read.
+
+    Arguments
+      json_file : Path to the JSON file
+      verify_format : Verification of the whole file (cf.
+                        verify_predictions_format), used only to report a top
+                        level that is not a list (default=None, no verification)
+      verify_entry : Verification of each image entry (cf.
+                       verify_predictions_entry; default=None, no verification)
+      image_regex : Regular expression to filter image keys (default=None)
+      image_keys : Set of image keys to keep (default=None, i.e., all)
+    Returns
+      Iterator of (image key, list of groups, verification result) for each
+        image kept, where the result is that of verify_entry (i.e., the word
+        vertex arrays) or None. Entries that are filtered out are neither
+        decoded nor verified.
+    """
+    regex = re.compile(image_regex) if image_regex else None
+
+    def skip_image( image: str ) -> bool:
+        return bool( (regex and not regex.match(image)) or
+                     (image_keys is not None and image not in image_keys) )
+
+    with open(json_file, encoding='utf-8') as fd:
+        start = fd.read(1)
+        while start.isspace():
+            start = fd.read(1)
+        fd.seek(0)
+
+        if start != '[':  # Not a list: raise the format's error
+            raw = json.load(fd)
+            if verify_format:
+                verify_format(raw)
+            raise TypeError('Expected top-level to be a list (of images), found {}'.format(type(raw)))
+
+        for entry in iter_json_array(fd, skip_image):
+            with profile_stage('verify'):
+                verified = verify_entry(entry) if verify_entry else None
+            if skip_image(entry['image']):  # Not skipped while parsing
+                continue
+            yield entry['image'], entry['groups'], verified
 
 
 def load_ground_truth( gt_file: str,
@@ -256,63 +1201,143 @@ def load_ground_truth( gt_file: str,
 
     Arguments
       gt_file : Path to the ground truth JSON file (see competition format)
-      is_linking : Whether the evaluation includes linking
+      is_linking : Whether the evaluation includes linking (unused; group
+                     fields are derived on demand)
       is_e2e : Whether the evaluation is end-to-end (i.e., includes recognition)
       image_regex : Regular expression to filter image keys (default=None)
       verify : Whether to verify the ground truth file (default=True)
     Returns
-      gt_anno : Dict indexed by the image id, giving the list of groups
+      gt_anno : Dict indexed by the image id, giving the list of groups (as
+                  the image's Annotations)
     """
 
-    # NB: This is the one place, aside from the format parser where the ignore
-    #  fields require processing.
-    # TODO(jjw): Generalize to any() over defined list of named ignore fields?
-    def fold_word_ignores(group: list[WordData]) -> list[WordData]:
-        """Combine cases causing a ground truth to be ignored into a single
-        ignore flag field"""
-        if is_e2e:
-            return [ {'text': word['text'],
-                      'vertices': word['vertices'],
-                      'ignore':  word['truncated'] or word['illegible'] }
-                     for word in group ]
-        else:
-            return [ {'vertices': word['vertices'],
-                      'ignore':  word['truncated'] or word['illegible'] }
-                     for word in group ]
-
     logging.info('Loading ground truth annotations...')
 
-    with open(gt_file, encoding='utf-8') as fd:
-        gt_raw = json.load(fd)
+    # Incrementally re-index: image-->groups, as columns (cf. Annotations),
+    # so the raw file contents are never held all at once
+    entries = iter_json_images( gt_file,
+                                verify_ground_truth_format if verify else None,
+                                verify_ground_truth_entry if verify else None,
+                                image_regex=image_regex )
+    annotations = build_annotations( entries, is_gt=True, is_e2e=is_e2e )
 
-    if verify:
-        verify_ground_truth_format(gt_raw)
+    if len(annotations.images) == 0:
+        raise ValueError('No ground truth images for evaluation')
 
-    # Re-index: image-->groups, wrapping group lists to dicts (for more fields)
-    gt = {}
-    regex = re.compile(image_regex) if image_regex else None
-    for entry in gt_raw:
-        if regex and not regex.match(entry['image']):  # Skip if no match
-            continue
-        groups = entry['groups']
-        groups = [ { 'words' : fold_word_ignores(group) } for group in groups ]
-        gt[entry['image']] = groups
+    # Geometries and group fields are derived on demand for evaluation
+    return annotations.split()
 
-    if len(gt) == 0:
-        raise ValueError('No ground truth images for evaluation')
 
-    # Add additional/transformed fields for evaluation processing
-    add_word_polygons(gt)
-    if is_linking:
-        add_group_info(gt, is_e2e=is_e2e, is_gt=True)
+class GroundTruth:
+    """Ground truth prepared once for several tasks (e.g., all four protocols
+    of a competition subset).
+
+    The Annotations of each image hold the word polygons, ignore flags and
+    texts; group unions and texts are constructed when a linking task first
+    asks for them, and kept (cf. Annotations). Each task's view of the images
+    (cf. task_view) shares the stores' columns and geometries, so that no
+    task copies or prepares the ground truth again.
+    """
+
+    def __init__( self, images: dict[str,Annotations] ):
+        """
+        Arguments
+          images : Annotations of each image (cf. load_ground_truth), which
+                     must have texts to serve end-to-end tasks
+        """
+        self.images = images
+        self.textless: Optional[dict[str,Annotations]] = None
+
+    def task_view( self, task: str ) -> dict[str,ImageData]:
+        """Return the ground truth of each image for a task, as given by
+        load_ground_truth for the task: the stores themselves for end-to-end
+        tasks, or else stores without texts (cf. Annotations.without_texts),
+        which are made on first use"""
+        if 'rec' in task:
+            if any( store.texts is None for store in self.images.values() ):
+                raise ValueError('Ground truth loaded without texts cannot serve task {}'.format(task))
+            return self.images
+        if self.textless is None:
+            self.textless = { img : store if store.texts is None
+                                    else store.without_texts()
+                              for (img,store) in self.images.items() }
+        return self.textless
+
+    def subset( self, img_keys: list[str] ) -> 'GroundTruth':
+        """Return the ground truth of some images (e.g., a shard), which
+        shares their stores"""
+        return GroundTruth( { img : self.images[img] for img in img_keys } )
+
+
+def load_ground_truth_tasks( gt_file: str,
+                             tasks: list[str],
+                             image_regex: Optional[str] = None,
+                             verify: bool = True ) -> GroundTruth:
+    """Load the ground truth file once for several tasks (cf. GroundTruth)
 
-    return gt
+    Arguments
+      gt_file : Path to the ground truth JSON file (see competition format)
+      tasks : Tasks to evaluate; texts are kept if any is end-to-end
+      image_regex : Regular expression to filter image keys (default=None)
+      verify : Whether to verify the ground truth file (default=True)
+    Returns
+      gt : Prepared ground truth, whose task_view gives each task's images
+    """
+    return GroundTruth( load_ground_truth( gt_file,
+                                           is_linking=any( 'link' in task
+                                                           for task in tasks ),
+                                           is_e2e=any( 'rec' in task
+                                                       for task in tasks ),
+                                           image_regex=image_regex,
+                                           verify=verify ) )
+
+
+def iter_predictions( preds_file: str,
+                      is_linking: bool,
+                      is_e2e: bool,
+                      image_regex: Optional[str] = None,
+                      image_keys: Optional[set[str]] = None ) \
+                      -> Iterator[Tuple[str,ImageData]]:
+    """ Incrementally load the predictions file and verify contents format,
+    preparing each image for evaluation as it is read, so that memory use is
+    bounded by the largest image rather than the whole file.
+
+    Arguments
+      preds_file : Path to the predictions JSON file (see competition format)
+      is_linking : Whether the evaluation includes linking
+      is_e2e: Whether the evaluation is end-to-end (i.e., includes recognition)
+      image_regex : Regular expression to filter image keys (default=None)
+      image_keys : Set of image keys to keep (default=None, i.e., all)
+    Returns
+      Iterator of (image id, list of groups) for each image kept, where the
+        groups are given as the image's Annotations. An image may recur
+        (logged), in which case its last entry supersedes the others, as in
+        load_predictions.
+    """
+    entries = iter_json_images( preds_file,
+                                partial(verify_predictions_format,
+                                        is_e2e=is_e2e),
+                                partial(verify_predictions_entry,
+                                        is_e2e=is_e2e),
+                                image_regex=image_regex,
+                                image_keys=image_keys )
+
+    seen = set()
+    for entry in entries:
+        if entry[0] in seen:
+            logging.warning('Duplicate image %s in predictions; its last entry is used', entry[0])
+        seen.add(entry[0])
+        # Columns of the image's groups (cf. Annotations); geometries and
+        # group fields are derived on demand for evaluation
+        annotations = build_annotations( [entry], is_gt=False, is_e2e=is_e2e )
+        yield entry[0], annotations
 
 
 def load_predictions( preds_file: str,
                       is_linking: bool,
                       is_e2e: bool,
-                      image_regex: Optional[str] = None ) \
+                      image_regex: Optional[str] = None,
+                      image_keys: Optional[set[str]] = None ) \
                       -> dict[str,ImageData]:
     """ Load the predictions file and verify contents format
 
@@ -320,32 +1345,18 @@ def load_predictions( preds_file: str,
       preds_file : Path to the predictions JSON file (see competition format)
       is_linking : Whether the evaluation includes linking
       is_e2e: Whether the evaluation is end-to-end (i.e., includes recognition)
+      image_regex : Regular expression to filter image keys (default=None)
+      image_keys : Set of image keys to keep (default=None, i.e., all)
     Returns
       preds : Dict indexed by the image id, giving the list of groups
     """
 
     logging.info('Loading predictions...')
 
-    with open(preds_file, encoding='utf-8') as fd:
-        preds_raw = json.load(fd)
-
-    verify_predictions_format(preds_raw, is_e2e)
-
-    # Re-index: image-->groups, wrapping group lists to dicts (for more fields)
-    preds = {}
-    regex = re.compile(image_regex) if image_regex else None
-    for entry in preds_raw:
-        if regex and not regex.match(entry['image']):  # Skip if no match
-            continue
-        groups = [ { 'words' : group } for group in entry['groups'] ]
-        preds[entry['image']] = groups
-
-    # Add additional/transformed fields for evaluation processing
-    add_word_polygons(preds)
-    if is_linking:
-        add_group_info(preds, is_e2e=is_e2e, is_gt=False)
-
-    return preds
+    # Re-index: image-->groups
+    return dict( iter_predictions( preds_file, is_linking, is_e2e,
+                                   image_regex=image_regex,
+                                   image_keys=image_keys ) )
 
 
 def calc_score_pairs( gt: Union[list[WordData],list[GroupData]],
@@ -355,7 +1366,8 @@ def calc_score_pairs( gt: Union[list[WordData],list[GroupData]],
                                           bool],
                       score_match: Callable[[Union[WordData,GroupData],
                                              Union[WordData,GroupData],float],
-                                            bool] ) \
+                                            bool],
+                      repair: bool = False ) \
                       -> Tuple[npt.NDArray[np.bool_],
                                npt.NDArray[np.double],
                                npt.NDArray[np.double]]:
@@ -371,6 +1383,8 @@ def calc_score_pairs( gt: Union[list[WordData],list[GroupData]],
       score_match: Function taking ground truth and predicted word dicts with
                     their pre-calculated iou score and returning their match
                     score (assumes they are valid matches)
+      repair: Whether to repair invalid shapes (cf. prepare_polygons)
+                (default=False)
     Returns
       allowed: MxN numpy bool array of can_match(g,d) correspondence candidates
       scores : MxN numpy float array of compatibility scores
@@ -392,10 +1406,20 @@ def calc_score_pairs( gt: Union[list[WordData],list[GroupData]],
     scores = -np.ones( (len(gt),len(pred)), dtype=np.double )
     ious = np.zeros( (len(gt),len(pred)), dtype=np.double )
 
+    # Repaired shapes replace the elements' own
+    gt_geoms = prepared_elements(gt, repair).geoms if repair else None
+    pred_geoms = prepared_elements(pred, repair).geoms if repair else None
+
+    def geometry( geoms: Optional[npt.NDArray[np.object_]], k: int,
+                  el: Union[WordData,GroupData] ):
+        """ Return the (repaired) geometry of the k-th element """
+        return element_geometry(el) if geoms is None else geoms[k]
+
     for i,gt_el in enumerate(gt):
         for j,pred_el in enumerate(pred):
             try:
-                the_iou = calc_iou( gt_el['geometry'], pred_el['geometry'])
+                the_iou = calc_iou( geometry(gt_geoms, i, gt_el),
+                                    geometry(pred_geoms, j, pred_el) )
             except shapely.errors.GEOSException as e:
                 logging.warning('Error at iou(%d,%d): %s}. Skipping ...',i,j,e)
                 continue
@@ -411,6 +1435,605 @@ def calc_score_pairs( gt: Union[list[WordData],list[GroupData]],
     return allowed,scores,ious
 
 
+def log_pair_errors( errors: list[Tuple[int,int,Exception]] ):
+    """Log the (ground truth, prediction) pairs whose IoU calculation raised
+    an error, and were skipped, in one warning"""
+    if errors:
+        (i,j,e) = errors[0]
+        logging.warning('Error at iou of %d pairs, e.g., iou(%d,%d): %s. '
+                        'Skipping ...', len(errors), i, j, e)
+
+
+def calc_pair_areas( gt: PreparedPolygons,
+                     pred: PreparedPolygons,
+                     cand_gt: npt.NDArray[np.intp],
+                     cand_pred: npt.NDArray[np.intp],
+                     analytic: bool = False ) \
+                     -> Tuple[npt.NDArray[np.double],
+                              npt.NDArray[np.double],
+                              npt.NDArray[np.bool_]]:
+    """Return the intersection and union areas of pairs of shapes.
+
+    Pairs of valid shapes are calculated with shapely's vectorized functions,
+    which give the same areas as calc_score_pairs. Pairs with an invalid shape
+    are calculated individually with shapely, so that they cannot spoil the
+    bulk calculation. Optionally, pairs of convex polygons are calculated
+    analytically instead: the intersection area by convex_intersection_areas,
+    and the union area as the sum of their areas less the intersection. These
+    areas may differ from shapely's in the last bits.
+
+    Arguments
+      gt, pred : Prepared shapes (cf. prepare_polygons)
+      cand_gt, cand_pred : Length K arrays of indices into gt and pred,
+                             respectively, giving the pairs
+      analytic : Whether to calculate the areas of convex pairs analytically
+                   (default=False)
+    Returns
+      intersection : Length K numpy float array of intersection areas
+      union : Length K numpy float array of union areas
+      valid : Length K numpy bool array indicating whether the calculation
+                succeeded. Pairs raising a GEOSException are logged.
+    """
+    intersection = np.zeros(len(cand_gt), dtype=np.double)
+    union = np.zeros(len(cand_gt), dtype=np.double)
+    valid = np.ones(len(cand_gt), dtype=np.bool_)
+
+    both_valid = np.logical_and( gt.valid[cand_gt], pred.valid[cand_pred] )
+    convex = np.zeros(len(cand_gt), dtype=np.bool_)
+    if analytic:
+        convex = np.logical_and( gt.convex[cand_gt], pred.convex[cand_pred] )
+        intersection[convex] = convex_intersection_areas(
+            gt.vertices[cand_gt[convex]], gt.num_vertices[cand_gt[convex]],
+            pred.vertices[cand_pred[convex]],
+            pred.num_vertices[cand_pred[convex]] )
+
+    bulk = np.flatnonzero( np.logical_and( ~convex, both_valid ) )
+    single = np.flatnonzero(~both_valid)
+    (gt_calc, pred_calc) = (gt.geoms[cand_gt[bulk]], pred.geoms[cand_pred[bulk]])
+    try:
+        intersection[bulk] = shapely.area(shapely.intersection(gt_calc, pred_calc))
+        union[bulk] = shapely.area(shapely.union(gt_calc, pred_calc))
+    except shapely.errors.GEOSException:
+        # Some shape spoils the bulk calculation; isolate it
+        single = np.union1d(single, bulk)
+    union[convex] = gt.areas[cand_gt[convex]] + pred.areas[cand_pred[convex]] \
+        - intersection[convex]
+
+    errors = []
+    for k in single:
+        (p,q) = (gt.geoms[cand_gt[k]], pred.geoms[cand_pred[k]])
+        try:
+            intersection[k] = p.intersection(q).area
+            union[k] = p.union(q).area
+        except shapely.errors.GEOSException as e:
+            errors.append( (cand_gt[k], cand_pred[k], e) )
+            valid[k] = False
+    log_pair_errors(errors)
+
+    return intersection, union, valid
+
+
+def convex_intersection_areas( subject: npt.NDArray[np.double],
+                               subject_counts: npt.NDArray[np.intp],
+                               clip: npt.NDArray[np.double],
+                               clip_counts: npt.NDArray[np.intp] ) \
+                               -> npt.NDArray[np.double]:
+    """Return the intersection areas of pairs of convex polygons.
+
+    Each subject polygon is clipped by the half-plane of each edge of its clip
+    polygon in turn (the Sutherland-Hodgman algorithm), for all pairs at once,
+    and the areas of the clipped polygons are given by the shoelace formula.
+    Polygons are padded to a common number of vertices by repeating their
+    first vertex, which only adds edges of zero length: a padding vertex is
+    clipped like the vertex it repeats (and dropped), and every point is
+    inside the half-plane of a zero-length clip edge. Points on an edge are
+    inside its half-plane. Coordinates are taken relative to each subject's first vertex,
+    to preserve precision.
+
+    Arguments
+      subject, clip : Arrays of shape (K,S,2) and (K,C,2) of the vertices of
+                        each pair's convex polygons, padded by repeating their
+                        first vertex (cf. PreparedPolygons.vertices)
+      subject_counts, clip_counts : Length K arrays of the polygons' numbers
+                                      of vertices
+    Returns
+      areas : Length K numpy float array of intersection areas
+    """
+    num_pairs = len(subject)
+    if num_pairs == 0:
+        return np.zeros(0, dtype=np.double)
+    if num_pairs > CONVEX_CHUNK_SIZE:  # Keep the working arrays in cache
+        return np.concatenate( [ convex_intersection_areas(
+            subject[k:k+CONVEX_CHUNK_SIZE], subject_counts[k:k+CONVEX_CHUNK_SIZE],
+            clip[k:k+CONVEX_CHUNK_SIZE], clip_counts[k:k+CONVEX_CHUNK_SIZE] )
+                                 for k in range(0,num_pairs,CONVEX_CHUNK_SIZE) ] )
+
+    def complex_points( vertices: npt.NDArray[np.double], count: int ) \
+                        -> npt.NDArray[np.complex128]:
+        """The first count vertices of each polygon as complex numbers"""
+        return vertices[:,:count,0] + 1j*vertices[:,:count,1]
+
+    def cross( u: npt.NDArray[np.complex128], v: npt.NDArray[np.complex128] ) \
+               -> npt.NDArray[np.double]:
+        """Cross products of vectors given as complex numbers"""
+        return (np.conj(u) * v).imag
+
+    points = complex_points( subject, int(subject_counts.max()) )
+    origin = points[:,:1]
+    points = points - origin
+    clip = complex_points( clip, int(clip_counts.max()) ) - origin
+    following = np.roll(clip, -1, axis=1)
+
+    # Orientation of the clip polygons, so that inside is to the left
+    orientation = np.sign( np.sum( cross(clip, following), axis=1 ) )
+    rows = np.arange(num_pairs)
+
+    for e in range(clip.shape[1]):
+        (a, b) = (clip[:,e,None], following[:,e,None])
+        side = orientation[:,None] * cross( b-a, points-a )
+        (next_points, next_side) = ( np.roll(points, -1, axis=1),
+                                     np.roll(side, -1, axis=1) )
+        (inside, next_inside) = (side >= 0, next_side >= 0)
+        crossing = inside != next_inside
+        # Each vertex is kept if inside (and not repeated by the next vertex,
+        # e.g., padding), followed by the crossing of its edge
+        t = side / np.where(crossing, side - next_side, 1.0)
+        width = points.shape[1]
+        output = np.empty( (num_pairs,2*width), dtype=np.complex128 )
+        output[:,0::2] = points
+        output[:,1::2] = points + t * (next_points - points)
+        keep = np.empty( (num_pairs,2*width), dtype=np.bool_ )
+        keep[:,0::2] = np.logical_and( inside, ~np.logical_and(
+            points == next_points, next_inside ) )
+        keep[:,1::2] = crossing
+        counts = np.count_nonzero(keep, axis=1)
+        # Row-major order of the masks keeps each polygon's vertices in order
+        first = output[ rows, np.argmax(keep, axis=1) ]
+        points = np.repeat( first[:,None], max(counts.max(),1), axis=1 )
+        points[ np.arange(points.shape[1]) < counts[:,None] ] = output[keep]
+
+    return 0.5 * np.abs( np.sum( cross(points, np.roll(points, -1, axis=1)),
+                                 axis=1 ) )
+
+
+def calc_candidate_ious( gt: Union[list[WordData],list[GroupData]],
+                         pred: Union[list[WordData],list[GroupData]],
+                         repair: bool = False,
+                         analytic: bool = False,
+                         aggregate: bool = False ) \
+                         -> Tuple[npt.NDArray[np.intp],
+                                  npt.NDArray[np.intp],
+                                  npt.NDArray[np.double]]:
+    """Return the IoU between all intersecting pairs of shapes.
+
+    The geometries are prepared first (cf. prepare_polygons). Candidate
+    pairs are found by a bulk query of the ground truth geometries against a
+    spatial index (STRtree) of the predicted geometries; degenerate shapes,
+    whose IoU is zero, never enter the query. The candidates' intersection and
+    union areas are calculated in bulk (cf. calc_pair_areas), so
+    non-intersecting pairs are never visited individually. Groups are handled
+    by calc_candidate_group_ious.
+
+    Arguments
+      gt :  List of dicts containing ground truth elements (each has the field
+           'geometry' among others).
+      pred : List of dicts containing predicted elements (each has the field
+             'geometry' among others).
+      repair : Whether to repair invalid shapes (cf. prepare_polygons)
+                 (default=False)
+      analytic : Whether to calculate the areas of convex pairs analytically
+                   (cf. calc_pair_areas) (default=False)
+      aggregate : Whether to derive the areas of pairs of simple groups from
+                    their words' areas (cf. calc_candidate_group_ious)
+                    (default=False)
+    Returns
+      cand_gt : Length K numpy array of values in [0,M) indicating the ground
+                  truth element of each candidate pair
+      cand_pred : Length K numpy array of values in [0,N) indicating the
+                    predicted element of each candidate pair
+      cand_ious : Length K numpy float array of the candidate pairs' IoU values
+
+      where M is len(gt) and N is len(pred). Pairs whose IoU calculation
+      raises a GEOSException are logged and excluded from the candidates.
+    """
+    if len(gt)==0 or len(pred)==0:
+        return ( np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp),
+                 np.zeros(0, dtype=np.double) )
+
+    if 'words' in gt[0]:
+        return calc_candidate_group_ious( gt, pred, repair, analytic,
+                                          aggregate )
+
+    gt_prep = prepared_elements(gt, repair)
+    pred_prep = prepared_elements(pred, repair)
+
+    # Pairs with a degenerate shape have zero IoU (cf. calc_score_pairs)
+    gt_query = np.flatnonzero(~gt_prep.degenerate)
+    pred_query = np.flatnonzero(~pred_prep.degenerate)
+    tree = shapely.STRtree(pred_prep.geoms[pred_query])
+    cand_gt,cand_pred = tree.query(gt_prep.geoms[gt_query], predicate='intersects')
+    cand_gt,cand_pred = gt_query[cand_gt], pred_query[cand_pred]
+
+    intersection, union, valid = calc_pair_areas( gt_prep, pred_prep,
+                                                  cand_gt, cand_pred, analytic )
+    cand_ious = intersection / (union + POLY_EPSILON)
+
+    return cand_gt[valid], cand_pred[valid], cand_ious[valid]
+
+
+def group_words( groups: list[GroupData],
+                 repair: bool = False ) \
+                 -> Tuple[PreparedPolygons, npt.NDArray[np.intp]]:
+    """Return the prepared polygons of all words in a list of groups (cf.
+    prepare_polygons) and the index of the group containing each word"""
+    if isinstance(groups, Annotations):  # Directly from the columns
+        return ( groups.prepared_words(repair),
+                 np.repeat( np.arange(len(groups)),
+                            np.diff(groups.group_offsets) ) )
+    geoms = np.array( [ word['geometry'] for group in groups
+                        for word in group['words'] ], dtype=object )
+    membership = np.repeat( np.arange(len(groups)),
+                            [ len(group['words']) for group in groups ] )
+    return prepare_polygons(geoms, repair), membership
+
+
+def simple_groups( geoms: npt.NDArray[np.object_],
+                   membership: npt.NDArray[np.intp],
+                   num_groups: int,
+                   valid: Optional[npt.NDArray[np.bool_]] = None,
+                   degenerate: Optional[npt.NDArray[np.bool_]] = None ) \
+                   -> npt.NDArray[np.bool_]:
+    """Return whether each group is simple, i.e., its words' polygons are valid
+    and nondegenerate (cf. prepare_polygons) and no two of them overlap (with
+    positive area), so that the area of the group's union is the sum of its
+    words' areas.
+
+    Arguments
+      geoms : Array of word polygons
+      membership : Array of the group index of each word (cf. group_words)
+      num_groups : Number of groups
+      valid : Array of whether each word polygon is valid (default=None, i.e.,
+                check them)
+      degenerate : Array of whether each word polygon is degenerate
+                     (default=None, i.e., check them)
+    Returns
+      simple : Length num_groups numpy bool array
+    """
+    simple = np.ones(num_groups, dtype=np.bool_)
+    if valid is None:
+        valid = shapely.is_valid(geoms)
+    if degenerate is None:
+        degenerate = shapely.area(geoms) < POLY_EPSILON
+    simple[membership[~valid]] = False
+    simple[membership[degenerate]] = False
+
+    tree = shapely.STRtree(geoms)
+    (a,b) = tree.query(geoms, predicate='intersects')
+    same = np.logical_and( a < b, membership[a] == membership[b] )
+    same = np.logical_and( same, np.logical_and( valid[a], valid[b] ) )
+    (a,b) = (a[same], b[same])
+    try:  # Overlapping interiors (a predicate, cheaper than intersecting)
+        overlap = shapely.relate_pattern(geoms[a], geoms[b], 'T********')
+    except shapely.errors.GEOSException:
+        overlap = np.ones(len(a), dtype=np.bool_)  # Unknown; treat as overlap
+    simple[membership[a[overlap]]] = False
+
+    return simple
+
+
+def group_unions( groups: list[GroupData],
+                  words: PreparedPolygons,
+                  membership: npt.NDArray[np.intp],
+                  indices: npt.NDArray[np.intp],
+                  unions: Optional[npt.NDArray[np.object_]] = None ) \
+                  -> npt.NDArray[np.object_]:
+    """Return the exact unions of the words of some groups (cf.
+    element_geometry), or of their repaired words.
+
+    Arguments
+      groups : List of groups
+      words, membership : Prepared polygons of the groups' words, and the
+                            group of each (cf. group_words)
+      indices : Array of the indices of the groups to unite
+      unions : Array of unions to complete (default=None, i.e., none yet)
+    Returns
+      unions : Array of the unions of the groups (None for the other groups,
+                 and where the union raises a GEOSException, which is logged)
+    """
+    if unions is None:
+        unions = np.empty(len(groups), dtype=object)
+    word_offsets = np.searchsorted( membership, np.arange(len(groups)+1) )
+    for i in np.unique(indices):
+        if unions[i] is not None:
+            continue
+        (w0,w1) = word_offsets[i:i+2]
+        try:
+            if np.any(words.repaired[w0:w1]):
+                unions[i] = shapely.unary_union(words.geoms[w0:w1])
+            else:
+                unions[i] = element_geometry(groups[i])
+        except shapely.errors.GEOSException as e:
+            logging.warning('Error at union of group %d: %s. Skipping ...',
+                            i, e)
+    return unions
+
+
+def calc_candidate_group_ious( gt: list[GroupData],
+                               pred: list[GroupData],
+                               repair: bool = False,
+                               analytic: bool = False,
+                               aggregate: bool = False ) \
+                               -> Tuple[npt.NDArray[np.intp],
+                                        npt.NDArray[np.intp],
+                                        npt.NDArray[np.double]]:
+    """Return the IoU between all intersecting pairs of groups.
+
+    A simple group (cf. simple_groups) intersects a shape when any of its
+    words does, so candidates are found by querying the words of simple
+    groups, and the exact unions of other groups' words (cf. group_unions),
+    against a spatial index of the same. The candidates' areas are those of
+    the exact unions of their groups' words (cf. calc_pair_areas).
+
+    Optionally (aggregate), the areas of pairs of simple groups are derived
+    from word-level areas instead, which are calculated once: a group's area
+    is the sum of its words' areas, and the intersection area of two groups is
+    the sum of their word pairs' intersection areas (analytic for convex word
+    pairs, if analytic). Only pairs involving a group whose words overlap (or
+    are invalid, e.g., degenerate) then use the exact unions. These areas may
+    differ from the exact ones in the last bits.
+
+    Arguments and return values are the same as calc_candidate_ious.
+    """
+    gt_words, gt_membership = group_words(gt, repair)
+    pred_words, pred_membership = group_words(pred, repair)
+
+    if len(gt_words)==0 or len(pred_words)==0:
+        return ( np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp),
+                 np.zeros(0, dtype=np.double) )
+
+    def groups_simple( groups: list[GroupData], words: PreparedPolygons,
+                       membership: npt.NDArray[np.intp] ) \
+                       -> npt.NDArray[np.bool_]:
+        """simple_groups, which a store checks once"""
+        if isinstance(groups, Annotations):
+            return groups.simple_groups(repair)
+        return simple_groups( words.geoms, membership, len(groups),
+                              words.valid, words.degenerate )
+
+    def query_items( simple: npt.NDArray[np.bool_], words: PreparedPolygons,
+                     membership: npt.NDArray[np.intp],
+                     unions: npt.NDArray[np.object_] ) \
+                     -> Tuple[npt.NDArray[np.object_], npt.NDArray[np.intp],
+                              npt.NDArray[np.intp]]:
+        """Return the shapes whose intersections give the candidates: the
+        words of simple groups and the (available) unions of other groups,
+        with the group and the word (or -1) of each"""
+        word_items = np.flatnonzero(simple[membership])
+        union_items = np.flatnonzero( np.logical_and(
+            ~simple, ~shapely.is_missing(unions) ) )
+        return ( np.concatenate( [ words.geoms[word_items],
+                                   unions[union_items] ] ),
+                 np.concatenate( [ membership[word_items], union_items ] ),
+                 np.concatenate( [ word_items,
+                                   -np.ones(len(union_items), dtype=np.intp) ] ) )
+
+    gt_simple = groups_simple(gt, gt_words, gt_membership)
+    pred_simple = groups_simple(pred, pred_words, pred_membership)
+    gt_group_unions = group_unions( gt, gt_words, gt_membership,
+                                    np.flatnonzero(~gt_simple) )
+    pred_group_unions = group_unions( pred, pred_words, pred_membership,
+                                      np.flatnonzero(~pred_simple) )
+
+    (gt_items, gt_item_group, gt_item_word) = \
+        query_items( gt_simple, gt_words, gt_membership, gt_group_unions )
+    (pred_items, pred_item_group, pred_item_word) = \
+        query_items( pred_simple, pred_words, pred_membership,
+                     pred_group_unions )
+    tree = shapely.STRtree(pred_items)
+    item_gt,item_pred = tree.query(gt_items, predicate='intersects')
+
+    # Group pairs of the intersecting items
+    (cand_pairs, item_cand) = np.unique( gt_item_group[item_gt] * len(pred) +
+                                         pred_item_group[item_pred],
+                                         return_inverse=True )
+    (cand_gt, cand_pred) = np.divmod(cand_pairs, len(pred))
+    item_cand = item_cand.ravel()
+
+    simple = np.logical_and( gt_simple[cand_gt], pred_simple[cand_pred] )
+    if not aggregate:  # Exact unions throughout
+        simple[:] = False
+
+    gt_areas = np.bincount( gt_membership, weights=gt_words.areas,
+                            minlength=len(gt) )[cand_gt]
+    pred_areas = np.bincount( pred_membership, weights=pred_words.areas,
+                              minlength=len(pred) )[cand_pred]
+    intersection = np.zeros(len(cand_pairs), dtype=np.double)
+    union = np.zeros(len(cand_pairs), dtype=np.double)
+    valid = np.ones(len(cand_pairs), dtype=np.bool_)
+
+    # Simple pairs (whose items are words): aggregate the word pairs'
+    # intersection areas
+    words_simple = np.flatnonzero(simple[item_cand])
+    (simple_gt, simple_pred) = ( gt_item_word[item_gt[words_simple]],
+                                 pred_item_word[item_pred[words_simple]] )
+    convex = np.zeros(len(words_simple), dtype=np.bool_)
+    if analytic:
+        convex = np.logical_and( gt_words.convex[simple_gt],
+                                 pred_words.convex[simple_pred] )
+    word_intersection = np.zeros(len(words_simple), dtype=np.double)
+    word_intersection[convex] = convex_intersection_areas(
+        gt_words.vertices[simple_gt[convex]],
+        gt_words.num_vertices[simple_gt[convex]],
+        pred_words.vertices[simple_pred[convex]],
+        pred_words.num_vertices[simple_pred[convex]] )
+    try:
+        word_intersection[~convex] = shapely.area(
+            shapely.intersection( gt_words.geoms[simple_gt[~convex]],
+                                  pred_words.geoms[simple_pred[~convex]] ) )
+        intersection += np.bincount( item_cand[words_simple],
+                                     weights=word_intersection,
+                                     minlength=len(cand_pairs) )
+        union[simple] = gt_areas[simple] + pred_areas[simple] \
+            - intersection[simple]
+    except shapely.errors.GEOSException:
+        simple[:] = False  # Use exact unions throughout
+
+    # Other pairs: exact unions of the groups' words
+    exact = np.flatnonzero(~simple)
+    gt_unions = prepare_polygons( group_unions( gt, gt_words, gt_membership,
+                                                cand_gt[exact],
+                                                gt_group_unions ), repair )
+    pred_unions = prepare_polygons( group_unions( pred, pred_words,
+                                                  pred_membership,
+                                                  cand_pred[exact],
+                                                  pred_group_unions ), repair )
+    unioned = ~np.logical_or( gt_unions.missing[cand_gt[exact]],
+                              pred_unions.missing[cand_pred[exact]] )
+    valid[exact[~unioned]] = False
+    exact = exact[unioned]
+    gt_areas[exact] = gt_unions.areas[cand_gt[exact]]
+    pred_areas[exact] = pred_unions.areas[cand_pred[exact]]
+
+    # Pairs with a degenerate shape have zero IoU (cf. calc_score_pairs)
+    nondegenerate = np.logical_and( gt_areas >= POLY_EPSILON,
+                                    pred_areas >= POLY_EPSILON )
+    exact = exact[nondegenerate[exact]]
+    intersection[exact], union[exact], valid[exact] = \
+        calc_pair_areas( gt_unions, pred_unions,
+                         cand_gt[exact], cand_pred[exact], analytic )
+
+    cand_ious = np.zeros(len(cand_pairs), dtype=np.double)
+    calc = np.logical_and(nondegenerate, valid)
+    cand_ious[calc] = intersection[calc] / (union[calc] + POLY_EPSILON)
+
+    return cand_gt[valid], cand_pred[valid], cand_ious[valid]
+
+
+def calc_score_pairs_indexed( gt: Union[list[WordData],list[GroupData]],
+                              pred: Union[list[WordData],list[GroupData]],
+                              can_match: Callable[[Union[WordData,GroupData],
+                                                   Union[WordData,GroupData],
+                                                   float],
+                                                  bool],
+                              score_match: Callable[[Union[WordData,GroupData],
+                                                     Union[WordData,GroupData],
+                                                     float],
+                                                    bool],
+                              repair: bool = False,
+                              analytic: bool = False,
+                              aggregate: bool = False ) \
+                              -> Tuple[npt.NDArray[np.bool_],
+                                       npt.NDArray[np.double],
+                                       npt.NDArray[np.double]]:
+    """Return the correspondence score and IoU between all pairs of shapes.
+
+    Drop-in replacement for calc_score_pairs that only visits intersecting
+    pairs (cf. calc_candidate_ious). Pairs that do not intersect have zero IoU,
+    which is assumed never to satisfy can_match (i.e., a non-negative IoU
+    threshold), so their entries keep the default values. The detection
+    protocol (det_valid and pq_score) is applied to all candidates in bulk.
+
+    Arguments and return values are the same as calc_score_pairs, and
+    analytic and aggregate are those of calc_candidate_ious.
+    """
+    cand_gt, cand_pred, cand_ious = calc_candidate_ious( gt, pred, repair,
+                                                         analytic, aggregate )
+
+    if isinstance(can_match, partial) and can_match.func is det_valid and \
+      score_match in (pq_score, pcq_score):  # Bulk equivalent of the loop below
+        cand_allowed = cand_ious > can_match.keywords['match_thresh']
+        ignore = np.array( [ bool(el['ignore']) for el in gt ], dtype=np.bool_ )
+        if score_match is pq_score:
+            cand_scores = np.where( ignore[cand_gt], IGNORE_EPSILON, cand_ious )
+        else:  # Score the texts of all allowed pairs in one batch
+            cand_scores = np.full( len(cand_gt), IGNORE_EPSILON )
+            scored = np.flatnonzero( np.logical_and( cand_allowed,
+                                                     ~ignore[cand_gt] ) )
+            gt_texts = { i : gt[i]['text'] for i in np.unique(cand_gt[scored]) }
+            pred_texts = { j : pred[j]['text']
+                           for j in np.unique(cand_pred[scored]) }
+            cand_scores[scored] = cand_ious[scored] * str_scores(
+                [ gt_texts[i] for i in cand_gt[scored] ],
+                [ pred_texts[j] for j in cand_pred[scored] ] )
+    else:
+        cand_allowed = np.zeros( len(cand_gt), dtype=np.bool_ )
+        cand_scores = -np.ones( len(cand_gt), dtype=np.double )
+        for (k,(i,j,the_iou)) in enumerate(zip(cand_gt,cand_pred,cand_ious)):
+            cand_allowed[k] = can_match( gt[i], pred[j], the_iou)
+
+            if cand_allowed[k]:
+                cand_scores[k] = score_match( gt[i], pred[j], the_iou)
+
+    return candidate_matrices( (len(gt),len(pred)), cand_gt, cand_pred,
+                               cand_ious, cand_allowed, cand_scores )
+
+
+def candidate_matrices( shape: Tuple[int,int],
+                        cand_gt: npt.NDArray[np.intp],
+                        cand_pred: npt.NDArray[np.intp],
+                        cand_ious: npt.NDArray[np.double],
+                        cand_allowed: npt.NDArray[np.bool_],
+                        cand_scores: npt.NDArray[np.double] ) \
+                        -> Tuple[Any,Any,Any]:
+    """Assemble the allowed, scores, and ious matrices of calc_score_pairs
+    from the values of the candidate pairs; other pairs are not allowed and
+    have zero IoU.
+
+    The matrices are dense numpy arrays, unless there are at least
+    SPARSE_MIN_PAIRS pairs, at most SPARSE_MAX_DENSITY of which are
+    candidates. Then they are scipy.sparse CSR matrices, whose memory is
+    linear in the number of candidates; the scores of allowed pairs are
+    stored (even when zero), and other entries of scores are meaningless.
+
+    Arguments
+      shape : Tuple of the numbers of ground truth and predicted elements
+      cand_gt, cand_pred, cand_ious : Candidate pairs (cf. calc_candidate_ious)
+      cand_allowed : Length K numpy bool array of can_match for the candidates
+      cand_scores : Length K numpy float array of score_match for the
+                      candidates (only those allowed are used)
+    Returns
+      allowed : MxN bool matrix of can_match correspondence candidates
+      scores : MxN float matrix of match candidate scores
+      ious : MxN float matrix of IoU scores
+    """
+    num_pairs = shape[0]*shape[1]
+    if num_pairs >= SPARSE_MIN_PAIRS and \
+       len(cand_gt) <= SPARSE_MAX_DENSITY*num_pairs:
+        allowed_gt = cand_gt[cand_allowed]
+        allowed_pred = cand_pred[cand_allowed]
+        allowed = scipy.sparse.csr_matrix(
+            ( np.ones(len(allowed_gt), dtype=np.bool_),
+              (allowed_gt,allowed_pred) ), shape=shape )
+        scores = scipy.sparse.csr_matrix(
+            ( cand_scores[cand_allowed], (allowed_gt,allowed_pred) ),
+            shape=shape )
+        ious = scipy.sparse.csr_matrix( (cand_ious, (cand_gt,cand_pred)),
+                                        shape=shape )
+        return allowed,scores,ious
+
+    allowed = np.zeros( shape, dtype=np.bool_ )
+    scores = -np.ones( shape, dtype=np.double )
+    ious = np.zeros( shape, dtype=np.double )
+
+    ious[cand_gt,cand_pred] = cand_ious
+    allowed[cand_gt,cand_pred] = cand_allowed
+    scores[cand_gt[cand_allowed],cand_pred[cand_allowed]] = \
+        cand_scores[cand_allowed]
+
+    return allowed,scores,ious
+
+
+# Pair scoring engines available to evaluate_image (cf. --pair-engine). The
+# areas of the convex engine (analytic areas of convex pairs) and the aggregate
+# engine (group areas from word areas) may differ from the others' in the last
+# bits.
+PAIR_ENGINES = { 'loop'      : calc_score_pairs,
+                 'strtree'   : calc_score_pairs_indexed,
+                 'convex'    : partial(calc_score_pairs_indexed, analytic=True),
+                 'aggregate' : partial(calc_score_pairs_indexed,
+                                       analytic=True, aggregate=True) }
+
+
 def get_stats( num_tp: Number, num_gt: Number, num_pred: Number, tot_iou: Number,
                prefix: str = '') -> dict[str,float] :
     """Calculate statistics: recall, precision, fscore, tightness, and quality
@@ -472,13 +2095,40 @@ def get_final_stats(totals: dict[str,Number],
     return final_stats
 
 
-def find_matches(allowable: npt.NDArray[np.bool_],
-                 scores: npt.NDArray[np.double],
-                 ious: npt.NDArray[np.double] ) \
-                 -> Tuple[npt.NDArray[np.uint],
-                          npt.NDArray[np.uint],
-                          npt.NDArray[np.double]]:
-    """Optimize the bipartite matches and filter them to allowable matches.
+def get_sweep_auc(thresholds: list[float],
+                  final_stats: list[dict[str,Number]]) -> dict[str,float] :
+    """Summarize final statistics over a sweep of IoU thresholds by the
+    area under each statistic's curve.
+
+    Arguments
+      thresholds : Increasing list of the IoU thresholds in the sweep
+      final_stats : List of the final statistics (cf. get_final_stats) at each
+                      threshold
+    Returns
+      dict containing the trapezoidal area under the curve of each statistic,
+        normalized by the range of thresholds (i.e., the average value), or
+        the value itself when there is only one threshold
+    """
+    x = np.asarray(thresholds, dtype=np.double)
+    auc = {}
+    for key in final_stats[0].keys():
+        y = np.asarray([ stats[key] for stats in final_stats ], dtype=np.double)
+        if len(x) > 1:
+            area = np.sum( (y[1:] + y[:-1]) * np.diff(x) ) / 2.0
+            auc[key] = float(area / (x[-1] - x[0]))
+        else:
+            auc[key] = float(y[0])
+    return auc
+
+
+def find_matches_dense(allowable: npt.NDArray[np.bool_],
+                       scores: npt.NDArray[np.double],
+                       ious: npt.NDArray[np.double] ) \
+                       -> Tuple[npt.NDArray[np.uint],
+                                npt.NDArray[np.uint],
+                                npt.NDArray[np.double]]:
+    """Optimize the bipartite matches over the full score matrix and filter
+    them to allowable matches.
     Parameters
       allowable:      MxN numpy bool array of valid correspondence candidates
       scores:         MxN numpy float array of match candidate scores
@@ -492,8 +2142,9 @@ def find_matches(allowable: npt.NDArray[np.bool_],
                       matches_gt)
       matches_ious: Length T numpy array of matches' values from ious
     """
-    matches_gt,matches_pred = \
-        scipy.optimize.linear_sum_assignment(scores, maximize=True)
+    with profile_stage('assignment'):
+        matches_gt,matches_pred = \
+            scipy.optimize.linear_sum_assignment(scores, maximize=True)
 
     # A maximal bipartite matching, which scipy linear sum assignment algorithm
     # appears to give, may include non-allowable matchings due to lack of
@@ -509,6 +2160,228 @@ def find_matches(allowable: npt.NDArray[np.bool_],
     return matches_gt, matches_pred, matches_ious
 
 
+def sparse_values( matrix: Any,
+                   rows: npt.NDArray[np.intp],
+                   cols: npt.NDArray[np.intp] ) -> npt.NDArray:
+    """Return the entries of a scipy.sparse matrix at pairs of indices as a
+    flat numpy array"""
+    if len(rows) == 0:  # Indexing gives a sparse matrix
+        return np.zeros( 0, dtype=matrix.dtype )
+    return np.asarray( matrix[rows,cols] ).ravel()
+
+
+def find_matches_sparse(allowable: Any, scores: Any ) \
+                        -> Tuple[npt.NDArray[np.intp], npt.NDArray[np.intp]]:
+    """Optimize the bipartite matches among allowable pairs of sparse
+    matrices, with the same optimum as find_matches_dense.
+
+    A full assignment over the dense score matrix maximizes the total weight
+    (score+1) of its allowable matches (cf. find_matches), i.e., it is a
+    maximum weight matching in the graph of allowable pairs. That is solved
+    as a minimum weight full matching in a square graph, which adds a dummy
+    partner for leaving each row (or column) unmatched, and dummy edges
+    pairing the dummies of allowable pairs. Each edge of a full matching in
+    it costs C, less the weight of an allowable match, so the matching of
+    least cost has the greatest total weight.
+
+    Parameters
+      allowable:      MxN scipy.sparse bool matrix of valid correspondence
+                        candidates
+      scores:         MxN scipy.sparse float matrix of match candidate scores
+    Returns
+      matches_gt:   Length T numpy array of values in [0,M) indicating ground
+                      truth element matched, in increasing order
+      matches_pred: Length T numpy array of values in [0,N) indicating
+                      predicted element matched (corresponds to entries in
+                      matches_gt)
+    """
+    num_rows, num_cols = allowable.shape
+    pairs = scipy.sparse.coo_matrix(allowable)
+    pairs.eliminate_zeros()
+    rows, cols = pairs.row.astype(np.intp), pairs.col.astype(np.intp)
+    weights = sparse_values( scores, rows, cols ) + 1.0
+    cost = weights.max(initial=1.0) + 1.0  # Keeps every edge's cost positive
+
+    # Rows: allowable rows, then dummies of the columns
+    # Columns: allowable columns, then dummies of the rows
+    row_dummies = np.arange(num_rows, dtype=np.intp)
+    col_dummies = np.arange(num_cols, dtype=np.intp)
+    graph = scipy.sparse.csr_matrix(
+        ( np.concatenate( [ cost - weights,
+                            np.full(num_rows+num_cols+len(rows), cost) ] ),
+          ( np.concatenate( [ rows, row_dummies,
+                              num_rows + col_dummies, num_rows + cols ] ),
+            np.concatenate( [ cols, num_cols + row_dummies,
+                              col_dummies, num_cols + rows ] ) ) ),
+        shape=(num_rows+num_cols, num_cols+num_rows) )
+
+    with profile_stage('assignment'):
+        graph_rows, graph_cols = \
+            scipy.sparse.csgraph.min_weight_full_bipartite_matching(graph)
+
+    is_match = np.logical_and( graph_rows < num_rows, graph_cols < num_cols )
+    matches_gt = graph_rows[is_match].astype(np.intp)
+    matches_pred = graph_cols[is_match].astype(np.intp)
+    order = np.argsort(matches_gt)
+
+    return matches_gt[order], matches_pred[order]
+
+
+def find_matches(allowable: Any,
+                 scores: Any,
+                 ious: Any ) \
+                 -> Tuple[npt.NDArray[np.uint],
+                          npt.NDArray[np.uint],
+                          npt.NDArray[np.double]]:
+    """Optimize the bipartite matches and filter them to allowable matches.
+
+    Because a full assignment over the dense score matrix (cf.
+    find_matches_dense) maximizes the total of (score+1) among its allowable
+    matches, the problem separates over the connected components of the
+    bipartite graph of allowable correspondences. Rows and columns without
+    any allowable partner are dropped, components consisting of a single
+    pair are matched directly, and each remaining component is solved as a
+    small block. The optimum is therefore the same as that of
+    find_matches_dense (up to the choice among equally-scored alternatives).
+
+    The matrices may be sparse (cf. candidate_matrices), in which case
+    components with at least SPARSE_MIN_PAIRS pairs are solved without
+    forming their dense blocks (cf. find_matches_sparse).
+
+    Parameters
+      allowable:      MxN numpy bool array of valid correspondence candidates
+                        (or scipy.sparse matrix)
+      scores:         MxN numpy float array of match candidate scores (or
+                        scipy.sparse matrix)
+      ious:           MxN numpy float array of IoU scores (or scipy.sparse
+                        matrix)
+    Returns
+      matches_gt:   Length T numpy array of values in [0,M) indicating ground
+                      truth element matched (corresponds to entries in
+                      matches_pred), in increasing order
+      matches_pred: Length T numpy array of values in [0,N) indicating
+                      predicted element matched (corresponds to entries in
+                      matches_gt)
+      matches_ious: Length T numpy array of matches' values from ious
+    """
+    is_sparse = scipy.sparse.issparse(allowable)
+    if is_sparse:
+        allowable = scipy.sparse.csr_matrix(allowable)
+        allowable.eliminate_zeros()
+        scores = scipy.sparse.csr_matrix(scores)
+        ious = scipy.sparse.csr_matrix(ious)
+        rows = np.flatnonzero(allowable.getnnz(axis=1))
+        cols = np.flatnonzero(allowable.getnnz(axis=0))
+    else:
+        rows = np.flatnonzero(np.any(allowable, axis=1))
+        cols = np.flatnonzero(np.any(allowable, axis=0))
+
+    def match_ious( matches_gt: npt.NDArray[np.intp],
+                    matches_pred: npt.NDArray[np.intp] ) \
+                    -> npt.NDArray[np.double]:
+        """Values of ious at the matches"""
+        if is_sparse:
+            return sparse_values( ious, matches_gt, matches_pred )
+        return ious[matches_gt,matches_pred]
+
+    if len(rows)==0:
+        matches_gt = np.zeros(0, dtype=np.intp)
+        matches_pred = np.zeros(0, dtype=np.intp)
+        return matches_gt, matches_pred, match_ious(matches_gt,matches_pred)
+
+    # Label the connected components of the bipartite graph, whose vertices
+    # are the rows followed by the columns
+    if is_sparse:
+        biadjacency = allowable[rows][:,cols]
+    else:
+        biadjacency = scipy.sparse.csr_matrix(allowable[np.ix_(rows,cols)])
+    adjacency = scipy.sparse.bmat( [[None, biadjacency],
+                                    [biadjacency.T, None]] )
+    num_components, labels = scipy.sparse.csgraph.connected_components(
+        adjacency, directed=False)
+    row_labels = labels[:len(rows)]
+    col_labels = labels[len(rows):]
+
+    row_counts = np.bincount(row_labels, minlength=num_components)
+    col_counts = np.bincount(col_labels, minlength=num_components)
+
+    # Components with exactly one allowable pair need no optimization
+    is_single = np.logical_and(row_counts==1, col_counts==1)
+    row_of_label = np.zeros(num_components, dtype=np.intp)
+    col_of_label = np.zeros(num_components, dtype=np.intp)
+    row_of_label[row_labels] = rows
+    col_of_label[col_labels] = cols
+    single_labels = np.flatnonzero(is_single)
+
+    matches_gt = [ row_of_label[single_labels] ]
+    matches_pred = [ col_of_label[single_labels] ]
+
+    # Solve each remaining component separately
+    row_blocks = np.split( rows[np.argsort(row_labels, kind='stable')],
+                           np.cumsum(row_counts)[:-1] )
+    col_blocks = np.split( cols[np.argsort(col_labels, kind='stable')],
+                           np.cumsum(col_counts)[:-1] )
+
+    if is_sparse:  # Gather the allowable pairs of each component
+        pairs = scipy.sparse.coo_matrix(allowable)
+        pair_rows = pairs.row.astype(np.intp)
+        pair_cols = pairs.col.astype(np.intp)
+        pair_scores = sparse_values( scores, pair_rows, pair_cols )
+        label_of_row = np.zeros( allowable.shape[0], dtype=np.intp )
+        label_of_row[rows] = row_labels
+        pair_labels = label_of_row[pair_rows]
+        pair_blocks = np.split( np.argsort(pair_labels, kind='stable'),
+                                np.cumsum( np.bincount(pair_labels,
+                                                       minlength=num_components)
+                                          )[:-1] )
+        # Index of each row (column) within its component
+        row_index = np.zeros( allowable.shape[0], dtype=np.intp )
+        col_index = np.zeros( allowable.shape[1], dtype=np.intp )
+
+    for label in np.flatnonzero(np.logical_not(is_single)):
+        block_rows = row_blocks[label]
+        block_cols = col_blocks[label]
+        if is_sparse:
+            block_pairs = pair_blocks[label]
+            row_index[block_rows] = np.arange(len(block_rows))
+            col_index[block_cols] = np.arange(len(block_cols))
+            local = ( row_index[pair_rows[block_pairs]],
+                      col_index[pair_cols[block_pairs]] )
+            shape = (len(block_rows),len(block_cols))
+            if shape[0]*shape[1] >= SPARSE_MIN_PAIRS:
+                block_gt, block_pred = find_matches_sparse(
+                    scipy.sparse.csr_matrix(
+                        ( np.ones(len(block_pairs), dtype=np.bool_), local ),
+                        shape=shape ),
+                    scipy.sparse.csr_matrix( ( pair_scores[block_pairs],
+                                               local ), shape=shape ) )
+            else:  # Small enough to solve densely
+                block_allowable = np.zeros( shape, dtype=np.bool_ )
+                block_scores = -np.ones( shape, dtype=np.double )
+                block_allowable[local] = True
+                block_scores[local] = pair_scores[block_pairs]
+                block_gt, block_pred, _ = find_matches_dense(
+                    block_allowable, block_scores, np.zeros(shape) )
+        else:
+            block = np.ix_(block_rows,block_cols)
+            block_gt, block_pred, _ = find_matches_dense( allowable[block],
+                                                          scores[block],
+                                                          ious[block] )
+        matches_gt.append( block_rows[block_gt] )
+        matches_pred.append( block_cols[block_pred] )
+
+    # Restore the row order produced by a single assignment
+    matches_gt = np.concatenate(matches_gt)
+    matches_pred = np.concatenate(matches_pred)
+    order = np.argsort(matches_gt)
+    matches_gt = matches_gt[order]
+    matches_pred = matches_pred[order]
+
+    matches_ious  = match_ious(matches_gt,matches_pred)
+
+    return matches_gt, matches_pred, matches_ious
+
+
 def evaluate_image( gt: Union[list[WordData],list[GroupData]],
                     pred: Union[list[WordData],list[GroupData]],
                     task: str,
@@ -517,7 +2390,10 @@ def evaluate_image( gt: Union[list[WordData],list[GroupData]],
                                         bool],
                     score_match: Callable[[Union[WordData,GroupData],
                                            Union[WordData,GroupData],float],
-                                          bool] ) \
+                                          bool],
+                    score_pairs: PairScorer = calc_score_pairs,
+                    return_ious: bool = False,
+                    return_matches: bool = False ) \
                     -> Tuple[dict[str,Number], dict[str,Number]]:
     """Apply the appropriate evaluation scheme to lists of ground truth and
     prediction elements from the same image.
@@ -533,13 +2409,58 @@ def evaluate_image( gt: Union[list[WordData],list[GroupData]],
       score_match: Function taking ground truth and predicted word dicts with
                     their pre-calculated iou score and returning their match
                     score (assumes they are valid matches)
+      score_pairs: Pair scoring engine (cf. PAIR_ENGINES) with the signature of
+                     calc_score_pairs (default=calc_score_pairs)
+      return_ious: Whether to also return the MxN IoU matrix (default=False)
+      return_matches: Whether to also return the matches (default=False)
     Returns
       results : dict containing totals for the accumulator
       stats : dict containing statistics for this image
+      ious : MxN numpy float array (or scipy.sparse matrix; cf.
+               candidate_matrices) of IoU values (only when return_ious)
+      matches : dict of the image's matches given by image_matches (only
+                  when return_matches)
     """
-    allowed, scores, ious = calc_score_pairs( gt, pred, can_match, score_match )
+    with profile_stage('score_pairs'):
+        allowed, scores, ious = score_pairs( gt, pred, can_match, score_match )
     matches_gt, matches_pred, matches_ious = find_matches(allowed, scores, ious)  # TODO use matches_ious to compute shape quality
 
+    with profile_stage('tally'):
+        results, stats = tally_matches( gt, pred, task,
+                                        matches_gt, matches_pred, matches_ious )
+
+    img_evaluation: tuple = (results, stats)
+    if return_ious:
+        img_evaluation += (ious,)
+    if return_matches:
+        img_evaluation += ( image_matches( gt, pred, task, matches_gt,
+                                           matches_pred, matches_ious ), )
+    return img_evaluation
+
+
+def tally_matches( gt: Union[list[WordData],list[GroupData]],
+                   pred: Union[list[WordData],list[GroupData]],
+                   task: str,
+                   matches_gt: npt.NDArray[np.uint],
+                   matches_pred: npt.NDArray[np.uint],
+                   matches_ious: npt.NDArray[np.double],
+                   text_score: Optional[Callable[[str,str],float]] = None ) \
+                   -> Tuple[dict[str,Number], dict[str,Number]]:
+    """Count the totals and statistics of an image's optimized matches.
+
+    Arguments
+      gt: List of dicts containing ground truth elements (each has the fields
+           'text' and 'ignore').
+      pred: List of dicts containing predicted elements for evaluation (each
+             has the field 'text' if task contains 'rec').
+      task: string describing the task (det, detlink, detrec, detreclink)
+      matches_gt, matches_pred, matches_ious: Matches given by find_matches
+      text_score: Function scoring the text of a matched pair
+                    (default=None, i.e., str_score in a batch; cf. str_scores)
+    Returns
+      results : dict containing totals for the accumulator
+      stats : dict containing statistics for this image
+    """
     # Mark as ignorable any predicted regions that matched an ignored region
     matches_ignore = np.asarray([gt[i]['ignore'] for i in matches_gt])
     matches_count  = np.logical_not(matches_ignore)
@@ -566,9 +2487,13 @@ def evaluate_image( gt: Union[list[WordData],list[GroupData]],
 
     if 'rec' in task:
         # measure text (mis)predictiontrue positives
-        text_score_matches = [ str_score( gt[g]['text'], pred[p]['text'] )
-          for (g,p) in zip(matches_gt[matches_count],
-                           matches_pred[matches_count]) ]
+        gt_texts = [ gt[g]['text'] for g in matches_gt[matches_count] ]
+        pred_texts = [ pred[p]['text'] for p in matches_pred[matches_count] ]
+        if text_score is None:
+            text_score_matches = str_scores( gt_texts, pred_texts ).tolist()
+        else:
+            text_score_matches = [ text_score( gs, ds )
+                                   for (gs,ds) in zip(gt_texts,pred_texts) ]
         # tally scores among true positives
         total_rec_score = sum( text_score_matches )
 
@@ -582,61 +2507,293 @@ def evaluate_image( gt: Union[list[WordData],list[GroupData]],
     return results, stats
 
 
+def image_matches( gt: Union[list[WordData],list[GroupData]],
+                   pred: Union[list[WordData],list[GroupData]],
+                   task: str,
+                   matches_gt: npt.NDArray[np.uint],
+                   matches_pred: npt.NDArray[np.uint],
+                   matches_ious: npt.NDArray[np.double] ) \
+                   -> dict[str,npt.NDArray]:
+    """Return an image's matches for output (cf. write_matches).
+
+    Arguments
+      gt, pred, task, matches_gt, matches_pred, matches_ious : Same as
+        tally_matches
+    Returns
+      dict with arrays 'gt' and 'pred' (the indices of the matched elements),
+        'iou', 'text_score' (str_score of each match counted for recognition,
+        or else NaN), and 'unmatched_gt' and 'unmatched_pred' (the indices of
+        the other elements)
+    """
+    matches_gt = np.asarray(matches_gt, dtype=np.intp)
+    matches_pred = np.asarray(matches_pred, dtype=np.intp)
+
+    text_scores = np.full( len(matches_gt), np.nan, dtype=np.double )
+    if 'rec' in task:  # Scores are memoized by tally_matches
+        count = ~np.asarray( [ gt[i]['ignore'] for i in matches_gt ],
+                             dtype=np.bool_ )
+        text_scores[count] = str_scores(
+            [ gt[g]['text'] for g in matches_gt[count] ],
+            [ pred[p]['text'] for p in matches_pred[count] ] )
+
+    return { 'gt' : matches_gt,
+             'pred' : matches_pred,
+             'iou' : np.asarray(matches_ious, dtype=np.double),
+             'text_score' : text_scores,
+             'unmatched_gt' : np.setdiff1d( np.arange(len(gt)), matches_gt ),
+             'unmatched_pred' : np.setdiff1d( np.arange(len(pred)),
+                                              matches_pred ) }
+
+
+def evaluate_image_sweep( gt: Union[list[WordData],list[GroupData]],
+                          pred: Union[list[WordData],list[GroupData]],
+                          task: str,
+                          can_matches: list[Callable[[Union[WordData,GroupData],
+                                                      Union[WordData,GroupData],
+                                                      float],
+                                                     bool]],
+                          score_match: Callable[[Union[WordData,GroupData],
+                                                 Union[WordData,GroupData],
+                                                 float],
+                                                bool],
+                          score_pairs: PairScorer = calc_score_pairs ) \
+                          -> list[Tuple[dict[str,Number], dict[str,Number]]]:
+    """Apply the evaluation scheme for several match criteria (i.e., IoU
+    thresholds) to lists of ground truth and prediction elements from the same
+    image.
+
+    The pairwise IoU values and match scores are calculated only once, by the
+    pair scoring engine, for the pairs that any criterion allows; the
+    correspondence candidates, matches, and totals are then determined for
+    each of the criteria.
+
+    Arguments
+      gt, pred, task, score_match, score_pairs: Same as evaluate_image
+      can_matches: List of predicates indicating whether ground truth and
+                     prediction are valid correspondence candidates (cf.
+                     config_protocol)
+    Returns
+      List of (results, stats) given by evaluate_image for each can_match
+    """
+    def can_match_any( g: Union[WordData,GroupData],
+                       d: Union[WordData,GroupData],
+                       the_iou: float ) -> bool:
+        """Whether any criterion allows the pair"""
+        return any( can_match( g, d, the_iou ) for can_match in can_matches )
+
+    def sweep_matches( gt: Union[list[WordData],list[GroupData]],
+                       pred: Union[list[WordData],list[GroupData]],
+                       score_match: Callable[[Union[WordData,GroupData],
+                                              Union[WordData,GroupData],
+                                              float],
+                                             bool] ) -> list[tuple]:
+        """Return the matches given by find_matches for each criterion"""
+        with profile_stage('score_pairs'):
+            allowed, scores, ious = score_pairs( gt, pred, can_match_any,
+                                                 score_match )
+
+        is_sparse = scipy.sparse.issparse(allowed)
+        if is_sparse:
+            pairs = scipy.sparse.coo_matrix(allowed)
+            pairs.eliminate_zeros()
+            cand_gt = pairs.row.astype(np.intp)
+            cand_pred = pairs.col.astype(np.intp)
+            cand_ious = sparse_values( scipy.sparse.csr_matrix(ious),
+                                       cand_gt, cand_pred )
+        else:
+            cand_gt, cand_pred = np.nonzero(allowed)
+            cand_ious = ious[cand_gt,cand_pred]
+
+        matches = []
+        for can_match in can_matches:
+            # Correspondence candidates for the criterion, among those of any
+            cand_allowed = np.array( [ can_match( gt[i], pred[j], the_iou )
+                                       for (i,j,the_iou) in
+                                       zip(cand_gt,cand_pred,cand_ious) ],
+                                     dtype=np.bool_ )
+            (allowed_gt, allowed_pred) = (cand_gt[cand_allowed],
+                                          cand_pred[cand_allowed])
+            if is_sparse:  # Scores of pairs that are not allowed are unused
+                criterion_allowed = scipy.sparse.csr_matrix(
+                    ( np.ones(len(allowed_gt), dtype=np.bool_),
+                      (allowed_gt,allowed_pred) ), shape=ious.shape )
+                criterion_scores = scores
+            else:  # As calc_score_pairs gives for the criterion alone
+                criterion_allowed = np.zeros( ious.shape, dtype=np.bool_ )
+                criterion_allowed[allowed_gt,allowed_pred] = True
+                criterion_scores = np.where( criterion_allowed, scores, -1.0 )
+            matches.append( find_matches( criterion_allowed, criterion_scores,
+                                          ious ) )
+        return matches
+
+    image_results = []
+    for (matches_gt, matches_pred, matches_ious) in \
+        sweep_matches( gt, pred, score_match ):
+        with profile_stage('tally'):
+            results, stats = tally_matches( gt, pred, task,
+                                            matches_gt, matches_pred,
+                                            matches_ious )
+        image_results.append( (results, stats) )
+    return image_results
+
+
 def evaluate(gt: dict[str,ImageData],
-             pred: dict[str,ImageData],
+             pred: Union[dict[str,ImageData],Iterable[Tuple[str,ImageData]]],
              task: str,
              can_match: Callable[[Union[WordData,GroupData],
                                   Union[WordData,GroupData],float],
                                  bool],
              score_match: Callable[[Union[WordData,GroupData],
                                     Union[WordData,GroupData],float],
-                                   bool] ) \
+                                   bool],
+             score_pairs: PairScorer = calc_score_pairs,
+             cache: Optional['EvalCache'] = None,
+             return_image_results: bool = False,
+             journal: Optional['EvalJournal'] = None,
+             matches: Optional[dict[str,dict[str,npt.NDArray]]] = None ) \
              -> Tuple[dict[str,float], dict[str,dict[str,float]]]:
     """Run the primary evaluation protocol over all images
 
+    Predictions may be given as a dict or as an iterable of (image id, list of
+    groups) pairs (cf. iter_predictions), in which case each image is
+    evaluated as it arrives and released afterward; an image that arrives
+    again is evaluated again, so its last entry counts, as in a dict. Either
+    way, totals are accumulated in ground truth order.
+
+    Images with results in the cache or the journal (where given) are not
+    evaluated again, and the results of the others are journaled as they
+    finish (cf. EvalJournal).
+
+    Where matches is given (without a cache or a journal, whose results have
+    no matches), it is filled with the matches of each image (cf.
+    image_matches).
+
     Returns:
       final_stats : dict containing pooled statistics for the entire data set
       stats : dict containing statistics for each image in the data set
+      image_results : dict containing the totals of each image in the data
+                        set (only when return_image_results)
     """
     def accumulate( totals: dict[str,float], results: dict[str,float] ):
         """Side-effect totals by accumulating matching keys of results"""
         for (k,v) in results.items():
             totals[k] += v
 
-    # initialize accumulator
+    return_ious = cache.store_ious if cache else False
+    image_of: dict[int,str] = {}  # Image of each (gt,pred) item, for profiling
+
+    def evaluate_images( data: list[Tuple[ImageData,ImageData]] ) -> list:
+        """Evaluate each pair of (ground truth, prediction) image elements"""
+        img_evaluations = []
+        for gp in data:
+            with profile_image( image_of.get(id(gp)), len(gp[0]), len(gp[1]) ):
+                img_evaluations.append(
+                    evaluate_image( gp[0], gp[1], task,
+                                    can_match, score_match, score_pairs,
+                                    return_ious=return_ious,
+                                    return_matches=matches is not None ) )
+        return img_evaluations
+
+    totals = zero_totals(task)  # initialize accumulator
+
+    stats = {}  # Collected per-image statistics
+
+    if isinstance(pred, dict):
+        # Lists of groups (link) or words (otherwise) for each image
+        img_keys,data = flatten_zip_dict(gt,pred,task)
+        image_of.update( zip( map(id,data), img_keys ) )
+
+        results = evaluate_stored( img_keys, data, task, evaluate_images,
+                                   cache, journal )
+
+    else:  # Stream of predicted images
+        img_results = {}
+        if journal:  # Skip journaled images
+            img_results.update( (img,journal.images[img]) for img in gt
+                                if img in journal.images )
+        journaled = set(img_results.keys())
+        for (img,pred_groups) in pred:
+            if img not in gt or img in journaled:
+                continue
+            data = [ zip_image_elements( gt[img], pred_groups, task ) ]
+            image_of[id(data[0])] = img
+            if cache:  # Only evaluate images missing from the cache
+                img_results[img] = cache.evaluate( data, task, evaluate_images,
+                                                   evict=False )[0]
+            else:
+                img_results[img] = evaluate_images( data )[0]
+            if journal:
+                journal.record( img, *img_results[img][:2] )
+        if cache:  # Eviction deferred while streaming
+            cache.evict()
+
+        if gt.keys() != img_results.keys():
+            warn_image_keys( gt.keys(), img_results.keys() )
+
+        img_keys = list(gt.keys())
+        missing = { img : zip_image_elements( gt[img], [], task )
+                    for img in img_keys if img not in img_results }
+        image_of.update( (id(item),img) for (img,item) in missing.items() )
+        img_results.update( zip(missing.keys(),
+                                evaluate_stored( list(missing.keys()),
+                                                 list(missing.values()), task,
+                                                 evaluate_images,
+                                                 cache, journal ) ) )
+        results = [ img_results[img] for img in img_keys ]
+
+    for (img,img_evaluation) in zip(img_keys,results):
+        (img_results,img_stats) = img_evaluation[:2]
+        accumulate(totals,img_results)
+        stats[img] = img_stats
+    if matches is not None:
+        matches.update( zip( img_keys, [ r[-1] for r in results ] ) )
+
+    final_stats = get_final_stats( totals, task )  # Process totals
+
+    if return_image_results:
+        return final_stats, stats, dict(zip(img_keys,[ts[0] for ts in results]))
+    return final_stats, stats
+
+
+def zero_totals( task: str ) -> dict[str,Number]:
+    """Return totals for the accumulator before any image is counted"""
     totals = { 'tp' : 0,
                'total_pred' : 0,
                'total_gt' : 0,
                'total_tightness' : 0.0 }
     if 'rec' in task:
         totals['total_rec_score'] = 0.0
+    return totals
 
-    stats = {}  # Collected per-image statistics
-
-    for (img,gt_groups) in gt.items():  # Process each image
-        pred_groups = pred[img] if img in pred else []
-
-        if 'link' in task:  # evaluate at top level (groups)
-            img_results, img_stats = evaluate_image( gt_groups, pred_groups,
-                                                     task,
-                                                     can_match, score_match )
-
-        else:
-            # flatten to list of words for evaluation
-            gt_words = [ word for group in gt_groups
-                         for word in group['words'] ]
-            pred_words = [ word for group in pred_groups
-                           for word in group['words'] ]
 
-            img_results, img_stats = evaluate_image( gt_words, pred_words,
-                                                     task,
-                                                     can_match, score_match )
+def collect_results( img_keys: list[str],
+                     results: list[Tuple[dict[str,Number],dict[str,Number]]],
+                     task: str,
+                     return_image_results: bool = False ) \
+                     -> Tuple[dict[str,float], dict[str,dict[str,float]]]:
+    """Reduce the (totals, image_stats) of each image, in order, to the final
+    statistics of the data set (cf. evaluate)
 
-        accumulate(totals,img_results)
-        stats[img] = img_stats
+    Arguments
+      img_keys : List of the image keys
+      results : List of (totals, image_stats) for each of img_keys
+      task : String containing a valid task (cf parser)
+      return_image_results : Whether to also return the images' totals
+                               (default=False)
+    Returns:
+      final_stats : dict containing pooled statistics for the entire data set
+      stats : dict containing statistics for each image in the data set
+      image_results : dict containing the totals of each image in the data
+                        set (only when return_image_results)
+    """
+    totals = reduce( sum_reduce_dict, [ts[0] for ts in results] )
+    # Restore list to keyed format
+    stats = dict(zip(img_keys,[ts[1] for ts in results]))
 
-    final_stats = get_final_stats( totals, task )  # Process totals
+    final_stats = get_final_stats( totals, task )
 
+    if return_image_results:
+        return final_stats, stats, dict(zip(img_keys,[ts[0] for ts in results]))
     return final_stats, stats
 
 
@@ -654,16 +2811,431 @@ def flatten_zip_dict( gt: dict[str,ImageData],
     img_keys = list(gt.keys())  # cache keys to be certain of fixed ordering
 
     # Reformulate gt,pred dicts as list of tuples (for parallelized data frame)
-    data = [ (gt[img], pred[img] if img in pred else [])
+    data = [ zip_image_elements( gt[img], pred[img] if img in pred else [],
+                                 task )
              for img in img_keys ]
 
-    if 'link' not in task:  # flatten entries to lists of words for evaluation
-        data = [ ( [word for group in g for word in group['words'] ] ,
-                   [word for group in p for word in group['words'] ])
-                 for (g,p) in data ]
     return img_keys,data
 
 
+def cost_chunks( costs: list[Number], num_chunks: int ) -> list[Tuple[int,int]]:
+    """Divide a sequence of images into contiguous chunks of about equal
+    total cost for dispatch to workers.
+
+    Chunks close once their cost reaches the mean, so images costing more
+    than the mean form chunks by themselves, while cheaper images share chunks
+    to save dispatch overhead. When images are ordered by decreasing cost,
+    workers taking the next chunk whenever they finish one start the
+    costliest images first, and the cheap chunks at the end balance the load.
+
+    Arguments
+      costs : List of the estimated cost of each image (cf. image_cost)
+      num_chunks : Target number of chunks
+    Returns
+      List of (start,end) ranges of the images in each chunk
+    """
+    target = sum(costs) / max(1,num_chunks)
+    chunks = []
+    start, chunk_cost = 0, 0
+    for (k,cost) in enumerate(costs):
+        chunk_cost += cost
+        if chunk_cost >= target:
+            chunks.append( (start,k+1) )
+            start, chunk_cost = k+1, 0
+    if start < len(costs):
+        chunks.append( (start,len(costs)) )
+    return chunks
+
+
+def timed_evaluate_image( gt: Union[list[WordData],list[GroupData]],
+                          pred: Union[list[WordData],list[GroupData]],
+                          *args, **kwargs ) -> Tuple[tuple,float]:
+    """Return the output of evaluate_image with its wall time (seconds)"""
+    start = time.perf_counter()
+    img_evaluation = evaluate_image( gt, pred, *args, **kwargs )
+    return img_evaluation, time.perf_counter() - start
+
+
+def zip_image_elements( gt_groups: ImageData,
+                        pred_groups: ImageData,
+                        task: str ) \
+                        -> Tuple[Union[list[WordData],list[GroupData]],
+                                 Union[list[WordData],list[GroupData]]]:
+    """Pair an image's ground truth and prediction elements for evaluation,
+    according to the task: groups for linking tasks, or else words."""
+    if 'link' in task:  # evaluate at top level (groups)
+        return gt_groups, pred_groups
+    else:  # flatten entries to lists of words for evaluation
+        return ( image_words(gt_groups), image_words(pred_groups) )
+
+
+def image_words( groups: ImageData ) -> list[WordData]:
+    """Flatten an image's groups to a list of its words"""
+    if isinstance(groups, Annotations):
+        return groups.words()
+    return [ word for group in groups for word in group['words'] ]
+
+
+def image_cost( gt_groups: ImageData,
+                pred_groups: ImageData,
+                task: str ) -> int:
+    """Estimate the relative cost of evaluating an image for scheduling: the
+    product of the numbers of ground truth and predicted elements (groups for
+    linking tasks, or else words), which bounds the pairs scored and the size
+    of the assignment problem, plus their numbers of vertices, which the
+    construction of their geometries is linear in."""
+    def counts( groups: ImageData ) -> Tuple[int,int]:
+        """Number of elements and vertices of an image's groups"""
+        if isinstance(groups, Annotations):
+            num_words, num_vertices = len(groups.word_offsets)-1, len(groups.coords)
+        else:
+            words = image_words(groups)
+            num_words = len(words)
+            num_vertices = sum( len(word['vertices']) for word in words )
+        return (len(groups) if 'link' in task else num_words), num_vertices
+
+    (num_gt,gt_vertices) = counts(gt_groups)
+    (num_pred,pred_vertices) = counts(pred_groups)
+    return num_gt*num_pred + gt_vertices + pred_vertices
+
+
+class EvalCache:
+    """Persistent, content-addressed store of per-image evaluation results.
+
+    Entries are keyed by a hash of the ground truth and predicted content of
+    an image (vertices, ignore flags, and for recognition tasks, text), the
+    task, and the protocol settings (e.g., IoU threshold), so that only
+    images whose content changed are evaluated again. Each entry holds the
+    image's (results, stats) from evaluate_image and optionally its (sparse)
+    IoU matrix. The least recently used entries are evicted when the store
+    exceeds its size bound.
+    """
+
+    # Incremented whenever evaluation changes invalidate stored results
+    VERSION = 5
+
+    def __init__( self,
+                  directory: str,
+                  protocol: dict[str,Any],
+                  max_bytes: int = 2**30,
+                  store_ious: bool = False ):
+        """
+        Arguments
+          directory : Path to the directory of cache entries (created if needed)
+          protocol : JSON-serializable settings that determine the results
+                       besides the task (e.g., {'iou_threshold': 0.5})
+          max_bytes : Size bound of the stored entries (default=1GiB)
+          store_ious : Whether to store each image's IoU matrix (default=False)
+        """
+        self.directory = directory
+        self.protocol = protocol
+        self.max_bytes = max_bytes
+        self.store_ious = store_ious
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def image_key( self,
+                   gt: Union[list[WordData],list[GroupData]],
+                   pred: Union[list[WordData],list[GroupData]],
+                   task: str ) -> str:
+        """Return the content hash of an image's ground truth and predicted
+        elements (words or groups) for the task, which includes text only
+        for recognition tasks (the only ones that read it)"""
+        with_text = 'rec' in task
+
+        def content( elements: Union[list[WordData],list[GroupData]] ) -> list:
+            """Input fields of words (nested in groups, where applicable)"""
+            return [ [ content(el['words']) ] if 'words' in el else
+                     [ el['vertices'], el.get('ignore') ] +
+                     ( [ el.get('text') ] if with_text else [] )
+                     for el in elements ]
+
+        digest = hashlib.sha256()
+        digest.update( json.dumps( [ self.VERSION, task, self.protocol,
+                                     content(gt), content(pred) ],
+                                   sort_keys=True ).encode('utf-8') )
+        return digest.hexdigest()
+
+    def entry_path( self, key: str, suffix: str = '.json' ) -> str:
+        """Path of an entry's file, sharded by the key's leading digits"""
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def load( self, key: str ) -> Optional[Tuple[dict[str,Number],
+                                                 dict[str,Number]]]:
+        """Return the stored (results, stats) for key, or None when missing"""
+        path = self.entry_path(key)
+        try:
+            with open(path, encoding='utf-8') as fd:
+                entry = json.load(fd)
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):  # Missing (or evicted or corrupt)
+            return None
+        return entry['results'], entry['stats']
+
+    def load_ious( self, key: str ) -> Optional[npt.NDArray[np.double]]:
+        """Return the stored IoU matrix for key, or None when missing"""
+        try:
+            with np.load(self.entry_path(key, '.npz')) as entry:
+                ious = np.zeros( entry['shape'], dtype=np.double )
+                ious[entry['rows'],entry['cols']] = entry['values']
+        except (OSError, ValueError):
+            return None
+        return ious
+
+    def store( self,
+               key: str,
+               results: dict[str,Number],
+               stats: dict[str,Number],
+               ious: Optional[npt.NDArray[np.double]] = None ):
+        """Store an image's (results, stats) and optionally IoU matrix"""
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if ious is not None:
+            if scipy.sparse.issparse(ious):  # cf. candidate_matrices
+                entries = scipy.sparse.coo_matrix(ious)
+                entries.eliminate_zeros()
+                rows,cols,values = entries.row, entries.col, entries.data
+            else:
+                rows,cols = np.nonzero(ious)
+                values = ious[rows,cols]
+            with open(path + '.tmp', 'wb') as fd:
+                np.savez_compressed( fd, shape=np.asarray(ious.shape),
+                                     rows=rows, cols=cols, values=values )
+            os.replace(path + '.tmp', self.entry_path(key, '.npz'))
+
+        # Write and rename, so concurrent readers never see partial entries
+        with open(path + '.tmp', 'w', encoding='utf-8') as fd:
+            json.dump( {'results': results, 'stats': stats}, fd )
+        os.replace(path + '.tmp', path)
+
+    def evict( self ):
+        """Remove the least recently used entries until the store fits within
+        its size bound"""
+        entries = []  # (last use, size, paths) of each entry
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for f in os.scandir(shard.path):
+                if f.name.endswith('.json'):
+                    paths = [ f.path, f.path[:-len('.json')] + '.npz' ]
+                    size = sum( os.path.getsize(p) for p in paths
+                                if os.path.exists(p) )
+                    entries.append( (f.stat().st_mtime, size, paths) )
+
+        total = sum( size for (_,size,_) in entries )
+        for (_,size,paths) in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for p in paths:
+                if os.path.exists(p):
+                    os.remove(p)
+            total -= size
+
+    def evaluate( self,
+                  data: list[Tuple[ImageData,ImageData]],
+                  task: str,
+                  evaluate_images: Callable[[list[Tuple[ImageData,ImageData]]],
+                                            list[tuple]],
+                  evict: bool = True ) \
+                  -> list[Tuple[dict[str,Number], dict[str,Number]]]:
+        """Return (results, stats) for each (gt, pred) pair of image elements,
+        loading stored entries and evaluating only the others.
+
+        Arguments
+          data : List of (ground truth, prediction) elements for each image
+          task : String containing a valid task (cf parser)
+          evaluate_images : Function evaluating a list like data, returning a
+                              list of the corresponding evaluate_image outputs
+                              (i.e., including ious when store_ious is set)
+          evict : Whether to evict entries after storing new ones; callers
+                    evaluating images one at a time may defer (default=True)
+        Returns
+          List of (results, stats) for each image in data
+        """
+        keys = [ self.image_key( g, p, task ) for (g,p) in data ]
+        results: list = [ self.load(key) for key in keys ]
+        missing = [ k for (k,r) in enumerate(results) if r is None ]
+
+        self.hits += len(data) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            evaluated = evaluate_images( [ data[k] for k in missing ] )
+            for (k,img_evaluation) in zip(missing,evaluated):
+                self.store( keys[k], *img_evaluation )
+                results[k] = img_evaluation[:2]
+            if evict:
+                self.evict()
+
+        return results
+
+
+class EvalJournal:
+    """Append-only journal of per-image evaluation results, so that an
+    interrupted evaluation can resume without evaluating its finished images
+    again.
+
+    The journal is a JSON lines file: a header with the task and protocol
+    settings, followed by one record with the (results, stats) of each
+    finished image. Records are flushed to disk periodically, so at most the
+    last few seconds of work are lost. A partial last record (e.g., when the
+    process was killed while writing) is discarded on resuming.
+    """
+
+    def __init__( self,
+                  path: str,
+                  task: str,
+                  protocol: dict[str,Any],
+                  resume: bool = False,
+                  flush_seconds: float = 10.0 ):
+        """
+        Arguments
+          path : Path to the journal file
+          task : String containing a valid task (cf parser)
+          protocol : JSON-serializable settings that determine the results
+                       besides the task (e.g., {'iou_threshold': 0.5})
+          resume : Whether to keep the records of an existing journal at path
+                     (default=False, i.e., start a new journal)
+          flush_seconds : Minimum time between flushes (default=10)
+        """
+        self.path = path
+        self.header = {'task': task, 'protocol': protocol}
+        self.flush_seconds = flush_seconds
+        self.images: dict[str,Tuple[dict[str,Number],dict[str,Number]]] = {}
+        self.fd: Optional[TextIO] = None
+        self.last_flush = time.monotonic()
+        self.end: Optional[int] = None  # Offset after the last whole record
+
+        if resume and os.path.exists(path):
+            self.load()
+
+    def load( self ):
+        """Read the records of the existing journal"""
+        with open(self.path,'rb') as fd:
+            lines = fd.readlines()
+
+        offset = 0
+        for (n,line) in enumerate(lines):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError('Partial record')
+                record = json.loads(line)
+            except ValueError:
+                if n+1 < len(lines):  # Only the last record may be partial
+                    raise ValueError(f'Corrupt record {n} in journal "{self.path}"')
+                break
+            if n == 0:
+                if record != self.header:
+                    raise ValueError(f'Journal "{self.path}" is from a different evaluation: {record}')
+            else:
+                self.images[record['image']] = (record['results'],
+                                                record['stats'])
+            offset += len(line)
+
+        if offset > 0:  # Header is intact
+            self.end = offset
+
+    def record( self,
+                img: str,
+                results: dict[str,Number],
+                stats: dict[str,Number] ):
+        """Append the (results, stats) of a finished image"""
+        if self.fd is None:
+            if self.end is not None:  # Resume, dropping any partial record
+                os.truncate(self.path, self.end)
+                self.fd = open(self.path,'a',encoding='utf-8')
+            else:
+                self.fd = open(self.path,'w',encoding='utf-8')
+                self.fd.write( json.dumps(self.header) + '\n' )
+
+        self.fd.write( json.dumps( {'image': img,
+                                    'results': results,
+                                    'stats': stats} ) + '\n' )
+        self.images[img] = (results, stats)
+
+        if time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush( self ):
+        """Write the buffered records to disk"""
+        if self.fd is not None:
+            self.fd.flush()
+            os.fsync(self.fd.fileno())
+        self.last_flush = time.monotonic()
+
+    def close( self ):
+        """Flush and close the journal"""
+        self.flush()
+        if self.fd is not None:
+            self.fd.close()
+            self.fd = None
+
+    def evaluate( self,
+                  img_keys: list[str],
+                  data: list,
+                  evaluate_data: Callable[[list], Iterable[tuple]] ) \
+                  -> list[Tuple[dict[str,Number], dict[str,Number]]]:
+        """Return (results, stats) for each image, taking journaled records
+        and evaluating only the other images, whose results are recorded as
+        they arrive.
+
+        Arguments
+          img_keys : List of the image keys
+          data : List of items for evaluate_data, one for each of img_keys
+          evaluate_data : Function evaluating a list like data, returning an
+                            iterable of the corresponding evaluate_image
+                            outputs (or (results, stats) pairs)
+        Returns
+          List of (results, stats) for each image in img_keys
+        """
+        results: list = [ self.images.get(img) for img in img_keys ]
+        missing = [ k for (k,r) in enumerate(results) if r is None ]
+
+        if missing:
+            evaluated = evaluate_data( [ data[k] for k in missing ] )
+            for (k,img_evaluation) in zip(missing,evaluated):
+                self.record( img_keys[k], *img_evaluation[:2] )
+                results[k] = img_evaluation[:2]
+            self.flush()
+
+        return results
+
+
+def evaluate_stored( img_keys: list[str],
+                     data: list,
+                     task: str,
+                     evaluate_images: Callable[[list], Iterable[tuple]],
+                     cache: Optional[EvalCache] = None,
+                     journal: Optional[EvalJournal] = None ) \
+                     -> list[Tuple[dict[str,Number], dict[str,Number]]]:
+    """Return (results, stats) for each image, evaluating only the images
+    missing from the journal and the cache (where given)
+
+    Arguments
+      img_keys : List of the image keys
+      data : List of (ground truth, prediction) elements for each image, or
+               other items for evaluate_images when there is no cache
+      task : String containing a valid task (cf parser)
+      evaluate_images : Function evaluating a list like data, returning an
+                          iterable of the corresponding evaluate_image outputs
+      cache : Persistent store of results (default=None)
+      journal : Journal of the evaluation's results (default=None)
+    Returns
+      List of (results, stats) for each image in img_keys
+    """
+    def evaluate_data( data: list ) -> list:
+        """Evaluate items of data, consulting the cache"""
+        if cache:  # Only evaluate images missing from the cache
+            return cache.evaluate( data, task, evaluate_images )
+        return list( evaluate_images( data ) )
+
+    if journal:  # Only evaluate images missing from the journal
+        return journal.evaluate( img_keys, data, evaluate_data )
+    return evaluate_data( data )
+
+
 def spark_evaluate(gt: dict[str,ImageData],
                    pred: dict[str,ImageData],
                    task: str,
@@ -673,45 +3245,83 @@ def spark_evaluate(gt: dict[str,ImageData],
                    score_match: Callable[[Union[WordData,GroupData],
                                           Union[WordData,GroupData],float],
                                          bool],
-                   images_per_slice: int = 10 ) -> \
+                   score_pairs: PairScorer = calc_score_pairs,
+                   images_per_slice: int = 10,
+                   cache: Optional[EvalCache] = None,
+                   return_image_results: bool = False,
+                   journal: Optional[EvalJournal] = None,
+                   timings: Optional[dict[str,dict[str,Number]]] = None,
+                   matches: Optional[dict[str,dict[str,npt.NDArray]]] = None ) -> \
                    Tuple[dict[str,float], dict[str,dict[str,float]]]:
     """Run the primary evaluation protocol in parallel using Apache Spark
 
+    Images are sliced into partitions of similar estimated cost (cf.
+    image_cost and cost_chunks), which are scheduled in order of decreasing
+    cost.
+
+    Arguments
+      images_per_slice : Mean number of images in each partition (default=10)
+      timings : Same as pool_evaluate
+      matches : Same as evaluate
     Returns:
       final_stats : dict containing pooled statistics for the entire data set
       stats : dict containing statistics for each image in the data set
+      image_results : dict containing the totals of each image in the data
+                        set (only when return_image_results)
     """
 
     img_keys, data = flatten_zip_dict(gt,pred,task) # zip image keys for map
 
+    costs = [ image_cost( gt[img], pred[img] if img in pred else [], task )
+              for img in img_keys ]
+    # Schedule the costliest images first
+    order = sorted( range(len(img_keys)), key=lambda k: -costs[k] )
+    # Identify the image of each (gt,pred) item
+    position = { id(item) : k for (k,item) in enumerate(data) }
+
     # local import so script can run in sequential mode without spark installed
     from pyspark.sql import SparkSession  # pylint: disable=import-outside-toplevel
 
     spark_session = SparkSession.builder.appName("MapTextEval").getOrCreate()
     spark_session.sparkContext.addPyFile(__file__)  # Ensure serializability
 
-    num_slices = len(data) // images_per_slice
-    data_rdd = spark_session.sparkContext.parallelize(data,numSlices=num_slices)
-    # Parallel run: produces list of tuples: [(totals, image_stats), ...]
-    results_rdd = data_rdd.map( lambda gp: evaluate_image(gp[0], gp[1],
-                                                          task,
-                                                          can_match,
-                                                          score_match) )
-    results_rdd.persist()  # Cache results to avoid subsequent re-computation
-    # Splice totals and reduce by summing, then splice per-image stats
-    totals = results_rdd.map( lambda ts : ts[0] ).reduce(sum_reduce_dict)
-    stats_list = results_rdd.map( lambda ts: ts[1]).collect()  # Per-image stats
-    stats = dict(zip(img_keys,stats_list))  # Restore list to keyed format
-
-    final_stats = get_final_stats( totals, task )
+    return_ious = cache.store_ious if cache else False
+    return_matches = matches is not None
+
+    def evaluate_images( data: list[Tuple[ImageData,ImageData]] ) -> list:
+        """Evaluate each pair of (ground truth, prediction) image elements,
+        ordered by decreasing cost, in a partition for each chunk"""
+        indices = [ position[id(gp)] for gp in data ]
+        chunks = [ data[start:end] for (start,end) in
+                   cost_chunks( [ costs[k] for k in indices ],
+                                max(1, len(data) // images_per_slice) ) ]
+        chunks_rdd = spark_session.sparkContext.parallelize(
+            chunks, numSlices=max(1,len(chunks)) )
+        # Parallel run: produces list of tuples:
+        #   [((totals, image_stats), seconds), ...]
+        results_rdd = chunks_rdd.flatMap(
+            lambda chunk: [ timed_evaluate_image( gp[0], gp[1], task,
+                                                  can_match, score_match,
+                                                  score_pairs, return_ious,
+                                                  return_matches )
+                            for gp in chunk ] )
+        results = results_rdd.collect()
+
+        if timings is not None:
+            for (k,(_,seconds)) in zip(indices,results):
+                timings[img_keys[k]] = {'cost': costs[k], 'seconds': seconds}
+        return [ img_evaluation for (img_evaluation,_) in results ]
+
+    results = evaluate_stored( [ img_keys[k] for k in order ],
+                               [ data[k] for k in order ], task,
+                               evaluate_images, cache, journal )
+    results = [ r for (_,r) in sorted( zip(order,results),
+                                       key=lambda kr: kr[0] ) ]
+    if matches is not None:
+        matches.update( zip( img_keys, [ r[-1] for r in results ] ) )
 
-    return final_stats, stats
-
-
-def evaluate_image_tuple(gt_pred, task, can_match, score_match):
-    """Pickle-able top-level function accepting paired lead inputs as a tuple"""
-    return evaluate_image(gt_pred[0], gt_pred[1], task,
-                          can_match, score_match)
+    # Splice totals and reduce by summing, then splice per-image stats
+    return collect_results( img_keys, results, task, return_image_results )
 
 
 def pool_evaluate(gt: dict[str,ImageData],
@@ -722,32 +3332,570 @@ def pool_evaluate(gt: dict[str,ImageData],
                                       bool],
                   score_match: Callable[[Union[WordData,GroupData],
                                          Union[WordData,GroupData],float],
-                                        bool]) \
+                                        bool],
+                  score_pairs: PairScorer = calc_score_pairs,
+                  cache: Optional[EvalCache] = None,
+                  processes: Optional[int] = None,
+                  chunks_per_process: int = 4,
+                  return_image_results: bool = False,
+                  journal: Optional[EvalJournal] = None,
+                  timings: Optional[dict[str,dict[str,Number]]] = None,
+                  matches: Optional[dict[str,dict[str,npt.NDArray]]] = None ) \
                    -> Tuple[dict[str,float], dict[str,dict[str,float]]]:
     """Run the primary evaluation protocol in parallel using Pool
 
+    Workers receive the prepared ground truth and the protocol once, when they
+    start (cf. init_worker). Only image keys and their predictions, whose
+    Annotations pickle as compact columns, are sent to evaluate each chunk of
+    images.
+
+    Images are dispatched in order of decreasing estimated cost (cf.
+    image_cost), in chunks of similar cost (cf. cost_chunks) that each worker
+    takes whenever it finishes one, so a costly image never starts last.
+    Totals are accumulated in ground truth order nonetheless.
+
+    Arguments
+      gt, pred, task, can_match, score_match, score_pairs, cache, journal :
+        Same as evaluate
+      processes : Number of worker processes (default=None, i.e., CPU count)
+      chunks_per_process : Number of chunks of images dispatched to each
+                             process, balancing load against dispatch overhead
+                             (default=4)
+      return_image_results : Same as evaluate
+      timings : Dict to fill with the estimated cost and the wall time
+                  (seconds) of evaluating each image, for checking the cost
+                  model (default=None)
+      matches : Same as evaluate
     Returns:
       final_stats : dict containing pooled statistics for the entire data set
       stats : dict containing statistics for each image in the data set
+      image_results : dict containing the totals of each image in the data
+                        set (only when return_image_results)
     """
+    img_keys = list(gt.keys())  # cache keys to be certain of fixed ordering
 
+    num_processes = processes if processes else (os.cpu_count() or 1)
+    return_ious = cache.store_ious if cache else False
+
+    costs = { img : image_cost( gt[img], pred[img] if img in pred else [], task )
+              for img in img_keys }
+    # Dispatch the costliest images first
+    schedule = sorted( img_keys, key=lambda img: -costs[img] )
+
+    def evaluate_images( pool, images: list[str] ) -> Iterator[tuple]:
+        """Evaluate images (ordered by decreasing cost) in chunks, yielding
+        results in order as they arrive"""
+        chunks = [ [ (img, pred[img] if img in pred else [])
+                     for img in images[start:end] ]
+                   for (start,end) in
+                   cost_chunks( [ costs[img] for img in images ],
+                                num_processes*chunks_per_process ) ]
+        for (chunk,chunk_results) in zip( chunks,
+                                          pool.imap( pool_evaluate_chunk,
+                                                     chunks ) ):
+            for ((img,_),(img_evaluation,seconds)) in zip(chunk,chunk_results):
+                if timings is not None:
+                    timings[img] = {'cost': costs[img], 'seconds': seconds}
+                yield img_evaluation
+
+    with Pool( num_processes, initializer=init_worker,
+               initargs=(gt, task, can_match, score_match, score_pairs,
+                         return_ious, matches is not None) ) as pool:
+        if cache:  # Only evaluate images missing from the cache
+            data = dict( zip( img_keys, flatten_zip_dict(gt,pred,task)[1] ) )
+            # Identify the image of each (gt,pred) item that is missing
+            image_of = { id(item) : img for (img,item) in data.items() }
+            results = evaluate_stored(
+                schedule, [ data[img] for img in schedule ], task,
+                lambda missing: evaluate_images(
+                    pool, [ image_of[id(item)] for item in missing ] ),
+                cache, journal )
+        else:  # Workers look up the images by key
+            results = evaluate_stored( schedule, schedule, task,
+                                       partial(evaluate_images, pool),
+                                       journal=journal )
+
+    results_of = dict(zip(schedule,results))  # Restore ground truth order
+    if matches is not None:
+        matches.update( (img, results_of[img][-1]) for img in img_keys )
+    return collect_results( img_keys, [ results_of[img] for img in img_keys ],
+                            task, return_image_results )
+
+
+def thread_evaluate(gt: dict[str,ImageData],
+                    pred: dict[str,ImageData],
+                    task: str,
+                    can_match: Callable[[Union[WordData,GroupData],
+                                         Union[WordData,GroupData],float],
+                                        bool],
+                    score_match: Callable[[Union[WordData,GroupData],
+                                           Union[WordData,GroupData],float],
+                                          bool],
+                    score_pairs: PairScorer = calc_score_pairs,
+                    cache: Optional[EvalCache] = None,
+                    threads: Optional[int] = None,
+                    return_image_results: bool = False,
+                    journal: Optional[EvalJournal] = None,
+                    matches: Optional[dict[str,dict[str,npt.NDArray]]] = None ) \
+                    -> Tuple[dict[str,float], dict[str,dict[str,float]]]:
+    """Run the primary evaluation protocol in parallel using threads
+
+    Images are evaluated concurrently by a thread pool. The bulk of the work
+    is in shapely's vectorized functions and scipy's assignment solver, which
+    release the GIL, so threads share the ground truth and predictions without
+    pickling or copying them. Results arrive in ground truth order.
+
+    Arguments
+      gt, pred, task, can_match, score_match, score_pairs, cache, journal :
+        Same as evaluate
+      threads : Number of threads (default=None, i.e., CPU count)
+      return_image_results, matches : Same as evaluate
+    Returns:
+      final_stats : dict containing pooled statistics for the entire data set
+      stats : dict containing statistics for each image in the data set
+      image_results : dict containing the totals of each image in the data
+                        set (only when return_image_results)
+    """
     img_keys,data = flatten_zip_dict(gt,pred,task)  # zip image keys for map
 
-    # Fill in arguments for pickle-able function to use with Pool.map
-    simple_evaluate = partial(evaluate_image_tuple, task=task,
-                                  can_match=can_match, score_match=score_match)
+    num_threads = threads if threads else (os.cpu_count() or 1)
+    return_ious = cache.store_ious if cache else False
 
-    with Pool() as pool:
-        results = pool.map( simple_evaluate, data)
+    with ThreadPoolExecutor(num_threads) as executor:
+
+        def evaluate_images( data: list[Tuple[ImageData,ImageData]] ) \
+                -> Iterator[tuple]:
+            """Evaluate each pair of (ground truth, prediction) image elements,
+            yielding results in order as they arrive"""
+            return executor.map(
+                lambda gp: evaluate_image( gp[0], gp[1], task,
+                                           can_match, score_match, score_pairs,
+                                           return_ious=return_ious,
+                                           return_matches=matches is not None ),
+                data )
+
+        results = evaluate_stored( img_keys, data, task, evaluate_images,
+                                   cache, journal )
+    if matches is not None:
+        matches.update( zip( img_keys, [ r[-1] for r in results ] ) )
+
+    return collect_results( img_keys, results, task, return_image_results )
+
+
+def sweep_evaluate(gt: dict[str,ImageData],
+                   pred: dict[str,ImageData],
+                   task: str,
+                   can_matches: list[Callable[[Union[WordData,GroupData],
+                                               Union[WordData,GroupData],float],
+                                              bool]],
+                   score_match: Callable[[Union[WordData,GroupData],
+                                          Union[WordData,GroupData],float],
+                                         bool],
+                   score_pairs: PairScorer = calc_score_pairs ) \
+                   -> Tuple[list[dict[str,float]],
+                            dict[str,list[dict[str,float]]]]:
+    """Run the primary evaluation protocol over all images for several match
+    criteria (i.e., IoU thresholds), scoring each image's pairs once with the
+    pair scoring engine (cf. evaluate_image_sweep)
+
+    Returns:
+      final_stats : list of dicts containing pooled statistics for the entire
+                      data set, for each of can_matches
+      stats : dict containing a list of statistics for each image in the data
+                set, for each of can_matches
+    """
+    img_keys,data = flatten_zip_dict(gt,pred,task)  # zip image keys
+
+    # List (images) of lists (criteria) of tuples (totals,image_stats)
+    results = []
+    for (img,(g,p)) in zip(img_keys,data):
+        with profile_image( img, len(g), len(p) ):
+            results.append( evaluate_image_sweep( g, p, task, can_matches,
+                                                  score_match, score_pairs ) )
+
+    final_stats = []
+    for c in range(len(can_matches)):
+        totals = reduce( sum_reduce_dict, [ts[c][0] for ts in results] )
+        final_stats.append( get_final_stats( totals, task ) )
 
-    totals = reduce( sum_reduce_dict, [ts[0] for ts in results] )
     # Restore list to keyed format
-    stats = dict(zip(img_keys,[ts[1] for ts in results]))
+    stats = dict(zip(img_keys, [ [ts[1] for ts in img_results]
+                                 for img_results in results ] ))
+
+    return final_stats, stats
+
+# Prepared ground truth and protocol shared by pool and batch evaluation
+# workers, set once per process by init_worker
+_worker_state: dict[str,Any] = {}
+
+
+def init_worker(gt: dict[str,ImageData],
+                task: str,
+                can_match: Callable[[Union[WordData,GroupData],
+                                     Union[WordData,GroupData],float],
+                                    bool],
+                score_match: Callable[[Union[WordData,GroupData],
+                                       Union[WordData,GroupData],float],
+                                      bool],
+                score_pairs: PairScorer,
+                return_ious: bool = False,
+                return_matches: bool = False):
+    """Pool initializer storing the prepared ground truth and the protocol in
+    the worker process (inherited without pickling when processes fork)"""
+    _worker_state.update( gt=gt, task=task, can_match=can_match,
+                          score_match=score_match, score_pairs=score_pairs,
+                          return_ious=return_ious,
+                          return_matches=return_matches )
+
+
+def pool_evaluate_chunk(chunk: list[Tuple[str,ImageData]]) -> list[tuple]:
+    """Evaluate a chunk of images against the worker's ground truth (cf.
+    init_worker).
+
+    Arguments
+      chunk : List of (image key, predicted groups) pairs
+    Returns
+      List of evaluate_image outputs for each image, with their wall times
+        (cf. timed_evaluate_image)
+    """
+    task = _worker_state['task']
+    gt = _worker_state['gt']
+    return [ timed_evaluate_image( *zip_image_elements( gt[img], pred_groups,
+                                                        task ),
+                                   task,
+                                   _worker_state['can_match'],
+                                   _worker_state['score_match'],
+                                   _worker_state['score_pairs'],
+                                   return_ious=_worker_state['return_ious'],
+                                   return_matches=_worker_state['return_matches'] )
+             for (img,pred_groups) in chunk ]
+
+
+def batch_evaluate_chunk(pred_chunk: Tuple[str,list[str]]) \
+        -> Tuple[str,Optional[list[Tuple[dict[str,Number],dict[str,Number]]]]]:
+    """Evaluate a chunk of images from one predictions file against the
+    worker's ground truth (cf. init_worker).
 
+    Arguments
+      pred_chunk : Tuple of the predictions file path and the list of ground
+                     truth image keys to evaluate
+    Returns
+      pred_file : The predictions file path
+      results : List of (totals,image_stats) for each image key, or None
+                  when the predictions file cannot be loaded
+    """
+    pred_file, img_keys = pred_chunk
+    task = _worker_state['task']
+    gt = _worker_state['gt']
+
+    try:
+        preds = load_predictions( pred_file,
+                                  is_linking='link' in task,
+                                  is_e2e='rec' in task,
+                                  image_keys=set(img_keys) )
+    except (OSError, TypeError, ValueError) as e:
+        logging.error('Error loading predictions %s: %s. Skipping ...',
+                      pred_file, e)
+        return pred_file, None
+
+    gt_chunk = { img : gt[img] for img in img_keys }
+    if gt_chunk.keys() != preds.keys():
+        warn_image_keys( gt_chunk.keys(), preds.keys() )
+
+    _,data = flatten_zip_dict(gt_chunk,preds,task)
+    results = [ evaluate_image( g, p, task,
+                                _worker_state['can_match'],
+                                _worker_state['score_match'],
+                                _worker_state['score_pairs'] )
+                for (g,p) in data ]
+    return pred_file, results
+
+
+def batch_evaluate(gt: dict[str,ImageData],
+                   pred_files: list[str],
+                   task: str,
+                   can_match: Callable[[Union[WordData,GroupData],
+                                        Union[WordData,GroupData],float],
+                                       bool],
+                   score_match: Callable[[Union[WordData,GroupData],
+                                          Union[WordData,GroupData],float],
+                                         bool],
+                   score_pairs: PairScorer = calc_score_pairs,
+                   output_dir: Optional[str] = None,
+                   processes: Optional[int] = None ) \
+                   -> dict[str,dict[str,float]]:
+    """Run the primary evaluation protocol for many predictions files against
+    the same (already loaded and prepared) ground truth, in parallel using
+    Pool.
+
+    Work is divided into chunks of images from each predictions file; when
+    there are fewer files than processes, each file's images are divided among
+    several chunks. Results for each file are the same as those of evaluate.
+
+    Arguments
+      gt : Prepared ground truth (cf. load_ground_truth)
+      pred_files : List of paths to predictions JSON files
+      task, can_match, score_match, score_pairs : Same as evaluate
+      output_dir : Directory for the results JSON of each predictions file,
+                     at the predictions file's path relative to the common
+                     directory of all predictions files (default=None, no
+                     output)
+      processes : Number of worker processes (default=None, i.e., CPU count)
+    Returns:
+      final_stats : dict containing pooled statistics for the entire data set
+                      for each predictions file that could be loaded
+    """
+    img_keys = list(gt.keys())  # cache keys to be certain of fixed ordering
+
+    num_processes = processes if processes else (os.cpu_count() or 1)
+    chunks_per_file = max(1, min(len(img_keys),
+                                 -(-num_processes // len(pred_files))))
+    chunk_size = -(-len(img_keys) // chunks_per_file)
+    key_chunks = [ img_keys[k:k+chunk_size]
+                   for k in range(0,len(img_keys),chunk_size) ]
+    pred_chunks = [ (pred_file,keys) for pred_file in pred_files
+                    for keys in key_chunks ]
+
+    if output_dir:
+        # Mirror the paths below the common directory, so that files with
+        # the same name in different directories do not overwrite each other
+        pred_paths = [ os.path.abspath(pred_file) for pred_file in pred_files ]
+        root = os.path.commonpath( [ os.path.dirname(path)
+                                     for path in pred_paths ] )
+        output_files = { pred_file : os.path.join(output_dir,
+                                                  os.path.relpath(path,root))
+                         for (pred_file,path) in zip(pred_files,pred_paths) }
+        os.makedirs(output_dir, exist_ok=True)
+
+    final_stats = {}
+    with Pool( num_processes, initializer=init_worker,
+               initargs=(gt, task, can_match, score_match, score_pairs) ) \
+               as pool:
+        # Ordered results: all chunks of a file arrive consecutively
+        chunk_results = pool.imap( batch_evaluate_chunk, pred_chunks )
+        for pred_file in pred_files:
+            results: Optional[list] = []
+            for _ in key_chunks:
+                _,results_chunk = next(chunk_results)
+                if results is None or results_chunk is None:
+                    results = None
+                else:
+                    results.extend(results_chunk)
+
+            if results is None:  # Predictions could not be loaded
+                continue
+
+            totals = reduce( sum_reduce_dict, [ts[0] for ts in results] )
+            # Restore list to keyed format
+            stats = dict(zip(img_keys,[ts[1] for ts in results]))
+            final_stats[pred_file] = get_final_stats( totals, task )
+
+            if output_dir:
+                output_file = output_files[pred_file]
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                with open(output_file,'w',encoding='utf-8') as fd:
+                    json.dump( {'images': stats,
+                                'results': final_stats[pred_file] },
+                               fd, indent=4 )
+
+    return final_stats
+
+
+def list_prediction_files(pred: str) -> list[str]:
+    """Expand a predictions path argument, which may be a file, a directory
+    (of JSON files), or a glob pattern, to a sorted list of files"""
+    if os.path.isdir(pred):
+        return sorted(glob.glob(os.path.join(glob.escape(pred),'*.json')))
+    elif glob.escape(pred) != pred:  # Contains wildcards
+        return sorted(glob.glob(pred))
+    else:
+        return [pred]
+
+
+def shard_keys( img_keys: list[str], shard: int, num_shards: int ) -> list[str]:
+    """Return a shard's deterministic slice of the (ground truth) image keys:
+    shards are contiguous blocks, so concatenating them in shard order
+    restores the order of img_keys"""
+    return img_keys[ shard*len(img_keys) // num_shards :
+                     (shard+1)*len(img_keys) // num_shards ]
+
+
+def write_shard( output_file: str,
+                 shard: int,
+                 num_shards: int,
+                 task: str,
+                 match_thresh: float,
+                 stats: dict[str,dict[str,float]],
+                 image_results: dict[str,dict[str,Number]],
+                 profile: Optional[dict[str,Any]] = None ):
+    """Write the results of evaluating one shard of the images to a shard file
+    for merge_shards
+
+    Arguments
+      output_file : Path to the shard JSON file
+      shard : Index of the shard (from 0)
+      num_shards : Number of shards
+      task : String containing a valid task (cf parser)
+      match_thresh : Minimum IoU for a match
+      stats : dict containing statistics for each image in the shard
+      image_results : dict containing the totals of each image in the shard
+      profile : Profile of the shard's evaluation (cf. StageProfile.stop),
+                  which is not merged (default=None)
+    """
+    totals = reduce( sum_reduce_dict, image_results.values(),
+                     zero_totals(task) )
+    shard_data = {'shard': [shard, num_shards],
+                  'task': task,
+                  'iou_threshold': match_thresh,
+                  'totals': totals,
+                  'images': stats,
+                  'image_results': image_results }
+    if profile is not None:
+        shard_data['profile'] = profile
+    with open(output_file,'w',encoding='utf-8') as fd:
+        json.dump( shard_data, fd )
+
+
+def merge_shards( shard_files: list[str] ) \
+        -> Tuple[dict[str,float], dict[str,dict[str,float]]]:
+    """Combine the shard files of a sharded evaluation (cf. write_shard) into
+    the results of evaluating all the images at once.
+
+    Image totals are summed in shard and image order, i.e., the order of a
+    single evaluation, so the results are identical to it.
+
+    Arguments
+      shard_files : Paths to the shard JSON files, one for each shard
+    Returns:
+      final_stats : dict containing pooled statistics for the entire data set
+      stats : dict containing statistics for each image in the data set
+    """
+    shards = {}
+    for shard_file in shard_files:
+        with open(shard_file,'r',encoding='utf-8') as fd:
+            data = json.load(fd)
+        shard,num_shards = data['shard']
+        if shard in shards:
+            raise ValueError(f'Duplicate shard {shard} in "{shard_file}"')
+        shards[shard] = data
+
+    first = next(iter(shards.values()), None)
+    if first is None:
+        raise ValueError('Expected at least one shard file')
+    num_shards,task = first['shard'][1], first['task']
+    for (shard,data) in shards.items():
+        if data['shard'][1] != num_shards or not 0 <= shard < num_shards or \
+           data['task'] != task or \
+           data['iou_threshold'] != first['iou_threshold']:
+            raise ValueError(f'Shard {shard} is from a different evaluation')
+    missing = sorted( set(range(num_shards)) - shards.keys() )
+    if missing:
+        raise ValueError(f'Missing shards {missing} of {num_shards}')
+
+    stats = {}
+    image_results = []
+    for shard in range(num_shards):
+        stats.update( shards[shard]['images'] )
+        image_results.extend( shards[shard]['image_results'].values() )
+
+    totals = reduce( sum_reduce_dict, image_results, zero_totals(task) )
     final_stats = get_final_stats( totals, task )
 
     return final_stats, stats
 
+
+# Arrays of each image's matches (cf. image_matches) in a matches file, with
+# their stored types. Matched pairs are the rows of 'gt', 'pred', 'iou', and
+# 'text_score'; unmatched elements are listed in the others.
+MATCH_COLUMNS = { 'gt' : np.int32,
+                  'pred' : np.int32,
+                  'iou' : np.float64,
+                  'text_score' : np.float64 }
+UNMATCHED_COLUMNS = { 'unmatched_gt' : np.int32,
+                      'unmatched_pred' : np.int32 }
+
+
+def write_matches( output_file: str,
+                   matches: dict[str,dict[str,npt.NDArray]] ):
+    """Write the matches of each image to a binary (NumPy .npz) matches
+    file, read by MatchesFile.
+
+    The file holds columns: the matches of all images are concatenated in
+    each array of MATCH_COLUMNS (and the unmatched indices in each array of
+    UNMATCHED_COLUMNS), and the array 'images' of image keys is accompanied
+    by arrays of offsets, so that image i's matches are rows
+    match_offsets[i] to match_offsets[i+1]-1 (and likewise for the
+    unmatched_gt_offsets and unmatched_pred_offsets).
+
+    Arguments
+      output_file : Path to the matches file
+      matches : dict containing the matches of each image (cf. image_matches)
+    """
+    def offsets( counts: list[int] ) -> npt.NDArray[np.int64]:
+        """Cumulative offsets of consecutive counts, starting from zero"""
+        result = np.zeros( len(counts)+1, dtype=np.int64 )
+        np.cumsum( counts, out=result[1:] )
+        return result
+
+    images = list(matches.keys())
+    columns: dict[str,npt.NDArray] = { 'images' : np.array(images, dtype=np.str_) }
+    for (field,dtype) in (MATCH_COLUMNS | UNMATCHED_COLUMNS).items():
+        columns[field] = np.concatenate(
+            [ np.zeros(0, dtype=dtype) ] +
+            [ matches[img][field].astype(dtype) for img in images ] )
+    columns['match_offsets'] = offsets( [ len(matches[img]['gt'])
+                                          for img in images ] )
+    for field in UNMATCHED_COLUMNS:
+        columns[field+'_offsets'] = offsets( [ len(matches[img][field])
+                                               for img in images ] )
+
+    with open(output_file,'wb') as fd:  # NB: np.savez would append '.npz'
+        np.savez( fd, **columns )
+
+
+class MatchesFile:
+    """Reader of a matches file (cf. write_matches), which gives the matches
+    of an image, like image_matches, by its key. The columns are read once;
+    each image's arrays are then views of them, found in constant time.
+
+    Example
+      matches = MatchesFile('matches.npz')
+      for (g,p,iou) in zip(*( matches[img][f] for f in ('gt','pred','iou') )):
+          ...
+    """
+
+    def __init__( self, path: str ):
+        """
+        Arguments
+          path : Path to the matches file
+        """
+        with np.load(path) as npz:
+            self.columns = { field : npz[field] for field in npz.files }
+        self.index = { img : i for (i,img)
+                       in enumerate(self.columns['images'].tolist()) }
+
+    def __len__( self ) -> int:
+        """Number of images"""
+        return len(self.index)
+
+    def __contains__( self, img: str ) -> bool:
+        return img in self.index
+
+    def keys( self ) -> Iterable[str]:
+        """Image keys, in the order of evaluation"""
+        return self.index.keys()
+
+    def __getitem__( self, img: str ) -> dict[str,npt.NDArray]:
+        i = self.index[img]
+        (start,end) = self.columns['match_offsets'][i:i+2]
+        matches = { field : self.columns[field][start:end]
+                    for field in MATCH_COLUMNS }
+        for field in UNMATCHED_COLUMNS:
+            (start,end) = self.columns[field+'_offsets'][i:i+2]
+            matches[field] = self.columns[field][start:end]
+        return matches
+
+
 # NB: Prefer these functions to be local to config_protocol, but they must
 # be top level, in order to be pickleable for multiprocessing.Pool
 
@@ -778,14 +3926,205 @@ def rec_valid(g: Union[WordData,GroupData], d: Union[WordData,GroupData],
     """
     return iou > match_thresh and (g['ignore'] or g['text'] == d['text'])
 
-def str_score(gs: str, ds: str) -> float:
-    """Complementary normalized edit distance, 1-NED"""
-    return 1.0 - normalized_levenshtein(gs,ds)
+class TextScoreMemo:
+    """Least recently used memo of the scores of distinct text pairs, which
+    (unlike functools.lru_cache) also stores the scores of a batch calculated
+    at once (cf. str_scores). Access is thread-safe."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.scores: OrderedDict[Tuple[str,str],float] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, pair: Tuple[str,str]) -> Optional[float]:
+        """Return the memoized score of the pair, or None"""
+        with self.lock:
+            score = self.scores.get(pair)
+            if score is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.scores.move_to_end(pair)
+            return score
+
+    def store(self, items: Iterable[Tuple[Tuple[str,str],float]]):
+        """Memoize (pair, score) items, evicting the least recently used"""
+        with self.lock:
+            self.scores.update(items)
+            while len(self.scores) > self.maxsize:
+                self.scores.popitem(last=False)
+
 
+_text_scores = TextScoreMemo(TEXT_SCORE_CACHE_SIZE)
 
-def config_protocol(task: str, match_thresh: float) -> \
-    Tuple[Callable[[Union[WordData,GroupData],Union[WordData,GroupData],float],
-                   bool],
+
+def str_score(gs: str, ds: str) -> float:
+    """Complementary normalized edit distance, 1-NED.
+
+    Identical strings score 1 without calculating their distance. Other
+    scores are memoized (cf. str_score_cache_info) for the life of the
+    process, which in batch evaluation spans many predictions files against
+    the same ground truth."""
+    if gs == ds:
+        return 1.0
+    score = _text_scores.get( (gs,ds) )
+    if score is None:
+        score = 1.0 - normalized_levenshtein(gs,ds)
+        _text_scores.store( [((gs,ds),score)] )
+    return score
+
+
+def str_scores(gt_texts: list[str], pred_texts: list[str]) \
+        -> npt.NDArray[np.double]:
+    """Return str_score for each pair of corresponding texts, e.g., all the
+    candidate pairs of an image, calculating each distinct pair once.
+
+    When at least LEVENSHTEIN_BATCH_MIN distinct pairs are not memoized, their
+    scores are calculated at once by normalized_levenshtein_batch."""
+    with profile_stage('str_scores'):
+        scores = np.ones( len(gt_texts), dtype=np.double )  # Identical strings
+        pairs: dict[Tuple[str,str],list[int]] = {}
+        for (k,(gs,ds)) in enumerate(zip(gt_texts,pred_texts)):
+            if gs != ds:
+                pairs.setdefault( (gs,ds), [] ).append(k)
+        missing = []
+        for (pair,indices) in pairs.items():
+            score = _text_scores.get(pair)
+            if score is None:
+                missing.append(pair)
+            else:
+                scores[indices] = score
+        if len(missing) >= LEVENSHTEIN_BATCH_MIN:
+            gs_list, ds_list = zip(*missing)
+            new_scores = (1.0 - normalized_levenshtein_batch( list(gs_list),
+                                                              list(ds_list) )).tolist()
+        else:
+            new_scores = [ 1.0 - normalized_levenshtein(gs,ds)
+                           for (gs,ds) in missing ]
+        for (pair,score) in zip(missing,new_scores):
+            scores[pairs[pair]] = score
+        _text_scores.store( zip(missing,new_scores) )
+        return scores
+
+
+def str_score_cache_info() -> dict[str,int]:
+    """Return the statistics of this process's memo of str_score: 'hits',
+    'misses', 'size' (number of pairs stored), and 'maxsize'"""
+    with _text_scores.lock:
+        return { 'hits' : _text_scores.hits,
+                 'misses' : _text_scores.misses,
+                 'size' : len(_text_scores.scores),
+                 'maxsize' : _text_scores.maxsize }
+
+
+def code_points( strings: list[str], width: int, fill: int ) \
+        -> npt.NDArray[np.uint32]:
+    """Return a len(strings)×width array of the Unicode code points of each
+    string (no longer than width), padded with fill"""
+    lengths = np.array( [len(s) for s in strings], dtype=np.intp )
+    flat = np.frombuffer( ''.join(strings).encode('utf-32-le','surrogatepass'),
+                          dtype='<u4' )
+    points = np.full( (len(strings),width), fill, dtype=np.uint32 )
+    # Row-major order of the mask is the order of the joined strings
+    points[ np.arange(width) < lengths[:,None] ] = flat
+    return points
+
+
+def levenshtein_batch( a: list[str], b: list[str] ) -> npt.NDArray[np.int64]:
+    """Return the Levenshtein distance of each pair of corresponding strings.
+
+    Distances are calculated for all the pairs at once by Myers' bit-parallel
+    algorithm, as formulated by Hyyrö: the shorter string of each pair is the
+    pattern, whose characters are bits of a 64-bit word, and each column of
+    the dynamic programming matrix for a character of the longer string (the
+    text) is calculated with a few bitwise operations. Pairs are sorted by
+    text length, so each step advances the prefix of pairs with text left.
+    Pairs of strings both longer than 64 characters use pyeditdistance.
+
+    Arguments
+      a: List of strings
+      b: List of strings the same length as a
+    Returns
+      dist: Integer array of the distances between a[k] and b[k]
+    """
+    if len(a) != len(b):
+        raise ValueError('Lists of strings must have the same length')
+    len_a = np.array( [len(s) for s in a], dtype=np.int64 )
+    len_b = np.array( [len(s) for s in b], dtype=np.int64 )
+    pattern_len = np.minimum(len_a,len_b)
+    text_len = np.maximum(len_a,len_b)
+
+    dist = text_len.copy()  # Correct for empty patterns
+    for k in np.flatnonzero(pattern_len > 64):
+        dist[k] = levenshtein(a[k],b[k])
+
+    bitwise = np.flatnonzero( (pattern_len > 0) & (pattern_len <= 64) )
+    if len(bitwise) == 0:
+        return dist
+    bitwise = bitwise[ np.argsort( -text_len[bitwise], kind='stable' ) ]
+    m, n = pattern_len[bitwise], text_len[bitwise]
+    swap = len_b[bitwise] < len_a[bitwise]
+    patterns = [ b[k] if s else a[k] for (k,s) in zip(bitwise.tolist(),
+                                                      swap.tolist()) ]
+    texts = [ a[k] if s else b[k] for (k,s) in zip(bitwise.tolist(),
+                                                   swap.tolist()) ]
+    width = -(-int(m.max()) // 8) * 8  # Bytes of pattern bits
+    pattern_points = code_points( patterns, width, fill=0xFFFFFFFF ) # Not Unicode
+    text_points = code_points( texts, int(n[0]), fill=0 )
+
+    num_pairs = len(bitwise)
+    pv = np.full( num_pairs, ~np.uint64(0), dtype=np.uint64 )  # Vertical +1
+    mv = np.zeros( num_pairs, dtype=np.uint64 )                # Vertical -1
+    last = np.left_shift( np.uint64(1), (m-1).astype(np.uint64) )
+    score = m.copy()
+    eq_bytes = np.zeros( (num_pairs,8), dtype=np.uint8 )
+    # Number of pairs whose text has a character at each step
+    active = np.searchsorted( -n, -np.arange(int(n[0])) )
+    for (j,c) in enumerate(active.tolist()):
+        # Bits of the pattern positions matching the text character
+        eq_bytes[:c,:width//8] = np.packbits(
+            pattern_points[:c] == text_points[:c,j,None], axis=1,
+            bitorder='little' )
+        eq = eq_bytes[:c].view('<u8').ravel()
+        pv_c, mv_c = pv[:c], mv[:c]
+        xv = eq | mv_c
+        xh = (((eq & pv_c) + pv_c) ^ pv_c) | eq
+        ph = mv_c | ~(xh | pv_c)  # Horizontal +1
+        mh = pv_c & xh            # Horizontal -1
+        score[:c] += ( (ph & last[:c]) != 0 ).astype(np.int64) \
+            - ( (mh & last[:c]) != 0 ).astype(np.int64)
+        ph = (ph << np.uint64(1)) | np.uint64(1)
+        mh = mh << np.uint64(1)
+        pv[:c] = mh | ~(xv | ph)
+        mv[:c] = ph & xv
+    dist[bitwise] = score
+    return dist
+
+
+def normalized_levenshtein_batch( a: list[str], b: list[str] ) \
+        -> npt.NDArray[np.double]:
+    """Return the normalized Levenshtein distance of each pair of
+    corresponding strings, e.g., all the candidate pairs of an image, in one
+    batch (cf. levenshtein_batch). Distances are identical to those of
+    pyeditdistance's normalized_levenshtein."""
+    dist = levenshtein_batch(a,b)
+    total = np.array( [len(s) for s in a], dtype=np.int64 ) \
+        + np.array( [len(s) for s in b], dtype=np.int64 ) + dist
+    ned = np.zeros( len(dist), dtype=np.double )  # Two empty strings
+    nonzero = total > 0
+    ned[nonzero] = (2*dist[nonzero]) / total[nonzero]
+    return ned
+
+
+def config_protocol(task: str, match_thresh: Union[float,list[float]]) -> \
+    Tuple[Union[Callable[[Union[WordData,GroupData],Union[WordData,GroupData],
+                          float],
+                         bool],
+                list[Callable[[Union[WordData,GroupData],
+                               Union[WordData,GroupData],float],
+                              bool]]],
           Callable[[Union[WordData,GroupData],Union[WordData,GroupData],float],
                    float]]:
     """Process arguments to configure specific protocol functionality: string
@@ -794,11 +4133,14 @@ def config_protocol(task: str, match_thresh: float) -> \
     functions.
 
     Parameters
+      task:         String containing a valid task (cf parser)
+      match_thresh: Minimum IoU for a match, or a list thereof for a sweep
 
     Returns
       can_match:    Predicate taking ground truth and predicted word dicts with
                       their pre-calculated iou score and returning whether the
-                      correspondence satisfies match criteria
+                      correspondence satisfies match criteria (or a list of
+                      predicates, one for each of match_thresh when a list)
       score_match:  Function taking ground truth and predicted word dicts with
                       their pre-calculated iou score and returning their match
                       score (assumes they are valid matches)
@@ -815,44 +4157,309 @@ def config_protocol(task: str, match_thresh: float) -> \
     else:
         raise ValueError(f'Unknown task: "{task}"')
 
+    if isinstance(match_thresh, list):
+        can_match = [ partial(can_match.func, match_thresh=thresh)
+                      for thresh in match_thresh ]
+
     return can_match, score_match
 
 
+def parse_thresholds(args: list[str]) -> list[float]:
+    """Parse threshold arguments, either single values or inclusive ranges
+    START:STEP:STOP, into a sorted list of distinct thresholds, each in (0,1).
+    Raises ValueError for a malformed argument or an empty range."""
+    thresholds = set()
+    for arg in args:
+        try:
+            values = [ float(v) for v in arg.split(':') ]
+        except ValueError:
+            raise ValueError(f'Expected a threshold or a range START:STEP:STOP, found "{arg}"') from None
+        if len(values) == 3:
+            start,step,stop = values
+            if step <= 0:
+                raise ValueError(f'Expected positive step in threshold range "{arg}"')
+            if start > stop:
+                raise ValueError(f'Expected START <= STOP in threshold range "{arg}"')
+            num = int(round((stop-start) / step)) + 1
+            # Round away accumulated error so values equal their literals
+            thresholds.update( round(start + n*step, 10) for n in range(num) )
+        elif len(values) == 1:
+            thresholds.add( values[0] )
+        else:
+            raise ValueError(f'Expected a threshold or a range START:STEP:STOP, found "{arg}"')
+    if not thresholds:
+        raise ValueError('Expected at least one threshold')
+    outside = [ t for t in sorted(thresholds) if not 0 < t < 1 ]
+    if outside:
+        raise ValueError(f'Expected thresholds in (0,1), found {outside[0]}')
+    return sorted(thresholds)
+
+
+def parse_shard(arg: str) -> Tuple[int,int]:
+    """Parse a shard argument I/N into the shard index and number of shards"""
+    match = re.fullmatch(r'(\d+)/(\d+)', arg)
+    if not match or not int(match[1]) < int(match[2]):
+        raise ValueError(f'Expected shard I/N with 0 <= I < N, found "{arg}"')
+    return int(match[1]), int(match[2])
+
+
+def merge_main(argv: list[str]):
+    """Entry point for the merge command, combining shard files"""
+    args = merge_parser.parse_args(argv)
+
+    try:
+        overall,per_image = merge_shards(args.shards)
+    except ValueError as e:
+        merge_parser.error(str(e))
+
+    print(overall)
+
+    if args.output:
+        with open(args.output,'w',encoding='utf-8') as fd:
+            json.dump( {'images': per_image,
+                        'results': overall }, fd, indent=4 )
+
+
+def task_path( path: Optional[str], task: str ) -> Optional[str]:
+    """Substitute the task for {task} in a path argument (cf. --task)"""
+    return path.replace('{task}', task) if path else path
+
+
 def main():
     """Main entry point for evaluation script"""
 
-    args = parser.parse_args()
+    if sys.argv[1:2] == ['merge']:
+        merge_main(sys.argv[2:])
+        return
 
-    is_linking = 'link' in args.task
-    is_e2e     = 'rec' in args.task
+    args = parser.parse_args()
+    tasks = list(dict.fromkeys(args.task))  # Distinct, in order
+
+    # Check the options before loading anything
+    if len(tasks) > 1:
+        for (option,path) in ( ('--pred', args.pred),
+                               ('--output', args.output),
+                               ('--journal', args.journal),
+                               ('--timings', args.timings),
+                               ('--matches', args.matches) ):
+            if path and '{task}' not in path:
+                parser.error(f'Several --task values require {{task}} in {option}, so that each task has its own')
+        if args.profile:
+            parser.error('--profile supports a single --task')
+
+    if args.profile and args.parallel != 'none':
+        parser.error('--profile requires sequential evaluation (--parallel none)')
+
+    try:
+        thresholds = parse_thresholds(args.iou_threshold)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if not args.output:
+            parser.error('--shard requires --output for the shard file')
+
+    if args.resume and not args.journal:
+        parser.error('--resume requires --journal')
+    if args.timings and args.parallel not in ['pool', 'spark']:
+        parser.error('--timings requires --parallel pool or spark')
+    if args.matches and (args.cache or args.journal):
+        parser.error('--matches supports neither --cache nor --journal, whose stored results have no matches')
+
+    pred_files = { task : list_prediction_files(task_path(args.pred, task))
+                   for task in tasks }
+    if any( files != [task_path(args.pred, task)]
+            for (task,files) in pred_files.items() ):  # Batch
+        if len(thresholds) > 1 or args.parallel == 'spark' or args.cache or \
+           args.shard or args.journal or args.timings or args.matches or \
+           args.profile:
+            parser.error('Batch evaluation supports neither a sweep of --iou-threshold values, --parallel spark, --cache, --shard, --journal, --timings, --matches, nor --profile')
+        for (task,files) in pred_files.items():
+            if len(files) == 0:
+                parser.error(f'No predictions files found for "{task_path(args.pred, task)}"')
+    elif len(thresholds) > 1:  # Sweep
+        if args.parallel != 'none' or args.cache or args.shard or \
+           args.journal or args.matches:
+            parser.error('Neither --parallel, --cache, --shard, --journal, nor --matches is supported for a sweep of --iou-threshold values')
+
+    if args.profile:
+        _profile.start()
+
+    # Loaded and prepared once for all the tasks
+    gt = load_ground_truth_tasks( args.gt, tasks, image_regex=args.gt_regex )
+    if shard:
+        gt = gt.subset( shard_keys( list(gt.images.keys()), *shard ) )
+
+    for task in tasks:
+        if len(tasks) > 1:
+            logging.info(f'Evaluating task {task}...')
+        evaluate_task( args, task, gt.task_view(task), thresholds, shard,
+                       pred_files[task] )
+
+
+def evaluate_task( args: argparse.Namespace,
+                   task: str,
+                   gt_anno: dict[str,ImageData],
+                   thresholds: list[float],
+                   shard: Optional[Tuple[int,int]],
+                   pred_files: list[str] ):
+    """Evaluate one task of the command line (cf. main), whose path arguments
+    are those of the task (cf. task_path) and whose options main has checked
 
-    gt_anno = load_ground_truth( args.gt, is_linking=is_linking, is_e2e=is_e2e,
-                                 image_regex=args.gt_regex )
-    preds = load_predictions( args.pred, is_linking=is_linking, is_e2e=is_e2e,
-                              image_regex=args.gt_regex )
+    Arguments
+      args : Parsed command line arguments
+      task : Task to evaluate
+      gt_anno : Ground truth of the task (cf. GroundTruth.task_view)
+      thresholds : IoU thresholds (cf. parse_thresholds)
+      shard : Shard and number of shards (cf. parse_shard), or None
+      pred_files : Predictions files of the task (cf. list_prediction_files)
+    """
+    is_linking = 'link' in task
+    is_e2e     = 'rec' in task
+    pred = task_path(args.pred, task)
+    output_file = task_path(args.output, task)
+    journal_file = task_path(args.journal, task)
+    timings_file = task_path(args.timings, task)
+    matches_file = task_path(args.matches, task)
+
+    score_pairs = PAIR_ENGINES[args.pair_engine]
+    protocol: dict[str,Any] = {'iou_threshold': thresholds[0]}
+    if args.pair_engine in ('convex', 'aggregate'):
+        protocol['pair_engine'] = args.pair_engine
+    if args.repair_invalid:
+        score_pairs = partial(score_pairs, repair=True)
+        protocol['repair_invalid'] = True
+
+    if pred_files != [pred]:  # Batch
+        can_match, score_match = config_protocol(task, thresholds[0])
+
+        overall = batch_evaluate( gt_anno, pred_files,
+                                  task, can_match, score_match,
+                                  score_pairs=score_pairs,
+                                  output_dir=output_file,
+                                  processes=args.workers )
+        for (pred_file,results) in overall.items():
+            print(pred_file, results)
+        return
+
+    if journal_file and len(thresholds) == 1:
+        try:
+            journal = EvalJournal( journal_file, task,
+                                   protocol=protocol,
+                                   resume=args.resume )
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        journal = None
+
+    if args.parallel == 'none' and len(thresholds) == 1:
+        # Stream predictions through evaluate, which checks the image keys
+        # (and takes journaled images from the journal)
+        preds = iter_predictions( pred, is_linking=is_linking,
+                                  is_e2e=is_e2e, image_regex=args.gt_regex,
+                                  image_keys=( set(gt_anno.keys()) -
+                                               set(journal.images.keys()
+                                                   if journal else []) ) )
+    else:
+        preds = load_predictions( pred, is_linking=is_linking,
+                                  is_e2e=is_e2e, image_regex=args.gt_regex,
+                                  image_keys=( set(gt_anno.keys())
+                                               if args.shard else None ) )
 
-    # Verify we have the same images (key sets)
-    if gt_anno.keys() != preds.keys() :
-        warn_image_keys( gt_anno.keys(), preds.keys() )
+        # Verify we have the same images (key sets)
+        if gt_anno.keys() != preds.keys() :
+            warn_image_keys( gt_anno.keys(), preds.keys() )
 
     if args.parallel == 'spark':
         eval_fn = spark_evaluate
     elif args.parallel == 'pool':
-        eval_fn = pool_evaluate
+        eval_fn = partial(pool_evaluate, processes=args.workers)
+    elif args.parallel == 'thread':
+        eval_fn = partial(thread_evaluate, threads=args.workers)
     else:
         eval_fn = evaluate
 
-    can_match, score_match = config_protocol(args.task, args.iou_threshold)
-    
-    overall,per_image = eval_fn( gt_anno, preds,
-                                 args.task, can_match, score_match )
+    if len(thresholds) > 1:  # Sweep
+        can_matches, score_match = config_protocol(task, thresholds)
+
+        overall,per_image = sweep_evaluate( gt_anno, preds,
+                                            task, can_matches, score_match,
+                                            score_pairs=score_pairs )
+        auc = get_sweep_auc( thresholds, overall )
+
+        for (thresh,results) in zip(thresholds,overall):
+            print(thresh, results)
+        print('auc', auc)
+
+        output = {'iou_thresholds': thresholds,
+                  'images': per_image,
+                  'results': overall,
+                  'auc': auc }
+        if args.profile:
+            output['profile'] = _profile.stop()
+            print({'profile': output['profile']['stages']})
+
+        if output_file:
+            with open(output_file,'w',encoding='utf-8') as fd:
+                json.dump( output, fd, indent=4 )
+        return
+
+    can_match, score_match = config_protocol(task, thresholds[0])
+
+    if args.cache:
+        cache = EvalCache( args.cache,
+                           protocol=protocol,
+                           max_bytes=int(args.cache_size * 2**20),
+                           store_ious=args.cache_ious )
+    else:
+        cache = None
 
-    print(overall)
+    if args.shard and not gt_anno:  # Nothing for a parallel backend to reduce
+        eval_fn = evaluate
 
-    if args.output:
-        with open(args.output,'w',encoding='utf-8') as fd:
-            json.dump( {'images': per_image,
-                        'results': overall }, fd, indent=4 )
+    timings: dict[str,dict[str,Number]] = {}
+    matches: dict[str,dict[str,npt.NDArray]] = {}
+    results = eval_fn( gt_anno, preds,
+                       task, can_match, score_match,
+                       score_pairs=score_pairs,
+                       cache=cache, return_image_results=bool(args.shard),
+                       journal=journal,
+                       **({'timings': timings} if timings_file else {}),
+                       **({'matches': matches} if matches_file else {}) )
+    overall,per_image = results[:2]
+    if journal:
+        journal.close()
+
+    if timings_file:
+        with open(timings_file,'w',encoding='utf-8') as fd:
+            json.dump( timings, fd, indent=4 )
+
+    if matches_file:
+        write_matches( matches_file, matches )
+
+    print(overall)
+    if cache:
+        print({'cache_hits': cache.hits, 'cache_misses': cache.misses})
+
+    output = {'images': per_image,
+              'results': overall }
+    if args.profile:
+        output['profile'] = _profile.stop()
+        print({'profile': output['profile']['stages']})
+
+    if args.shard:  # Partial results for merge_shards
+        write_shard( output_file, *shard, task, thresholds[0],
+                     per_image, results[2], output.get('profile') )
+    elif output_file:
+        with open(output_file,'w',encoding='utf-8') as fd:
+            json.dump( output, fd, indent=4 )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+"""Small fixed inputs for checking the evaluation engines and backends of
+icdar_maptext_analysis/eval.py against the reference (calc_score_pairs and
+find_matches)"""
+
+import json
+
+import pytest
+
+from icdar_maptext_analysis import eval as maptext_eval
+from icdar_maptext_analysis.benchmarks.differential import REGRESSION_CASES
+
+TASKS = ['det', 'detlink', 'detrec', 'detreclink']
+THRESHOLDS = [0.3, 0.5, 0.7]
+
+
+def box( x: float, y: float, w: float, h: float ) -> list:
+    """Vertices of an axis-aligned rectangle"""
+    return [ [x, y], [x+w, y], [x+w, y+h], [x, y+h] ]
+
+
+def gt_word( vertices: list, text: str, illegible: bool = False ) -> dict:
+    """Ground truth word in the competition format"""
+    return { 'vertices': vertices, 'text': text,
+             'illegible': illegible, 'truncated': False }
+
+
+def pred_word( vertices: list, text: str ) -> dict:
+    """Predicted word in the competition format"""
+    return { 'vertices': vertices, 'text': text }
+
+
+# Matched, partial, split, merged, missed and spurious words and groups, an
+# illegible (ignored) word, a rotated and a concave polygon, and an image
+# without predictions, followed by the differential check's regression cases
+GT = [
+    { 'image': 'fixed/0.png',
+      'groups': [
+          [ gt_word( box(10, 10, 40, 12), 'Main' ),
+            gt_word( box(55, 10, 60, 12), 'Street' ) ],
+          [ gt_word( [ [20, 60], [60, 40], [66, 52], [26, 72] ], 'River' ) ],
+          [ gt_word( box(150, 10, 30, 10), '###', illegible=True ) ],
+          [ gt_word( box(150, 80, 50, 15), 'Mill' ) ] ] },
+    { 'image': 'fixed/1.png',
+      'groups': [
+          [ gt_word( box(0, 0, 100, 20), 'Saint' ),
+            gt_word( box(105, 0, 80, 20), 'Louis' ),
+            gt_word( box(190, 0, 60, 20), 'Bay' ) ],
+          [ gt_word( [ [0, 50], [40, 50], [40, 60], [20, 60], [20, 80],
+                       [0, 80] ], 'Elm' ) ],
+          [ gt_word( box(100, 50, 30, 30), 'Oak' ),
+            gt_word( box(102, 85, 30, 30), 'Ash' ) ] ] },
+    { 'image': 'fixed/2.png',
+      'groups': [ [ gt_word( box(5, 5, 20, 8), 'Hill' ) ] ] },
+] + [ image for (gt,_) in REGRESSION_CASES for image in gt ]
+
+PRED = [
+    { 'image': 'fixed/0.png',
+      'groups': [
+          [ pred_word( box(11, 10, 39, 12), 'Main' ),
+            pred_word( box(56, 11, 58, 12), 'Stret' ) ],
+          [ pred_word( [ [22, 61], [60, 42], [65, 53], [27, 72] ], 'Rivcr' ) ],
+          [ pred_word( box(152, 11, 28, 9), 'Ill' ) ],
+          [ pred_word( box(300, 300, 20, 20), 'Noise' ) ] ] },
+    { 'image': 'fixed/1.png',
+      'groups': [
+          [ pred_word( box(0, 1, 99, 19), 'Saint' ) ],
+          [ pred_word( box(104, 0, 146, 20), 'LouisBay' ) ],
+          [ pred_word( box(0, 50, 40, 30), 'Elm' ) ],
+          [ pred_word( box(100, 50, 32, 65), 'Oak Ash' ) ],
+          [ pred_word( box(101, 51, 29, 28), 'Oak' ) ] ] },
+] + [ image for (_,pred) in REGRESSION_CASES for image in pred ]
+
+
+@pytest.fixture(scope='session')
+def data_files( tmp_path_factory: pytest.TempPathFactory ) -> tuple:
+    """Paths of the ground truth and predictions files"""
+    directory = tmp_path_factory.mktemp('data')
+    gt_file, pred_file = directory / 'gt.json', directory / 'pred.json'
+    gt_file.write_text( json.dumps(GT), encoding='utf-8' )
+    pred_file.write_text( json.dumps(PRED), encoding='utf-8' )
+    return str(gt_file), str(pred_file)
+
+
+@pytest.fixture(scope='session')
+def loaded( data_files: tuple ) -> dict:
+    """Loaded ground truth and predictions for each task"""
+    gt_file, pred_file = data_files
+    return { task : ( maptext_eval.load_ground_truth( gt_file,
+                                                      'link' in task,
+                                                      'rec' in task ),
+                      maptext_eval.load_predictions( pred_file,
+                                                     'link' in task,
+                                                     'rec' in task ) )
+             for task in TASKS }
+
+
+def reference( gt: dict, pred: dict, task: str, thresh: float ) -> tuple:
+    """Overall and per-image statistics, and the matches of each image, from
+    scoring every pair in a loop (calc_score_pairs) and optimal matching
+    (find_matches)"""
+    can_match, score_match = maptext_eval.config_protocol(task, thresh)
+    totals = maptext_eval.zero_totals(task)
+    stats, matches = {}, {}
+    for img in gt:
+        g, p = maptext_eval.zip_image_elements( gt[img], pred.get(img, []),
+                                                task )
+        allowed, scores, ious = maptext_eval.calc_score_pairs( g, p, can_match,
+                                                               score_match )
+        matches[img] = maptext_eval.find_matches( allowed, scores, ious )
+        results, stats[img] = maptext_eval.tally_matches( g, p, task,
+                                                          *matches[img] )
+        totals = maptext_eval.sum_reduce_dict( totals, results )
+    return maptext_eval.get_final_stats( totals, task ), stats, matches
+
+
+@pytest.fixture(scope='session')
+def expected( loaded: dict ) -> dict:
+    """Reference results (cf. reference) for each task and threshold"""
+    return { (task,thresh) : reference( *loaded[task], task, thresh )
+             for task in TASKS for thresh in THRESHOLDS }
@@ -0,0 +1,150 @@
+"""Evaluation backends, stores and resumable runs must reproduce the
+reference exactly"""
+
+import os
+
+import pytest
+
+from icdar_maptext_analysis import eval as maptext_eval
+
+from conftest import TASKS, THRESHOLDS
+
+INDEXED = maptext_eval.PAIR_ENGINES['strtree']
+
+
+@pytest.fixture(params=TASKS)
+def task( request: pytest.FixtureRequest ) -> str:
+    """Each task"""
+    return request.param
+
+
+@pytest.fixture(params=THRESHOLDS)
+def thresh( request: pytest.FixtureRequest ) -> float:
+    """Each IoU threshold"""
+    return request.param
+
+
+@pytest.fixture
+def protocol( task: str, thresh: float ) -> tuple:
+    """can_match and score_match of the task and threshold"""
+    return maptext_eval.config_protocol(task, thresh)
+
+
+def test_pool( loaded, expected, task, thresh, protocol ):
+    results = maptext_eval.pool_evaluate( *loaded[task], task, *protocol,
+                                          score_pairs=INDEXED, processes=2 )
+    assert results == expected[(task,thresh)][:2]
+
+
+def test_thread( loaded, expected, task, thresh, protocol ):
+    results = maptext_eval.thread_evaluate( *loaded[task], task, *protocol,
+                                            score_pairs=INDEXED, threads=2 )
+    assert results == expected[(task,thresh)][:2]
+
+
+def test_spark( loaded, expected, task, thresh, protocol ):
+    pytest.importorskip('pyspark')
+    results = maptext_eval.spark_evaluate( *loaded[task], task, *protocol,
+                                           score_pairs=INDEXED )
+    assert results == expected[(task,thresh)][:2]
+
+
+def test_sweep( loaded, expected, task ):
+    can_matches, score_match = maptext_eval.config_protocol(task, THRESHOLDS)
+    overall, stats = maptext_eval.sweep_evaluate( *loaded[task], task,
+                                                  can_matches, score_match,
+                                                  score_pairs=INDEXED )
+    for (c,thresh) in enumerate(THRESHOLDS):
+        assert overall[c] == expected[(task,thresh)][0]
+        assert { img : img_stats[c] for (img,img_stats) in stats.items() } \
+            == expected[(task,thresh)][1]
+
+
+def test_stream( data_files, loaded, expected, task, thresh, protocol ):
+    """Predictions streamed from the file (cf. iter_predictions)"""
+    preds = maptext_eval.iter_predictions( data_files[1], 'link' in task,
+                                           'rec' in task )
+    results = maptext_eval.evaluate( loaded[task][0], preds, task, *protocol,
+                                     score_pairs=INDEXED )
+    assert results == expected[(task,thresh)][:2]
+
+
+@pytest.mark.parametrize('stream', [False, True])
+@pytest.mark.parametrize('store_ious', [False, True])
+def test_cache( tmp_path, data_files, loaded, expected, task, thresh,
+                protocol, stream, store_ious ):
+    """Results evaluated into the cache, and then loaded from it"""
+    gt, pred = loaded[task]
+    cache = maptext_eval.EvalCache( str(tmp_path), {'iou_threshold': thresh},
+                                    store_ious=store_ious )
+    for hits in (0, len(gt)):
+        if stream:
+            pred = maptext_eval.iter_predictions( data_files[1],
+                                                  'link' in task,
+                                                  'rec' in task )
+        cache.hits = cache.misses = 0
+        results = maptext_eval.evaluate( gt, pred, task, *protocol,
+                                         score_pairs=INDEXED, cache=cache )
+        assert results == expected[(task,thresh)][:2]
+        assert (cache.hits, cache.misses) == (hits, len(gt) - hits)
+
+
+def test_journal( tmp_path, loaded, expected, task, thresh, protocol ):
+    """An interrupted evaluation resumed from its journal"""
+    gt, pred = loaded[task]
+    path = str(tmp_path / 'journal.jsonl')
+    first = list(gt.keys())[:2]
+    journal = maptext_eval.EvalJournal( path, task, {'iou_threshold': thresh} )
+    maptext_eval.evaluate( { img : gt[img] for img in first }, pred, task,
+                           *protocol, score_pairs=INDEXED, journal=journal )
+    journal.close()
+
+    journal = maptext_eval.EvalJournal( path, task, {'iou_threshold': thresh},
+                                        resume=True )
+    assert set(journal.images.keys()) == set(first)
+    results = maptext_eval.evaluate( gt, pred, task, *protocol,
+                                     score_pairs=INDEXED, journal=journal )
+    journal.close()
+    assert results == expected[(task,thresh)][:2]
+
+
+def test_shards( tmp_path, loaded, expected, task, thresh, protocol ):
+    gt, pred = loaded[task]
+    num_shards = 3
+    shard_files = []
+    for shard in range(num_shards):
+        keys = maptext_eval.shard_keys( list(gt.keys()), shard, num_shards )
+        _, stats, image_results = maptext_eval.evaluate(
+            { img : gt[img] for img in keys }, pred, task, *protocol,
+            score_pairs=INDEXED, return_image_results=True )
+        shard_files.append( str(tmp_path / f'shard{shard}.json') )
+        maptext_eval.write_shard( shard_files[-1], shard, num_shards, task,
+                                  thresh, stats, image_results )
+    results = maptext_eval.merge_shards( shard_files[::-1] )
+    assert results == expected[(task,thresh)][:2]
+
+
+def test_batch( tmp_path, data_files, loaded, expected, task, thresh,
+                protocol ):
+    """Copies of the predictions file in different directories, with the
+    same name"""
+    pred_files = []
+    for name in ('a', 'b'):
+        os.makedirs( tmp_path / name )
+        pred_files.append( str(tmp_path / name / 'pred.json') )
+        with open(data_files[1], encoding='utf-8') as fd, \
+             open(pred_files[-1], 'w', encoding='utf-8') as out:
+            out.write( fd.read() )
+
+    output_dir = tmp_path / 'results'
+    final_stats = maptext_eval.batch_evaluate( loaded[task][0], pred_files,
+                                               task, *protocol,
+                                               score_pairs=INDEXED,
+                                               output_dir=str(output_dir),
+                                               processes=2 )
+    assert final_stats == { pred_file : expected[(task,thresh)][0]
+                            for pred_file in pred_files }
+    assert sorted( os.path.relpath(os.path.join(d, f), output_dir)
+                   for (d,_,files) in os.walk(output_dir) for f in files ) \
+        == [ os.path.join('a', 'pred.json'), os.path.join('b', 'pred.json') ]
+
@@ -0,0 +1,83 @@
+"""Pair scoring engines (cf. PAIR_ENGINES) and sparse matching must reproduce
+the reference exactly"""
+
+import numpy as np
+import pytest
+import scipy  # type: ignore
+
+from icdar_maptext_analysis import eval as maptext_eval
+
+from conftest import TASKS, THRESHOLDS
+
+ENGINES = [ engine for engine in maptext_eval.PAIR_ENGINES if engine != 'loop' ]
+
+
+def dense( matrix ) -> np.ndarray:
+    """Return a matrix of a pair scoring engine as a dense numpy array"""
+    return matrix.toarray() if scipy.sparse.issparse(matrix) else matrix
+
+
+@pytest.fixture
+def sparse_matching( monkeypatch: pytest.MonkeyPatch ):
+    """Make every candidate matrix sparse (cf. candidate_matrices), and solve
+    every component of matches without forming its dense block (cf.
+    find_matches_sparse), however small"""
+    monkeypatch.setattr(maptext_eval, 'SPARSE_MIN_PAIRS', 1)
+    monkeypatch.setattr(maptext_eval, 'SPARSE_MAX_DENSITY', 1.0)
+
+
+@pytest.mark.parametrize('thresh', THRESHOLDS)
+@pytest.mark.parametrize('task', TASKS)
+@pytest.mark.parametrize('engine', ENGINES)
+def test_pairs_and_matches( loaded, expected, engine, task, thresh ):
+    """Each engine scores the allowed pairs exactly like calc_score_pairs,
+    so find_matches finds the same matches"""
+    gt, pred = loaded[task]
+    matches = expected[(task,thresh)][2]
+    can_match, score_match = maptext_eval.config_protocol(task, thresh)
+    for img in gt:
+        g, p = maptext_eval.zip_image_elements( gt[img], pred.get(img, []),
+                                                task )
+        allowed, scores, ious = maptext_eval.calc_score_pairs( g, p, can_match,
+                                                               score_match )
+        engine_allowed, engine_scores, engine_ious = \
+            maptext_eval.PAIR_ENGINES[engine]( g, p, can_match, score_match )
+        engine_allowed = dense(engine_allowed).astype(bool)
+        np.testing.assert_array_equal( engine_allowed, allowed )
+        np.testing.assert_array_equal( dense(engine_scores)[allowed],
+                                       scores[allowed] )
+        np.testing.assert_array_equal( dense(engine_ious)[allowed],
+                                       ious[allowed] )
+        for (found, reference) in zip( maptext_eval.find_matches(
+                                           engine_allowed,
+                                           dense(engine_scores),
+                                           dense(engine_ious) ),
+                                       matches[img] ):
+            np.testing.assert_array_equal( found, reference )
+
+
+@pytest.mark.parametrize('thresh', THRESHOLDS)
+@pytest.mark.parametrize('task', TASKS)
+@pytest.mark.parametrize('engine', ENGINES)
+def test_evaluate( loaded, expected, engine, task, thresh ):
+    can_match, score_match = maptext_eval.config_protocol(task, thresh)
+    overall, stats = maptext_eval.evaluate(
+        *loaded[task], task, can_match, score_match,
+        score_pairs=maptext_eval.PAIR_ENGINES[engine] )
+    assert (overall, stats) == expected[(task,thresh)][:2]
+
+
+@pytest.mark.parametrize('thresh', THRESHOLDS)
+@pytest.mark.parametrize('task', TASKS)
+def test_sparse_matching( sparse_matching, loaded, expected, task, thresh ):
+    can_match, score_match = maptext_eval.config_protocol(task, thresh)
+    matches: dict = {}
+    overall, stats = maptext_eval.evaluate(
+        *loaded[task], task, can_match, score_match,
+        score_pairs=maptext_eval.PAIR_ENGINES['strtree'], matches=matches )
+    assert (overall, stats) == expected[(task,thresh)][:2]
+    for (img,(matches_gt, matches_pred, matches_ious)) in \
+        expected[(task,thresh)][2].items():
+        np.testing.assert_array_equal( matches[img]['gt'], matches_gt )
+        np.testing.assert_array_equal( matches[img]['pred'], matches_pred )
+        np.testing.assert_array_equal( matches[img]['iou'], matches_ious )